@@ -1,15 +1,28 @@
+import asyncio
 import os
 import json
+
+import httpx
 import requests
 from dotenv import load_dotenv
 
+from . import bria_transport
+from .bria_endpoints import CircuitOpenError, bria_endpoints
+from .bria_limiter import NEUTRAL, bria_limiters, classify_status, parse_retry_after
+from .bria_retry import BriaCallError, acall_with_retries, call_with_retries
+from .bria_status import get_status_poller
+from .image_mirror import image_mirror
+from .render_cache import render_cache
+from .settings import DEFAULT_BRIA_API_URL, get_settings
+
 load_dotenv()
 
 # =========================
 # Shared helpers
 # =========================
 
-BRIA_API_URL = "https://engine.prod.bria-api.com/v2/image/generate"
+# Identity of the render API (used in cache keys); requests go to the endpoints in BRIA_API_URLS.
+BRIA_API_URL = DEFAULT_BRIA_API_URL
 BRIA_API_TOKEN = os.getenv("BRIA_API_TOKEN")  # put this in your .env
 DEMO_OPT_IN = os.getenv("DEMO_OPT_IN_VALUE", "1")
 
@@ -36,6 +49,247 @@ def _bria_headers(token: str | None = None):
     }
 
 
+def _raise_if_all_circuits_open(action: str) -> None:
+    retry_in = bria_endpoints.retry_in()
+    if retry_in > 0:
+        raise CircuitOpenError(
+            f"Bria {action} unavailable: all image endpoints are failing, retry in {retry_in:.0f}s",
+            status_code=503,
+            retry_after=retry_in,
+        )
+
+
+def _post_with_failover(payload: dict, headers: dict, *, action: str, timeout=None) -> requests.Response:
+    """POST to the first endpoint whose circuit is closed, failing over on 5xx or connection errors.
+
+    A transport error after the request went out (e.g. a read timeout) is raised as is:
+    that endpoint may already be rendering it, and another would render it again.
+    """
+
+    response: requests.Response | None = None
+    error: requests.exceptions.RequestException | None = None
+    for endpoint in bria_endpoints.available():
+        try:
+            response = bria_transport.post_json(endpoint.url, payload, headers, timeout=timeout)
+        except requests.exceptions.RequestException as exc:
+            endpoint.breaker.record_failure()
+            if not bria_transport.failed_before_send(exc):
+                raise
+            response, error = None, exc
+            continue
+        if response.status_code >= 500:
+            endpoint.breaker.record_failure()
+            continue
+        endpoint.breaker.record_success()
+        return response
+    if response is not None:
+        return response
+    if error is not None:
+        raise error
+    _raise_if_all_circuits_open(action)
+    raise CircuitOpenError(f"Bria {action} unavailable: no image endpoint admitted the call", status_code=503)
+
+
+def _post_bria(payload: dict, token: str, *, action: str, timeout=None, on_send=None) -> dict:
+    """POST a payload once through the pooled Bria transport and return its ``result`` block.
+
+    The call holds a slot of the token's adaptive limiter, which learns from its outcome.
+    Failures raise :class:`BriaCallError` carrying the status and any ``Retry-After``.
+    """
+
+    _raise_if_all_circuits_open(action)
+    headers = _bria_headers(token)
+    limiter = bria_limiters.for_token(token)
+    started = limiter.acquire(timeout=get_settings().bria_limiter_wait_seconds)
+    if on_send is not None:
+        on_send()
+    outcome, retry_after = classify_status(None), None
+    try:
+        response = _post_with_failover(payload, headers, action=action, timeout=timeout)
+        outcome = classify_status(response.status_code)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    except CircuitOpenError:
+        # Upstream health, not this token's rate, refused the call.
+        outcome = NEUTRAL
+        raise
+    except requests.exceptions.RequestException as exc:  # includes timeouts and connection errors
+        status = getattr(exc.response, "status_code", None)
+        raise BriaCallError(
+            f"Bria {action} failed (status={status}): {exc}",
+            status_code=status,
+            sent=not bria_transport.failed_before_send(exc),
+        ) from exc
+    finally:
+        limiter.release(started, outcome, retry_after=retry_after)
+    if response.status_code >= 400:
+        try:
+            detail = response.json()
+        except Exception:  # pragma: no cover
+            detail = response.text
+        raise BriaCallError(
+            f"Bria {action} failed (status={response.status_code}): {detail}",
+            status_code=response.status_code,
+            retry_after=retry_after,
+        )
+    return response.json()["result"]
+
+
+def _call_bria(payload: dict, bria_api_token: str | None, *, action: str, kind: str, timeout=None) -> dict:
+    """Run :func:`_post_bria` under the retry/hedging policy configured for ``kind``."""
+
+    token = _resolve_token(bria_api_token)
+    return call_with_retries(
+        lambda on_send: _post_bria(payload, token, action=action, timeout=timeout, on_send=on_send),
+        kind=kind,
+        token=token,
+        action=action,
+    )
+
+
+async def _apost_with_failover(payload: dict, headers: dict, *, action: str, timeout=None):
+    """Async counterpart of :func:`_post_with_failover`."""
+
+    response = None
+    error: httpx.HTTPError | None = None
+    for endpoint in bria_endpoints.available():
+        try:
+            response = await bria_transport.apost_json(endpoint.url, payload, headers, timeout=timeout)
+        except httpx.HTTPError as exc:
+            endpoint.breaker.record_failure()
+            if not bria_transport.failed_before_send(exc):
+                raise
+            response, error = None, exc
+            continue
+        if response.status_code >= 500:
+            endpoint.breaker.record_failure()
+            continue
+        endpoint.breaker.record_success()
+        return response
+    if response is not None:
+        return response
+    if error is not None:
+        raise error
+    _raise_if_all_circuits_open(action)
+    raise CircuitOpenError(f"Bria {action} unavailable: no image endpoint admitted the call", status_code=503)
+
+
+async def _apost_bria(payload: dict, token: str, *, action: str, timeout=None, on_send=None) -> dict:
+    """Submit a render with ``"sync": false`` and await its result from the shared status poller.
+
+    The token's limiter slot is held until the render completes, so the adaptive limit
+    still counts renders in progress at Bria, while no thread waits on them.
+    """
+
+    _raise_if_all_circuits_open(action)
+    headers = _bria_headers(token)
+    limiter = bria_limiters.for_token(token)
+    started = await limiter.acquire_async(timeout=get_settings().bria_limiter_wait_seconds)
+    if on_send is not None:
+        on_send()
+    outcome, retry_after = classify_status(None), None
+    try:
+        response = await _apost_with_failover({**payload, "sync": False}, headers, action=action, timeout=timeout)
+        outcome = classify_status(response.status_code)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if response.status_code >= 400:
+            raise BriaCallError(
+                f"Bria {action} failed (status={response.status_code}): {response.text}",
+                status_code=response.status_code,
+                retry_after=retry_after,
+            )
+        body = response.json()
+        if "result" in body:  # answered synchronously after all
+            return body["result"]
+        return await get_status_poller().wait(body["status_url"], headers, action=action)
+    except CircuitOpenError:
+        outcome = NEUTRAL
+        raise
+    except BriaCallError as exc:
+        outcome = classify_status(exc.status_code)
+        raise
+    except asyncio.CancelledError:
+        # A hedged duplicate won; this render's outcome says nothing about the token.
+        outcome = NEUTRAL
+        raise
+    except httpx.HTTPError as exc:  # includes timeouts and connection errors
+        outcome = classify_status(None)
+        raise BriaCallError(
+            f"Bria {action} failed (status=None): {exc}", sent=not bria_transport.failed_before_send(exc)
+        ) from exc
+    finally:
+        limiter.release(started, outcome, retry_after=retry_after)
+
+
+async def _acall_bria(payload: dict, bria_api_token: str | None, *, action: str, kind: str, timeout=None) -> dict:
+    """Async counterpart of :func:`_call_bria`."""
+
+    token = _resolve_token(bria_api_token)
+    return await acall_with_retries(
+        lambda on_send: _apost_bria(payload, token, action=action, timeout=timeout, on_send=on_send),
+        kind=kind,
+        token=token,
+        action=action,
+    )
+
+
+def _parse_result(data: dict) -> dict:
+    structured_prompt_str = data["structured_prompt"]
+    return {
+        "image_url": data["image_url"],
+        "seed": data["seed"],
+        "structured_prompt": json.loads(structured_prompt_str),
+        "raw_structured_prompt": structured_prompt_str,
+    }
+
+
+def _render(
+    payload: dict,
+    bria_api_token: str | None,
+    *,
+    action: str,
+    kind: str,
+    timeout=None,
+    bypass_cache: bool = False,
+) -> dict:
+    """Return the parsed render for ``payload``, served from the render cache when possible."""
+
+    token = _resolve_token(bria_api_token)
+    key = render_cache.make_key(BRIA_API_URL, payload, token)
+    result, cached = render_cache.get_or_compute(
+        key,
+        lambda: _parse_result(_call_bria(payload, token, action=action, kind=kind, timeout=timeout)),
+        bypass=bypass_cache,
+    )
+    return _with_local_copies(result, cached, image_mirror.submit(result["image_url"]), action=action)
+
+
+async def _arender(
+    payload: dict,
+    bria_api_token: str | None,
+    *,
+    action: str,
+    kind: str,
+    timeout=None,
+    bypass_cache: bool = False,
+) -> dict:
+    """Async counterpart of :func:`_render`; shares its cache and in-flight coalescing."""
+
+    token = _resolve_token(bria_api_token)
+
+    async def compute() -> dict:
+        return _parse_result(await _acall_bria(payload, token, action=action, kind=kind, timeout=timeout))
+
+    key = render_cache.make_key(BRIA_API_URL, payload, token)
+    result, cached = await render_cache.aget_or_compute(key, compute, bypass=bypass_cache)
+    return _with_local_copies(result, cached, await image_mirror.asubmit(result["image_url"]), action=action)
+
+
+def _with_local_copies(result: dict, cached: bool, local_url: str | None, *, action: str) -> dict:
+    if cached:
+        print(f"♻️ Bria {action} served from cache")
+    return {**result, "local_url": local_url, "thumbnails": image_mirror.thumbnail_urls(local_url)}
+
+
 STYLE_MAP = {
     "outline": (
         "black and white storyboard frame, clean line art, zero color, zero gray shading, "
@@ -106,11 +360,21 @@ def build_character_prompt(character_description: str, style: str) -> str:
     return prompt
 
 
+def _character_payload(character_description: str, style: str, aspect_ratio: str) -> dict:
+    return {
+        "prompt": build_character_prompt(character_description, style),
+        "sync": True,
+        "aspect_ratio": aspect_ratio,
+    }
+
+
 def generate_character(
     character_description: str,
     style: str = "realistic",
     aspect_ratio: str = "9:16",
     bria_api_token: str | None = None,
+    timeout: float | tuple[float, float] | None = None,
+    bypass_cache: bool = False,
 ):
     """
     Create an initial character image.
@@ -119,42 +383,29 @@ def generate_character(
       character_description: text from the LLM describing the character
       style: outline, realistic, 3d, anime
       aspect_ratio: default 9:16 for full body
+      timeout: optional (connect, read) override for this call
+      bypass_cache: skip the render cache lookup and always call Bria
 
     Returns:
       dict with image_url, seed, structured_prompt (dict), raw_structured_prompt (string)
     """
-    prompt = build_character_prompt(character_description, style)
-
-    payload = {
-        "prompt": prompt,
-        "sync": True,
-        "aspect_ratio": aspect_ratio,
-    }
+    payload = _character_payload(character_description, style, aspect_ratio)
 
     print("⏳ Generating character...")
-    try:
-        response = requests.post(BRIA_API_URL, json=payload, headers=_bria_headers(bria_api_token), timeout=60)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as exc:  # includes timeouts and HTTP errors
-        status = getattr(exc.response, "status_code", None)
-        raise RuntimeError(f"Bria character generation failed (status={status}): {exc}") from exc
-
-    data = response.json()["result"]
-    image_url = data["image_url"]
-    seed = data["seed"]
-    structured_prompt_str = data["structured_prompt"]
-    structured_prompt_dict = json.loads(structured_prompt_str)
+    result = _render(
+        payload,
+        bria_api_token,
+        action="character generation",
+        kind="character_generate",
+        timeout=timeout,
+        bypass_cache=bypass_cache,
+    )
 
     print("✅ Character generated")
-    print("🖼️ Image URL:", image_url)
-    print("🌱 Seed:", seed)
+    print("🖼️ Image URL:", result["image_url"])
+    print("🌱 Seed:", result["seed"])
 
-    return {
-        "image_url": image_url,
-        "seed": seed,
-        "structured_prompt": structured_prompt_dict,
-        "raw_structured_prompt": structured_prompt_str,
-    }
+    return result
 
 
 def refine_character(
@@ -163,6 +414,8 @@ def refine_character(
     seed: int,
     aspect_ratio: str = "9:16",
     bria_api_token: str | None = None,
+    timeout: float | tuple[float, float] | None = None,
+    bypass_cache: bool = False,
 ):
     """
     Refine an existing character.
@@ -171,6 +424,8 @@ def refine_character(
       edit_prompt: what to change (for example, 'change jacket to red leather and add glasses')
       previous_structured_prompt: dict or JSON string
       seed: from the character you are editing
+      timeout: optional (connect, read) override for this call
+      bypass_cache: skip the render cache lookup and always call Bria
 
     Returns:
       dict with image_url, seed, structured_prompt (dict), raw_structured_prompt (string)
@@ -189,43 +444,73 @@ def refine_character(
     }
 
     print("⏳ Refining character...")
-    response = requests.post(BRIA_API_URL, json=payload, headers=_bria_headers(bria_api_token))
-    if response.status_code >= 400:
-        try:
-            detail = response.json()
-        except Exception:  # pragma: no cover
-            detail = response.text
-        raise RuntimeError(f"Bria shot generation failed (status={response.status_code}): {detail}")
-    response.raise_for_status()
-
-    data = response.json()["result"]
-    image_url = data["image_url"]
-    new_seed = data["seed"]
-    structured_prompt_str_new = data["structured_prompt"]
-    structured_prompt_dict_new = json.loads(structured_prompt_str_new)
+    result = _render(
+        payload,
+        bria_api_token,
+        action="character refinement",
+        kind="character_refine",
+        timeout=timeout,
+        bypass_cache=bypass_cache,
+    )
 
     print("✅ Character refinement generated")
-    print("🖼️ New Image URL:", image_url)
-    print("🌱 Seed:", new_seed)
+    print("🖼️ New Image URL:", result["image_url"])
+    print("🌱 Seed:", result["seed"])
 
-    return {
-        "image_url": image_url,
-        "seed": new_seed,
-        "structured_prompt": structured_prompt_dict_new,
-        "raw_structured_prompt": structured_prompt_str_new,
-    }
+    return result
 
 
 # =========================
 # Shots using character reference images
 # =========================
 
+def _shot_payload(
+    shot_description: str, style: str, reference_image_urls: list[str] | None, aspect_ratio: str
+) -> dict:
+    images = (reference_image_urls or [])[:1]  # API currently documents max 1
+    payload = {
+        "prompt": build_storyboard_prompt(shot_description, style),
+        "sync": True,
+        "aspect_ratio": aspect_ratio,
+    }
+    if images:
+        payload["images"] = images
+    return payload
+
+
+def _shot_refine_payload(
+    edit_prompt: str,
+    previous_structured_prompt,
+    seed: int,
+    reference_image_urls: list[str] | None,
+    aspect_ratio: str,
+) -> dict:
+    if isinstance(previous_structured_prompt, dict):
+        structured_prompt_str = json.dumps(previous_structured_prompt)
+    else:
+        structured_prompt_str = previous_structured_prompt
+
+    images = (reference_image_urls or [])[:1]
+    payload = {
+        "prompt": edit_prompt,
+        "structured_prompt": structured_prompt_str,
+        "seed": seed,
+        "sync": True,
+        "aspect_ratio": aspect_ratio,
+    }
+    if images:
+        payload["images"] = images
+    return payload
+
+
 def generate_shot_with_refs(
     shot_description: str,
     style: str,
     reference_image_urls: list[str] | None = None,
     aspect_ratio: str = "16:9",
     bria_api_token: str | None = None,
+    timeout: float | tuple[float, float] | None = None,
+    bypass_cache: bool = False,
 ):
     """
     Generate a storyboard shot using one or more character reference images.
@@ -236,49 +521,29 @@ def generate_shot_with_refs(
       style: outline, realistic, 3d, anime
       reference_image_urls: list of URLs of character images (we will use the first)
       aspect_ratio: default 16:9 for a shot
+      timeout: optional (connect, read) override for this call
+      bypass_cache: skip the render cache lookup and always call Bria
 
     Returns:
       dict with image_url, seed, structured_prompt (dict), raw_structured_prompt (string)
     """
-    prompt = build_storyboard_prompt(shot_description, style)
-
-    images = reference_image_urls or []
-    if images:
-        images = images[:1]  # API currently documents max 1
-
-    payload = {
-        "prompt": prompt,
-        "sync": True,
-        "aspect_ratio": aspect_ratio,
-    }
-    if images:
-        payload["images"] = images
+    payload = _shot_payload(shot_description, style, reference_image_urls, aspect_ratio)
 
     print("⏳ Generating shot with character reference...")
-    response = requests.post(BRIA_API_URL, json=payload, headers=_bria_headers(bria_api_token))
-    if response.status_code >= 400:
-        try:
-            detail = response.json()
-        except Exception:  # pragma: no cover
-            detail = response.text
-        raise RuntimeError(f"Bria shot generation failed (status={response.status_code}): {detail}")
-
-    data = response.json()["result"]
-    image_url = data["image_url"]
-    seed = data["seed"]
-    structured_prompt_str = data["structured_prompt"]
-    structured_prompt_dict = json.loads(structured_prompt_str)
+    result = _render(
+        payload,
+        bria_api_token,
+        action="shot generation",
+        kind="shot_generate",
+        timeout=timeout,
+        bypass_cache=bypass_cache,
+    )
 
     print("✅ Shot generated")
-    print("🖼️ Image URL:", image_url)
-    print("🌱 Seed:", seed)
+    print("🖼️ Image URL:", result["image_url"])
+    print("🌱 Seed:", result["seed"])
 
-    return {
-        "image_url": image_url,
-        "seed": seed,
-        "structured_prompt": structured_prompt_dict,
-        "raw_structured_prompt": structured_prompt_str,
-    }
+    return result
 
 
 def refine_shot_with_refs(
@@ -288,6 +553,8 @@ def refine_shot_with_refs(
     reference_image_urls: list[str] | None = None,
     aspect_ratio: str = "16:9",
     bria_api_token: str | None = None,
+    timeout: float | tuple[float, float] | None = None,
+    bypass_cache: bool = False,
 ):
     """
     Refine an existing shot, optionally passing character reference images too.
@@ -300,51 +567,111 @@ def refine_shot_with_refs(
       seed: seed from the shot you are editing
       reference_image_urls: optional list of character reference URLs (we use at most one)
       aspect_ratio: default 16:9
+      timeout: optional (connect, read) override for this call
+      bypass_cache: skip the render cache lookup and always call Bria
 
     Returns:
       dict with image_url, seed, structured_prompt (dict), raw_structured_prompt (string)
     """
-    if isinstance(previous_structured_prompt, dict):
-        structured_prompt_str = json.dumps(previous_structured_prompt)
-    else:
-        structured_prompt_str = previous_structured_prompt
+    payload = _shot_refine_payload(edit_prompt, previous_structured_prompt, seed, reference_image_urls, aspect_ratio)
 
-    images = reference_image_urls or []
-    if images:
-        images = images[:1]
+    print("⏳ Refining shot with character reference...")
+    result = _render(
+        payload,
+        bria_api_token,
+        action="shot refinement",
+        kind="shot_refine",
+        timeout=timeout,
+        bypass_cache=bypass_cache,
+    )
 
-    payload = {
-        "prompt": edit_prompt,
-        "structured_prompt": structured_prompt_str,
-        "seed": seed,
-        "sync": True,
-        "aspect_ratio": aspect_ratio,
-    }
-    if images:
-        payload["images"] = images
+    print("✅ Shot refinement generated")
+    print("🖼️ New Image URL:", result["image_url"])
+    print("🌱 Seed:", result["seed"])
 
-    print("⏳ Refining shot with character reference...")
-    response = requests.post(BRIA_API_URL, json=payload, headers=_bria_headers(bria_api_token))
-    if response.status_code >= 400:
-        try:
-            detail = response.json()
-        except Exception:  # pragma: no cover
-            detail = response.text
-        raise RuntimeError(f"Bria shot refinement failed (status={response.status_code}): {detail}")
+    return result
 
-    data = response.json()["result"]
-    image_url = data["image_url"]
-    new_seed = data["seed"]
-    structured_prompt_str_new = data["structured_prompt"]
-    structured_prompt_dict_new = json.loads(structured_prompt_str_new)
 
-    print("✅ Shot refinement generated")
-    print("🖼️ New Image URL:", image_url)
-    print("🌱 Seed:", new_seed)
+# =========================
+# Async counterparts
+# =========================
+# Same inputs and return dicts as the sync functions above, but renders are submitted
+# with "sync": false and awaited through the shared status poller (see bria_status),
+# so no thread is held while Bria renders. Cache keys are shared with the sync path.
 
-    return {
-        "image_url": image_url,
-        "seed": new_seed,
-        "structured_prompt": structured_prompt_dict_new,
-        "raw_structured_prompt": structured_prompt_str_new,
-    }
+async def agenerate_character(
+    character_description: str,
+    style: str = "realistic",
+    aspect_ratio: str = "9:16",
+    bria_api_token: str | None = None,
+    timeout: float | tuple[float, float] | None = None,
+    bypass_cache: bool = False,
+):
+    """Async counterpart of :func:`generate_character`."""
+
+    payload = _character_payload(character_description, style, aspect_ratio)
+    print("⏳ Generating character (async)...")
+    result = await _arender(
+        payload,
+        bria_api_token,
+        action="character generation",
+        kind="character_generate",
+        timeout=timeout,
+        bypass_cache=bypass_cache,
+    )
+    print("✅ Character generated")
+    print("🖼️ Image URL:", result["image_url"])
+    return result
+
+
+async def agenerate_shot_with_refs(
+    shot_description: str,
+    style: str,
+    reference_image_urls: list[str] | None = None,
+    aspect_ratio: str = "16:9",
+    bria_api_token: str | None = None,
+    timeout: float | tuple[float, float] | None = None,
+    bypass_cache: bool = False,
+):
+    """Async counterpart of :func:`generate_shot_with_refs`."""
+
+    payload = _shot_payload(shot_description, style, reference_image_urls, aspect_ratio)
+    print("⏳ Generating shot with character reference (async)...")
+    result = await _arender(
+        payload,
+        bria_api_token,
+        action="shot generation",
+        kind="shot_generate",
+        timeout=timeout,
+        bypass_cache=bypass_cache,
+    )
+    print("✅ Shot generated")
+    print("🖼️ Image URL:", result["image_url"])
+    return result
+
+
+async def arefine_shot_with_refs(
+    edit_prompt: str,
+    previous_structured_prompt,
+    seed: int,
+    reference_image_urls: list[str] | None = None,
+    aspect_ratio: str = "16:9",
+    bria_api_token: str | None = None,
+    timeout: float | tuple[float, float] | None = None,
+    bypass_cache: bool = False,
+):
+    """Async counterpart of :func:`refine_shot_with_refs`."""
+
+    payload = _shot_refine_payload(edit_prompt, previous_structured_prompt, seed, reference_image_urls, aspect_ratio)
+    print("⏳ Refining shot with character reference (async)...")
+    result = await _arender(
+        payload,
+        bria_api_token,
+        action="shot refinement",
+        kind="shot_refine",
+        timeout=timeout,
+        bypass_cache=bypass_cache,
+    )
+    print("✅ Shot refinement generated")
+    print("🖼️ New Image URL:", result["image_url"])
+    return result
@@ -1,8 +1,17 @@
 """FastAPI application setup for AI Storyboard Maker."""
 
-from fastapi import FastAPI, HTTPException, status
+from contextlib import asynccontextmanager
+
+from typing import AsyncIterable, Iterable
+
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 
+from . import bria_transport
+from .bria_endpoints import bria_endpoints
+from .bria_limiter import bria_limiters
 from .settings import get_settings
 from .schemas import (
     ScriptIngestionRequest,
@@ -21,7 +30,15 @@ from .schemas import (
     CharacterUpdateResponse,
     ShotUpdateRequest,
     ShotUpdateResponse,
+    BatchUpdateRequest,
+    BatchUpdateResponse,
+    ShotUpdateAndGenerateRequest,
+    ShotUpdateAndGenerateResponse,
+    CharacterUpdateAndGenerateRequest,
+    CharacterUpdateAndGenerateResponse,
     FixtureLoadRequest,
+    JobStatus,
+    JobStatusResponse,
 )
 from .services import (
     ScriptIngestionService,
@@ -30,9 +47,60 @@ from .services import (
     ShotRefinementService,
     ShotEditService,
     SessionUpdateService,
+    UpdateAndRenderService,
+    StoryboardExportService,
 )
 from .fixtures.demo_session import demo_fixture
-from .session_store import session_store
+from .image_mirror import image_mirror, image_response, thumbnail_response
+from .jobs import job_manager
+from .render_cache import render_cache
+from .services import llm_clients
+from .services.edit_planner import edit_planner
+from .services.llm_cache import agent_output_cache
+from .services.llm_usage import llm_usage
+from .session_store import SessionVersionConflict, session_store
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    # Release pooled Bria and OpenAI connections on shutdown.
+    job_manager.shutdown()
+    image_mirror.shutdown()
+    bria_transport.close()
+    await bria_transport.aclose()
+    llm_clients.close()
+    await llm_clients.aclose()
+
+
+def _ndjson_line(event: str, record: BaseModel) -> str:
+    return f'{{"event": "{event}", "data": {record.model_dump_json()}}}\n'
+
+
+def _sse_line(event: str, record: BaseModel) -> str:
+    return f"event: {event}\ndata: {record.model_dump_json()}\n\n"
+
+
+def _event_stream_response(
+    events: Iterable[tuple[str, BaseModel]] | AsyncIterable[tuple[str, BaseModel]], request: Request
+) -> StreamingResponse:
+    """Encode ``(event, record)`` pairs as NDJSON, or as SSE when the client asks for it."""
+
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    encode = _sse_line if use_sse else _ndjson_line
+    if isinstance(events, AsyncIterable):
+
+        async def body():
+            async for event, record in events:
+                yield encode(event, record)
+
+        content = body()
+    else:
+        content = (encode(event, record) for event, record in events)
+    # Disable proxy buffering so each record reaches the browser immediately.
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(content, media_type=media_type, headers=headers)
 
 
 def create_app() -> FastAPI:
@@ -42,6 +110,7 @@ def create_app() -> FastAPI:
         title="AI Storyboard Maker API",
         version="0.1.0",
         description="Backend services for converting scripts into storyboard assets.",
+        lifespan=lifespan,
     )
 
     ingestion_service = ScriptIngestionService()
@@ -50,6 +119,8 @@ def create_app() -> FastAPI:
     shot_refinement_service = ShotRefinementService()
     shot_edit_service = ShotEditService()
     session_update_service = SessionUpdateService()
+    update_and_render_service = UpdateAndRenderService()
+    export_service = StoryboardExportService()
 
     app.add_middleware(
         CORSMiddleware,
@@ -59,6 +130,10 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    @app.exception_handler(SessionVersionConflict)
+    async def session_version_conflict(_: Request, exc: SessionVersionConflict):
+        return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
+
     @app.get("/health", tags=["system"])
     def healthcheck():
         """Simple readiness probe for deployment checks."""
@@ -71,17 +146,57 @@ def create_app() -> FastAPI:
             "llm_configured": settings.llm_configured,
         }
 
+    @app.get("/stats", tags=["system"])
+    def stats():
+        """Cache counters, OpenAI clients, LLM token usage, local shot-edit plans, Bria limits and circuit states."""
+
+        return {
+            "render_cache": render_cache.stats(),
+            "llm_cache": agent_output_cache.stats(),
+            "llm_clients": llm_clients.stats(),
+            "llm_usage": llm_usage.stats(),
+            "shot_edit_planner": edit_planner.stats(),
+            "bria_limits": bria_limiters.stats(),
+            "bria_endpoints": bria_endpoints.stats(),
+        }
+
+    @app.get("/images/{key}", tags=["assets"])
+    def get_image(key: str, request: Request):
+        """Serve a locally mirrored image (see ``local_url`` on assets)."""
+
+        return image_response(key, request)
+
+    @app.get("/images/{key}/thumb/{width}", tags=["assets"])
+    def get_image_thumbnail(key: str, width: int, request: Request):
+        """Serve a downscaled copy of a mirrored image (see ``thumbnails`` on assets)."""
+
+        return thumbnail_response(key, width, request)
+
+    @app.get("/session/{session_id}/export", response_class=StreamingResponse, tags=["assets"])
+    def export_storyboard(session_id: str):
+        """Stream a ZIP of all images, structured prompts and a PDF contact sheet."""
+
+        return StreamingResponse(
+            export_service.stream_zip(session_id),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="storyboard_{session_id}.zip"'},
+        )
+
     @app.post(
         "/script",
         response_model=ScriptIngestionResponse,
         tags=["pipeline"],
         status_code=status.HTTP_201_CREATED,
     )
-    def ingest_script(payload: ScriptIngestionRequest):
+    async def ingest_script(payload: ScriptIngestionRequest):
         if not payload.script.strip():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Script cannot be empty")
-        return ingestion_service.ingest_script(
-            script=payload.script, style=payload.style, openai_api_key=payload.openai_api_key
+        return await ingestion_service.ingest_script(
+            script=payload.script,
+            style=payload.style,
+            openai_api_key=payload.openai_api_key,
+            bypass_cache=payload.bypass_cache,
+            chunked=payload.chunked,
         )
 
     @app.post(
@@ -90,8 +205,8 @@ def create_app() -> FastAPI:
         tags=["pipeline"],
         status_code=status.HTTP_201_CREATED,
     )
-    def generate_characters(payload: CharacterGenerationRequest):
-        return character_generation_service.generate(payload)
+    async def generate_characters(payload: CharacterGenerationRequest):
+        return await character_generation_service.generate(payload)
 
     @app.post(
         "/shots/generate",
@@ -99,8 +214,18 @@ def create_app() -> FastAPI:
         tags=["pipeline"],
         status_code=status.HTTP_201_CREATED,
     )
-    def generate_shots(payload: ShotGenerationRequest):
-        return shot_generation_service.generate(payload)
+    async def generate_shots(payload: ShotGenerationRequest):
+        return await shot_generation_service.generate(payload)
+
+    @app.post(
+        "/shots/generate/stream",
+        tags=["pipeline"],
+        response_class=StreamingResponse,
+    )
+    async def generate_shots_stream(payload: ShotGenerationRequest, request: Request):
+        """Stream each shot as it finishes (NDJSON, or SSE when requested via Accept), then a summary."""
+
+        return _event_stream_response(await shot_generation_service.astream(payload), request)
 
     @app.post(
         "/shots/generate_one",
@@ -108,8 +233,8 @@ def create_app() -> FastAPI:
         tags=["pipeline"],
         status_code=status.HTTP_201_CREATED,
     )
-    def generate_single_shot(payload: SingleShotGenerationRequest):
-        return shot_generation_service.generate_single(payload)
+    async def generate_single_shot(payload: SingleShotGenerationRequest):
+        return await shot_generation_service.generate_single(payload)
 
     @app.post(
         "/shots/refine",
@@ -117,8 +242,8 @@ def create_app() -> FastAPI:
         tags=["pipeline"],
         status_code=status.HTTP_201_CREATED,
     )
-    def refine_shot(payload: ShotRefineRequest):
-        return shot_refinement_service.refine(payload)
+    async def refine_shot(payload: ShotRefineRequest):
+        return await shot_refinement_service.refine(payload)
 
     @app.post(
         "/shots/edit",
@@ -126,8 +251,8 @@ def create_app() -> FastAPI:
         tags=["pipeline"],
         status_code=status.HTTP_201_CREATED,
     )
-    def edit_shot(payload: ShotEditRequest):
-        return shot_edit_service.edit(payload)
+    async def edit_shot(payload: ShotEditRequest):
+        return await shot_edit_service.edit(payload)
 
     @app.post(
         "/characters/update",
@@ -147,6 +272,79 @@ def create_app() -> FastAPI:
     def update_shot(payload: ShotUpdateRequest):
         return session_update_service.update_shot(payload)
 
+    @app.post(
+        "/characters/update_and_generate",
+        response_model=CharacterUpdateAndGenerateResponse,
+        tags=["pipeline"],
+        status_code=status.HTTP_200_OK,
+    )
+    async def update_and_generate_character(payload: CharacterUpdateAndGenerateRequest):
+        """Save a character description and render it unless the existing image is still current."""
+
+        return await update_and_render_service.update_and_generate_character(payload)
+
+    @app.post(
+        "/shots/update_and_generate",
+        response_model=ShotUpdateAndGenerateResponse,
+        tags=["pipeline"],
+        status_code=status.HTTP_200_OK,
+    )
+    async def update_and_generate_shot(payload: ShotUpdateAndGenerateRequest):
+        """Save a shot description and render it unless the existing image is still current."""
+
+        return await update_and_render_service.update_and_generate_shot(payload)
+
+    @app.post(
+        "/session/batch_update",
+        response_model=BatchUpdateResponse,
+        tags=["pipeline"],
+        status_code=status.HTTP_200_OK,
+    )
+    def batch_update(payload: BatchUpdateRequest):
+        """Apply many shot inserts/updates/deletes and character edits in one atomic call."""
+
+        return session_update_service.apply_batch(payload)
+
+    @app.post(
+        "/jobs/shots",
+        response_model=JobStatus,
+        tags=["jobs"],
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+    def submit_shot_job(payload: ShotGenerationRequest):
+        """Queue a /shots/generate batch on the background worker pool and return its job id."""
+
+        events = shot_generation_service.stream(payload)
+        return job_manager.submit("shots", payload.session_id, events)
+
+    @app.post(
+        "/jobs/characters",
+        response_model=JobStatus,
+        tags=["jobs"],
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+    def submit_character_job(payload: CharacterGenerationRequest):
+        """Queue a /characters/generate batch on the background worker pool and return its job id."""
+
+        events = character_generation_service.stream(payload)
+        return job_manager.submit("characters", payload.session_id, events)
+
+    @app.get("/jobs/{job_id}", response_model=JobStatusResponse, tags=["jobs"])
+    def get_job(job_id: str):
+        job = job_manager.get(job_id)
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+        return job
+
+    @app.get("/jobs/{job_id}/events", response_class=StreamingResponse, tags=["jobs"])
+    async def stream_job_events(job_id: str, request: Request):
+        """Replay and follow a job's per-item records (NDJSON, or SSE via Accept), ending with its status."""
+
+        events = job_manager.subscribe(job_id)
+        if events is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+        return _event_stream_response(events, request)
+
     @app.post(
         "/debug/load_fixture",
         response_model=ScriptIngestionResponse,
@@ -0,0 +1,123 @@
+"""Circuit breakers and failover across equivalent Bria endpoints.
+
+``BRIA_API_URLS`` lists interchangeable image endpoints in order of preference.
+Each has its own circuit breaker:
+- closed: calls flow normally.
+- open: after ``BRIA_CIRCUIT_FAILURE_THRESHOLD`` consecutive failures (5xx or
+  transport errors), calls are refused for ``BRIA_CIRCUIT_RESET_SECONDS``.
+- half-open: one trial call is let through; its outcome closes or re-opens the circuit.
+
+A call goes to the first endpoint whose breaker admits it and fails over to the
+next one on a 5xx or a connection error. A read timeout is not failed over, because
+the endpoint may still be rendering the request. When every circuit is open it fails at once
+instead of tying up a worker thread on a dead upstream.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from .bria_retry import BriaCallError
+from .settings import get_settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(BriaCallError):
+    """Every endpoint's circuit is open; ``retry_after`` says when one will admit a trial call."""
+
+
+class CircuitBreaker:
+    def __init__(self, *, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may go through now (claiming the trial slot when half-open)."""
+
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit admits a trial call (0 when it already would)."""
+
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures}
+
+
+class Endpoint:
+    def __init__(self, url: str, breaker: CircuitBreaker) -> None:
+        self.url = url
+        self.breaker = breaker
+
+
+class EndpointPool:
+    def __init__(self, urls: list[str], *, failure_threshold: int, reset_seconds: float) -> None:
+        self.endpoints = [
+            Endpoint(url, CircuitBreaker(failure_threshold=failure_threshold, reset_seconds=reset_seconds))
+            for url in dict.fromkeys(urls)
+        ]
+
+    def available(self):
+        """Yield endpoints in preference order, skipping those whose circuit refuses the call."""
+
+        for endpoint in self.endpoints:
+            if endpoint.breaker.allow():
+                yield endpoint
+
+    def retry_in(self) -> float:
+        """Seconds until some endpoint would accept a call again."""
+
+        return min((endpoint.breaker.retry_in() for endpoint in self.endpoints), default=0.0)
+
+    def stats(self) -> list[dict]:
+        return [{"url": endpoint.url, **endpoint.breaker.snapshot()} for endpoint in self.endpoints]
+
+
+def _build_endpoint_pool() -> EndpointPool:
+    settings = get_settings()
+    return EndpointPool(
+        list(settings.bria_api_urls),
+        failure_threshold=settings.bria_circuit_failure_threshold,
+        reset_seconds=settings.bria_circuit_reset_seconds,
+    )
+
+
+bria_endpoints = _build_endpoint_pool()
@@ -0,0 +1,264 @@
+"""Adaptive per-token rate and concurrency limiting for Bria calls.
+
+Every API token gets its own :class:`AdaptiveLimiter`, combining a token bucket
+(requests per second) with an AIMD concurrency limit. The limit grows by roughly
+one slot per round of successful calls. It halves on a 429, a 5xx/transport
+error, or when latency climbs well above its running baseline. A 429 also halves
+the request rate and pauses the token for ``Retry-After`` seconds, so bursts
+back off before the whole batch fails.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import hashlib
+import threading
+import time
+
+from .settings import get_settings
+
+OK = "ok"
+THROTTLED = "throttled"
+ERROR = "error"
+NEUTRAL = "neutral"
+
+# Short and long EWMA weights for the latency signal.
+_FAST_ALPHA = 0.3
+_SLOW_ALPHA = 0.05
+# Latency is only trusted as a congestion signal after this many samples.
+_MIN_LATENCY_SAMPLES = 5
+# How often an async caller re-checks for a released slot.
+_ASYNC_RELEASE_POLL = 0.05
+
+
+class LimiterTimeout(RuntimeError):
+    """Raised when a call waited longer than allowed for a limiter slot."""
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds from a ``Retry-After`` header (seconds or HTTP date)."""
+
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def classify_status(status_code: int | None) -> str:
+    """Map an HTTP status (None for transport errors) to a limiter outcome."""
+
+    if status_code is None or status_code >= 500:
+        return ERROR
+    if status_code == 429:
+        return THROTTLED
+    if status_code >= 400:
+        return NEUTRAL
+    return OK
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        *,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        rate: float,
+        burst: int,
+        latency_tolerance: float,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._fast_latency: float | None = None
+        self._slow_latency: float | None = None
+        self._samples = 0
+        self._counts = {OK: 0, THROTTLED: 0, ERROR: 0, NEUTRAL: 0}
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _wait_time(self, now: float) -> float | None:
+        """Seconds until a slot could open, or None if only a release can open one."""
+
+        waits = []
+        if now < self._paused_until:
+            waits.append(self._paused_until - now)
+        if self.rate > 0 and self._tokens < 1:
+            waits.append((1 - self._tokens) / self.rate)
+        if self.in_flight >= int(self.limit):
+            return max(waits) if waits else None
+        return max(waits) if waits else 0.0
+
+    def _try_take(self, now: float) -> float | None:
+        """Take a slot if one is open (returning 0.0); otherwise return the wait, as in ``_wait_time``."""
+
+        self._refill(now)
+        wait = self._wait_time(now)
+        if wait == 0.0:
+            if self.rate > 0:
+                self._tokens -= 1
+            self.in_flight += 1
+        return wait
+
+    def acquire(self, timeout: float | None = None) -> float:
+        """Block until the token may start a call; return its start time for :meth:`release`."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self._try_take(now)
+                if wait == 0.0:
+                    return now
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise LimiterTimeout("Timed out waiting for a Bria request slot")
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    async def acquire_async(self, timeout: float | None = None) -> float:
+        """Async counterpart of :meth:`acquire` that waits without blocking the event loop."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                wait = self._try_take(now)
+            if wait == 0.0:
+                return now
+            # Releases only notify threads, so poll for them at a short interval.
+            wait = _ASYNC_RELEASE_POLL if wait is None else wait
+            if deadline is not None:
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise LimiterTimeout("Timed out waiting for a Bria request slot")
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+    def _decrease(self, started: float, now: float, *, throttle_rate: bool) -> None:
+        # Calls started before the last decrease saw the old limit; one reaction per window.
+        if started < self._last_decrease:
+            return
+        self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+        if throttle_rate and self.rate > 0:
+            self.rate = max(self.max_rate * 0.1, self.rate * self.decrease_factor)
+        self._last_decrease = now
+
+    def _observe_latency(self, latency: float) -> bool:
+        """Fold ``latency`` into the EWMAs; return True when it signals congestion."""
+
+        if self._fast_latency is None:
+            self._fast_latency = self._slow_latency = latency
+        else:
+            self._fast_latency += _FAST_ALPHA * (latency - self._fast_latency)
+            self._slow_latency += _SLOW_ALPHA * (latency - self._slow_latency)
+        self._samples += 1
+        return (
+            self._samples >= _MIN_LATENCY_SAMPLES
+            and self._fast_latency > self._slow_latency * self.latency_tolerance
+        )
+
+    def release(self, started: float, outcome: str, *, retry_after: float | None = None) -> None:
+        """Return a slot taken by :meth:`acquire` and adapt the limits to the call's outcome."""
+
+        with self._cond:
+            now = time.monotonic()
+            self.in_flight = max(0, self.in_flight - 1)
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+            if outcome == OK:
+                if self._observe_latency(now - started):
+                    self._decrease(started, now, throttle_rate=False)
+                else:
+                    self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+                    self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+            elif outcome == THROTTLED:
+                self._decrease(started, now, throttle_rate=True)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            elif outcome == ERROR:
+                self._decrease(started, now, throttle_rate=False)
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "rate_per_second": round(self.rate, 3),
+                "available_tokens": round(self._tokens, 2),
+                "paused_seconds": round(max(0.0, self._paused_until - now), 2),
+                "latency_ms": round(self._fast_latency * 1000) if self._fast_latency is not None else None,
+                "baseline_latency_ms": (
+                    round(self._slow_latency * 1000) if self._slow_latency is not None else None
+                ),
+                "outcomes": dict(self._counts),
+            }
+
+
+class LimiterRegistry:
+    """One :class:`AdaptiveLimiter` per Bria API token, created on first use."""
+
+    def __init__(self, **limiter_options) -> None:
+        self._options = limiter_options
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_token(self, token: str) -> AdaptiveLimiter:
+        with self._lock:
+            limiter = self._limiters.get(token)
+            if limiter is None:
+                limiter = AdaptiveLimiter(**self._options)
+                self._limiters[token] = limiter
+            return limiter
+
+    def stats(self) -> dict:
+        """Current limits keyed by a short fingerprint of each token (never the token itself)."""
+
+        with self._lock:
+            limiters = list(self._limiters.items())
+        return {
+            hashlib.sha256(token.encode("utf-8")).hexdigest()[:12]: limiter.snapshot()
+            for token, limiter in limiters
+        }
+
+
+def _build_limiter_registry() -> LimiterRegistry:
+    settings = get_settings()
+    return LimiterRegistry(
+        initial=settings.bria_initial_concurrency_per_token,
+        minimum=settings.bria_min_concurrency_per_token,
+        maximum=settings.bria_max_concurrency_per_token,
+        rate=settings.bria_rate_per_second,
+        burst=settings.bria_rate_burst,
+        latency_tolerance=settings.bria_latency_tolerance,
+    )
+
+
+bria_limiters = _build_limiter_registry()
@@ -0,0 +1,334 @@
+"""Retry and hedging policy for Bria calls.
+
+A failed call (429, 5xx, or a transport error before the request went out) is
+retried with full-jitter exponential backoff, honouring ``Retry-After``. A call
+that failed after it was sent, such as a read timeout, is final unless its
+policy sets ``retry_sent``: Bria may still be rendering it. Retries draw from a per-token
+budget, so an outage never multiplies upstream load. Optionally, a call still
+running past the p95 latency of its kind gets a duplicate ("hedge"), and
+whichever finishes first wins. Policies are set per call kind; see
+:func:`policy_for`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures import wait
+from typing import Awaitable, Callable, TypeVar
+
+from pydantic import BaseModel
+
+from .settings import get_settings
+
+T = TypeVar("T")
+
+CALL_KINDS = ("character_generate", "character_refine", "shot_generate", "shot_refine")
+
+# Latency samples kept per call kind for the hedging threshold.
+_LATENCY_WINDOW = 200
+_MIN_LATENCY_SAMPLES = 20
+
+
+class BriaCallError(RuntimeError):
+    """A single failed Bria request, with what is needed to decide on a retry."""
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        status_code: int | None = None,
+        retry_after: float | None = None,
+        sent: bool = False,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        # True when the call failed without a response after the request went out, e.g.
+        # a read timeout: Bria may still be rendering it, so resending could bill twice.
+        self.sent = sent
+
+    @property
+    def retryable(self) -> bool:
+        if self.status_code is None:
+            return not self.sent
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class RetryPolicy(BaseModel):
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    hedge: bool = False
+    hedge_min_delay: float = 5.0
+    # Also retry calls that failed after the request was sent (may bill a render twice).
+    retry_sent: bool = False
+
+    def allows_retry(self, error: BriaCallError) -> bool:
+        return error.retryable or (self.retry_sent and error.sent)
+
+    def backoff(self, attempt: int, retry_after: float | None) -> float | None:
+        """Delay before retry number ``attempt`` (1-based), or None if the server asked for too long."""
+
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def policy_for(kind: str) -> RetryPolicy:
+    """Default policy from settings, with ``BRIA_RETRY_OVERRIDES[kind]`` applied on top."""
+
+    settings = get_settings()
+    defaults = {
+        "max_attempts": settings.bria_retry_max_attempts,
+        "base_delay": settings.bria_retry_base_delay,
+        "max_delay": settings.bria_retry_max_delay,
+        "hedge": settings.bria_hedge_enabled,
+        "hedge_min_delay": settings.bria_hedge_min_delay,
+    }
+    return RetryPolicy.model_validate({**defaults, **settings.bria_retry_overrides.get(kind, {})})
+
+
+class RetryBudget:
+    """Allow retries up to ``ratio`` of recent requests, plus a small floor per second."""
+
+    def __init__(self, ratio: float, min_per_second: float, window: float = 10.0) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            allowed = self.min_per_second * self.window + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class LatencyTracker:
+    def __init__(self) -> None:
+        self._samples: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self) -> float | None:
+        with self._lock:
+            if len(self._samples) < _MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+_budgets: dict[str, RetryBudget] = {}
+_latencies: dict[str, LatencyTracker] = {kind: LatencyTracker() for kind in CALL_KINDS}
+_state_lock = threading.Lock()
+_hedge_executor: ThreadPoolExecutor | None = None
+
+
+def _budget_for(token: str) -> RetryBudget:
+    with _state_lock:
+        budget = _budgets.get(token)
+        if budget is None:
+            settings = get_settings()
+            budget = RetryBudget(settings.bria_retry_budget_ratio, settings.bria_retry_budget_min_per_second)
+            _budgets[token] = budget
+        return budget
+
+
+def _latency_for(kind: str) -> LatencyTracker:
+    with _state_lock:
+        return _latencies.setdefault(kind, LatencyTracker())
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _state_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=max(2, get_settings().bria_pool_maxsize), thread_name_prefix="bria-hedge"
+            )
+        return _hedge_executor
+
+
+def _run_attempt(attempt: Callable[[Callable[[], None]], T], latency: LatencyTracker, sent: threading.Event) -> T:
+    """Run ``attempt``, timing it from the moment it reports its request as sent.
+
+    Time spent queued in the rate limiter is neither recorded as latency nor counted
+    towards the hedging threshold.
+    """
+
+    sent_at: list[float] = []
+
+    def mark_sent() -> None:
+        sent_at.append(time.monotonic())
+        sent.set()
+
+    try:
+        result = attempt(mark_sent)
+    finally:
+        sent.set()
+    if sent_at:
+        latency.record(time.monotonic() - sent_at[0])
+    return result
+
+
+def _hedged(
+    attempt: Callable[[Callable[[], None]], T], policy: RetryPolicy, latency: LatencyTracker, budget: RetryBudget
+) -> T:
+    """Run ``attempt``; if it outlives the kind's p95 once sent, race it against one duplicate."""
+
+    threshold = latency.p95()
+    if threshold is None:
+        return _run_attempt(attempt, latency, threading.Event())
+    executor = _get_hedge_executor()
+    sent = threading.Event()
+    primary = executor.submit(_run_attempt, attempt, latency, sent)
+    sent.wait()
+    try:
+        return primary.result(timeout=max(threshold, policy.hedge_min_delay))
+    except FuturesTimeout:
+        pass
+    if not budget.try_spend():
+        return primary.result()
+    print(f"🏁 Bria call past p95 ({threshold:.1f}s); sending a hedged duplicate")
+    pending = {primary, executor.submit(_run_attempt, attempt, latency, threading.Event())}
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # The slower duplicate keeps running in the background; its result is dropped.
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call_with_retries(attempt: Callable[[Callable[[], None]], T], *, kind: str, token: str, action: str) -> T:
+    """Run one Bria request with the retry/hedging policy configured for ``kind``.
+
+    ``attempt`` performs a single request and must call the callback it receives right
+    before the request goes out (after any rate-limiter wait).
+    """
+
+    policy = policy_for(kind)
+    budget = _budget_for(token)
+    latency = _latency_for(kind)
+    for number in range(1, max(1, policy.max_attempts) + 1):
+        budget.record_request()
+        try:
+            if policy.hedge:
+                return _hedged(attempt, policy, latency, budget)
+            return _run_attempt(attempt, latency, threading.Event())
+        except BriaCallError as exc:
+            if not policy.allows_retry(exc) or number >= policy.max_attempts:
+                raise
+            delay = policy.backoff(number, exc.retry_after)
+            if delay is None or not budget.try_spend():
+                raise
+            print(f"🔁 Bria {action} failed (status={exc.status_code}); retry {number} in {delay:.1f}s")
+            time.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+async def _arun_attempt(
+    attempt: Callable[[Callable[[], None]], Awaitable[T]], latency: LatencyTracker, sent: asyncio.Event
+) -> T:
+    """Async counterpart of :func:`_run_attempt`."""
+
+    sent_at: list[float] = []
+
+    def mark_sent() -> None:
+        sent_at.append(time.monotonic())
+        sent.set()
+
+    try:
+        result = await attempt(mark_sent)
+    finally:
+        sent.set()
+    if sent_at:
+        latency.record(time.monotonic() - sent_at[0])
+    return result
+
+
+async def _ahedged(
+    attempt: Callable[[Callable[[], None]], Awaitable[T]],
+    policy: RetryPolicy,
+    latency: LatencyTracker,
+    budget: RetryBudget,
+) -> T:
+    """Async counterpart of :func:`_hedged`; the losing attempt is cancelled rather than abandoned."""
+
+    threshold = latency.p95()
+    if threshold is None:
+        return await _arun_attempt(attempt, latency, asyncio.Event())
+    sent = asyncio.Event()
+    primary = asyncio.ensure_future(_arun_attempt(attempt, latency, sent))
+    pending = {primary}
+    try:
+        await sent.wait()
+        done, _ = await asyncio.wait(pending, timeout=max(threshold, policy.hedge_min_delay))
+        if done or not budget.try_spend():
+            return await primary
+        print(f"🏁 Bria call past p95 ({threshold:.1f}s); sending a hedged duplicate")
+        pending.add(asyncio.ensure_future(_arun_attempt(attempt, latency, asyncio.Event())))
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def acall_with_retries(
+    attempt: Callable[[Callable[[], None]], Awaitable[T]], *, kind: str, token: str, action: str
+) -> T:
+    """Async counterpart of :func:`call_with_retries`; backoff sleeps do not hold a thread."""
+
+    policy = policy_for(kind)
+    budget = _budget_for(token)
+    latency = _latency_for(kind)
+    for number in range(1, max(1, policy.max_attempts) + 1):
+        budget.record_request()
+        try:
+            if policy.hedge:
+                return await _ahedged(attempt, policy, latency, budget)
+            return await _arun_attempt(attempt, latency, asyncio.Event())
+        except BriaCallError as exc:
+            if not policy.allows_retry(exc) or number >= policy.max_attempts:
+                raise
+            delay = policy.backoff(number, exc.retry_after)
+            if delay is None or not budget.try_spend():
+                raise
+            print(f"🔁 Bria {action} failed (status={exc.status_code}); retry {number} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
@@ -0,0 +1,175 @@
+"""Shared status polling for Bria renders submitted with ``"sync": false``.
+
+An async render is submitted once and then polled at its ``status_url`` until it
+completes. Rather than every coroutine running its own sleep loop, one
+:class:`StatusPoller` per event loop tracks every pending render. It wakes for
+whichever is due next and polls each due render in a task of its own, so hundreds
+of renders in flight cost a dictionary entry each rather than a thread each, and
+a status request that hangs (up to ``BRIA_STATUS_TIMEOUT``) delays only its own
+render.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from dataclasses import dataclass, field
+
+import httpx
+
+from . import bria_transport
+from .bria_retry import BriaCallError
+from .settings import get_settings
+
+IN_PROGRESS = "IN_PROGRESS"
+COMPLETED = "COMPLETED"
+# Consecutive failed status polls tolerated before the render is given up on.
+_MAX_POLL_ERRORS = 5
+_INTERVAL_GROWTH = 1.5
+
+
+@dataclass(eq=False)
+class _PendingRender:
+    status_url: str
+    headers: dict
+    action: str
+    future: asyncio.Future
+    deadline: float
+    interval: float
+    next_poll: float
+    errors: int = field(default=0)
+    polling: bool = field(default=False)
+
+
+class StatusPoller:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._pending: set[_PendingRender] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._polls: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def wait(self, status_url: str, headers: dict, *, action: str) -> dict:
+        """Resolve with the render's ``result`` block once its status is COMPLETED."""
+
+        settings = get_settings()
+        now = self._loop.time()
+        render = _PendingRender(
+            status_url=status_url,
+            headers=headers,
+            action=action,
+            future=self._loop.create_future(),
+            deadline=now + settings.bria_async_render_timeout,
+            interval=settings.bria_poll_initial_delay,
+            next_poll=now + settings.bria_poll_initial_delay,
+        )
+        self._pending.add(render)
+        if self._task is None:
+            self._task = self._loop.create_task(self._run())
+        self._wakeup.set()
+        try:
+            return await render.future
+        finally:
+            self._pending.discard(render)
+
+    def _schedule_next(self, render: _PendingRender) -> None:
+        render.interval = min(get_settings().bria_poll_max_interval, render.interval * _INTERVAL_GROWTH)
+        render.next_poll = self._loop.time() + render.interval
+
+    def _fail(self, render: _PendingRender, error: BriaCallError) -> None:
+        if not render.future.done():
+            render.future.set_exception(error)
+
+    async def _poll(self, render: _PendingRender) -> None:
+        if self._loop.time() > render.deadline:
+            self._fail(render, BriaCallError(f"Bria {render.action} timed out while rendering", sent=True))
+            return
+        error: httpx.HTTPError | None = None
+        try:
+            response = await bria_transport.aget_json(render.status_url, render.headers, timeout=_status_timeout())
+        except httpx.HTTPError as exc:
+            response, error = None, exc
+        if response is not None and response.status_code < 500:
+            if response.status_code >= 400:
+                self._fail(
+                    render,
+                    BriaCallError(
+                        f"Bria {render.action} status check failed (status={response.status_code}): {response.text}",
+                        status_code=response.status_code,
+                    ),
+                )
+                return
+            body = response.json()
+            status = str(body.get("status", "")).upper()
+            if status == COMPLETED:
+                if not render.future.done():
+                    render.future.set_result(body["result"])
+                return
+            if status != IN_PROGRESS:
+                # ERROR / UNKNOWN: the render itself failed upstream; resubmitting may succeed.
+                self._fail(
+                    render,
+                    BriaCallError(f"Bria {render.action} failed ({status}): {body.get('error')}", status_code=502),
+                )
+                return
+            render.errors = 0
+        else:
+            render.errors += 1
+            if render.errors >= _MAX_POLL_ERRORS:
+                detail = repr(error) if response is None else f"status={response.status_code}"
+                self._fail(render, BriaCallError(f"Bria {render.action} status check failed: {detail}", sent=True))
+                return
+        self._schedule_next(render)
+
+    async def _poll_in_task(self, render: _PendingRender) -> None:
+        try:
+            await self._poll(render)
+        except Exception as exc:  # e.g. a malformed status body: fail that render, keep polling the rest.
+            self._fail(render, BriaCallError(f"Bria {render.action} status check failed: {exc!r}", sent=True))
+        finally:
+            render.polling = False
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            live = [render for render in self._pending if not render.future.done()]
+            if not live:
+                self._task = None
+                return
+            now = self._loop.time()
+            idle = [render for render in live if not render.polling]
+            for render in idle:
+                if render.next_poll <= now:
+                    render.polling = True
+                    task = self._loop.create_task(self._poll_in_task(render))
+                    self._polls.add(task)
+                    task.add_done_callback(self._polls.discard)
+            waiting = [render.next_poll for render in idle if not render.polling]
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(waiting) - now if waiting else None)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _status_timeout() -> tuple[float, float]:
+    settings = get_settings()
+    return (settings.bria_connect_timeout, settings.bria_status_timeout)
+
+
+_pollers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, StatusPoller]" = weakref.WeakKeyDictionary()
+
+
+def get_status_poller() -> StatusPoller:
+    """Return the poller bound to the running event loop."""
+
+    loop = asyncio.get_running_loop()
+    poller = _pollers.get(loop)
+    if poller is None:
+        poller = StatusPoller(loop)
+        _pollers[loop] = poller
+    return poller
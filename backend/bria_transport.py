@@ -0,0 +1,148 @@
+"""Shared, pooled HTTP transport for Bria API calls.
+
+A single ``requests.Session`` (sync) and one ``httpx.AsyncClient`` per event loop
+(async) are reused by every Bria call so TCP/TLS connections to the API host are
+kept alive between renders instead of being re-established per request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+
+import httpx
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from .settings import get_settings
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def default_timeout() -> tuple[float, float]:
+    """Return the ``(connect, read)`` timeout applied when a call does not pass its own."""
+
+    settings = get_settings()
+    return (settings.bria_connect_timeout, settings.bria_read_timeout)
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide keep-alive session used for sync Bria calls."""
+
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            settings = get_settings()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=settings.bria_pool_maxsize,
+                pool_block=True,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async client bound to the running event loop."""
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        settings = get_settings()
+        connect, read = default_timeout()
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.bria_pool_maxsize,
+                max_keepalive_connections=settings.bria_pool_maxsize,
+                keepalive_expiry=settings.bria_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(read, connect=connect),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def failed_before_send(exc: Exception) -> bool:
+    """True if ``exc`` was raised before the request reached Bria.
+
+    Only then can a render POST be resent without the risk of Bria rendering (and
+    billing) it twice. Failed connects and connect or pool timeouts qualify. Read
+    timeouts and connections dropped mid-exchange do not: Bria may already have
+    accepted the render.
+    """
+
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        cause = exc.args[0] if exc.args else None
+        cause = getattr(cause, "reason", None) or cause
+        return not isinstance(cause, urllib3.exceptions.ProtocolError)
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def post_json(
+    url: str,
+    payload: dict,
+    headers: dict,
+    *,
+    timeout: float | tuple[float, float] | None = None,
+) -> requests.Response:
+    """POST a JSON payload through the shared session."""
+
+    return get_session().post(url, json=payload, headers=headers, timeout=timeout or default_timeout())
+
+
+async def apost_json(
+    url: str,
+    payload: dict,
+    headers: dict,
+    *,
+    timeout: float | tuple[float, float] | None = None,
+) -> httpx.Response:
+    """Async counterpart of :func:`post_json` using the loop's pooled client."""
+
+    if isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    return await get_async_client().post(url, json=payload, headers=headers, **kwargs)
+
+
+async def aget_json(
+    url: str,
+    headers: dict,
+    *,
+    timeout: float | tuple[float, float] | None = None,
+) -> httpx.Response:
+    """GET a JSON resource (e.g. a render status URL) with the loop's pooled client."""
+
+    if isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    return await get_async_client().get(url, headers=headers, **kwargs)
+
+
+def close() -> None:
+    """Close the shared sync session (used on application shutdown)."""
+
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+async def aclose() -> None:
+    """Close the async client bound to the running event loop, if any."""
+
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
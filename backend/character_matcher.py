@@ -0,0 +1,112 @@
+"""Fast character-name matching against free-text shot descriptions.
+
+A :class:`CharacterMatcher` is compiled once per cast and cached on ``SessionData``
+(see ``SessionData.character_matcher``), so services no longer loop over every
+character, or rebuild token regexes, for every description they scan.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Name tokens shorter than this ("Al", "de") are too ambiguous to count as a mention.
+_MIN_TOKEN_LENGTH = 3
+
+
+def _trie_pattern(patterns: Iterable[str]) -> str:
+    """Compile patterns into one trie-shaped regex that prefers the longest match.
+
+    Shared prefixes are matched once, so the engine does a few character checks per
+    position instead of trying every alternative in turn.
+    """
+
+    trie: dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A pattern ends here: the longer continuations are optional (and tried first).
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class _PatternSet:
+    """Case-insensitive substring search for many patterns in one regex scan.
+
+    A zero-width lookahead is tried at every position and reports the longest pattern
+    starting there; every shorter pattern that also starts there is one of its
+    prefixes, which are precomputed. Together this reports exactly the patterns
+    ``pattern in text`` would, without one scan per pattern.
+    """
+
+    def __init__(self, owners: Dict[str, Set[str]]) -> None:
+        patterns = sorted(owners, key=len, reverse=True)
+        self._regex = re.compile(f"(?=({_trie_pattern(patterns)}))") if patterns else None
+        self._closure: Dict[str, Set[str]] = {}
+        for pattern in patterns:
+            names: Set[str] = set()
+            for end in range(1, len(pattern) + 1):
+                names |= owners.get(pattern[:end], set())
+            self._closure[pattern] = names
+
+    def search(self, text: str) -> Set[str]:
+        if self._regex is None or not text:
+            return set()
+        found: Set[str] = set()
+        for pattern in {m.group(1) for m in self._regex.finditer(text.lower())}:
+            if pattern:
+                found |= self._closure[pattern]
+        return found
+
+
+class CharacterMatcher:
+    def __init__(self, names: Iterable[str]) -> None:
+        self.key: Tuple[str, ...] = tuple(names)
+        self.names: List[str] = list(dict.fromkeys(self.key))
+        self._by_normalized: Dict[str, str] = {}
+        full: Dict[str, Set[str]] = {}
+        fuzzy: Dict[str, Set[str]] = {}
+        for name in self.names:
+            lowered = name.lower()
+            self._by_normalized.setdefault(lowered.strip(), name)
+            if not lowered:
+                continue
+            full.setdefault(lowered, set()).add(name)
+            fuzzy.setdefault(lowered, set()).add(name)
+            for token in re.split(r"[\s\-]+", lowered):
+                if len(token) >= _MIN_TOKEN_LENGTH:
+                    fuzzy.setdefault(token, set()).add(name)
+        self._full = _PatternSet(full)
+        self._fuzzy = _PatternSet(fuzzy)
+
+    def canonical(self, name: str) -> str | None:
+        """Return the cast spelling of ``name`` (case-insensitive), or None if unknown."""
+
+        return self._by_normalized.get(name.lower().strip())
+
+    def find(self, text: str, *, fuzzy: bool = False) -> List[str]:
+        """Names mentioned in ``text``, in cast order.
+
+        By default a character matches when its full name appears. With ``fuzzy`` any
+        meaningful name token also matches (e.g. "Dorothy" for "Dorothy Gale").
+        """
+
+        found = (self._fuzzy if fuzzy else self._full).search(text)
+        return [name for name in self.names if name in found]
+
+
+@lru_cache(maxsize=128)
+def matcher_for(names: Tuple[str, ...]) -> CharacterMatcher:
+    """Return a compiled matcher for a cast, shared by every session with the same names."""
+
+    return CharacterMatcher(names)
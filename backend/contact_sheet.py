@@ -0,0 +1,154 @@
+"""Paginated PDF contact sheets written one page at a time.
+
+Frames are laid out on a fixed grid; as soon as a page is full it is JPEG-encoded
+and appended to the PDF, so memory holds at most one page of tiles no matter how
+many frames the storyboard has. The PDF is written sequentially (objects first,
+cross-reference table at the end) and never needs to seek.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import BinaryIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+# A4 landscape: 842 x 595 pt, rasterized at ~150 dpi.
+_PAGE_POINTS = (842, 595)
+_PAGE_PIXELS = (1754, 1240)
+_MARGIN = 48
+_HEADER = 64
+_CAPTION = 36
+_GUTTER = 24
+
+
+class _PdfWriter:
+    """Minimal append-only PDF writer for full-page JPEG images."""
+
+    def __init__(self, fp: BinaryIO) -> None:
+        self.fp = fp
+        self.position = 0
+        self._offsets: dict[int, int] = {}
+        self._next_id = 3  # 1 = catalog, 2 = page tree (written on close)
+        self._page_ids: list[int] = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes) -> None:
+        self.fp.write(data)
+        self.position += len(data)
+
+    def _object(self, obj_id: int, body: bytes, stream: bytes | None = None) -> None:
+        self._offsets[obj_id] = self.position
+        self._write(b"%d 0 obj\n" % obj_id + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def _reserve(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def add_page(self, jpeg: bytes, size: tuple[int, int]) -> None:
+        image_id, content_id, page_id = self._reserve(), self._reserve(), self._reserve()
+        width, height = _PAGE_POINTS
+        self._object(
+            image_id,
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+            b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>" % (size[0], size[1], len(jpeg)),
+            jpeg,
+        )
+        content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (width, height)
+        self._object(content_id, b"<< /Length %d >>" % len(content), content)
+        self._object(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /XObject << /Im0 %d 0 R >> >> "
+            b"/Contents %d 0 R >>" % (width, height, image_id, content_id),
+        )
+        self._page_ids.append(page_id)
+
+    def close(self) -> None:
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self._page_ids)
+        self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._page_ids)))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_at = self.position
+        count = self._next_id
+        lines = [b"xref\n0 %d\n" % count, b"0000000000 65535 f \n"]
+        for obj_id in range(1, count):
+            lines.append(b"%010d 00000 n \n" % self._offsets[obj_id])
+        self._write(b"".join(lines))
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref_at))
+
+
+class ContactSheet:
+    """Lay out captioned frames on a ``columns`` x ``rows`` grid per page."""
+
+    def __init__(self, fp: BinaryIO, *, title: str, columns: int = 4, rows: int = 3, quality: int = 85) -> None:
+        self.title = title
+        self.columns = max(1, columns)
+        self.rows = max(1, rows)
+        self.quality = quality
+        self._pdf = _PdfWriter(fp)
+        self._font = ImageFont.load_default(size=22)
+        self._page: Image.Image | None = None
+        self._slot = 0
+        self._pages = 0
+        page_width, page_height = _PAGE_PIXELS
+        self._cell = (
+            (page_width - 2 * _MARGIN - (self.columns - 1) * _GUTTER) // self.columns,
+            (page_height - 2 * _MARGIN - _HEADER - (self.rows - 1) * _GUTTER) // self.rows,
+        )
+
+    @property
+    def tile_size(self) -> tuple[int, int]:
+        """Largest image size that fits a cell; callers can pre-shrink frames to it."""
+
+        return self._cell[0], self._cell[1] - _CAPTION
+
+    def _new_page(self) -> Image.Image:
+        page = Image.new("RGB", _PAGE_PIXELS, "white")
+        ImageDraw.Draw(page).text(
+            (_MARGIN, _MARGIN), f"{self.title} - page {self._pages + 1}", fill="black", font=self._font
+        )
+        return page
+
+    def add(self, tile: Image.Image | None, caption: str) -> None:
+        """Place one frame (``None`` draws an "image unavailable" placeholder)."""
+
+        if self._page is None:
+            self._page = self._new_page()
+        column, row = self._slot % self.columns, self._slot // self.columns
+        left = _MARGIN + column * (self._cell[0] + _GUTTER)
+        top = _MARGIN + _HEADER + row * (self._cell[1] + _GUTTER)
+        box_width, box_height = self.tile_size
+        draw = ImageDraw.Draw(self._page)
+        if tile is None:
+            draw.rectangle((left, top, left + box_width, top + box_height), outline="gray", fill="#eeeeee")
+            draw.text((left + 12, top + 12), "image unavailable", fill="gray", font=self._font)
+        else:
+            if tile.width > box_width or tile.height > box_height:
+                tile = tile.copy()
+                tile.thumbnail((box_width, box_height))
+            offset = (left + (box_width - tile.width) // 2, top + (box_height - tile.height) // 2)
+            self._page.paste(tile.convert("RGB"), offset)
+        draw.text((left, top + box_height + 8), caption, fill="black", font=self._font)
+        self._slot += 1
+        if self._slot == self.columns * self.rows:
+            self._flush_page()
+
+    def _flush_page(self) -> None:
+        if self._page is None:
+            return
+        buffer = io.BytesIO()
+        self._page.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+        self._pdf.add_page(buffer.getvalue(), self._page.size)
+        self._page = None
+        self._slot = 0
+        self._pages += 1
+
+    def close(self) -> None:
+        self._flush_page()
+        if self._pages == 0:
+            self._page = self._new_page()
+            self._flush_page()
+        self._pdf.close()
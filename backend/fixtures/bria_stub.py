@@ -0,0 +1,121 @@
+"""Local stand-in for the Bria image API, for offline runs and failover testing.
+
+Run ``python -m backend.fixtures.bria_stub --port 8765`` and list
+``http://127.0.0.1:8765/v2/image/generate`` in ``BRIA_API_URLS``. A POST with
+``"sync": true`` returns a ``result`` block after ``--sync-seconds`` (default: at
+once). Its ``image_url`` points at a flat PNG served by the stub itself, colored
+by the seed.
+
+With ``"sync": false`` the stub answers 202 with a ``request_id`` and
+``status_url``. Polling the status URL reports ``IN_PROGRESS`` until
+``--render-seconds`` have passed, then ``COMPLETED`` with the same ``result`` block.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+_SIZES = {"16:9": (1024, 576), "9:16": (576, 1024)}
+
+# request_id -> (ready_at, result) for renders submitted with "sync": false
+_renders: dict[str, tuple[float, dict]] = {}
+_renders_lock = threading.Lock()
+
+
+def _png(seed: int, aspect_ratio: str) -> bytes:
+    rng = random.Random(seed)
+    color = tuple(rng.randrange(40, 220) for _ in range(3))
+    buffer = io.BytesIO()
+    Image.new("RGB", _SIZES.get(aspect_ratio, (768, 768)), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # noqa: N802 (http.server naming)
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        seed = int(payload.get("seed") or random.randrange(1, 2**31))
+        aspect_ratio = payload.get("aspect_ratio", "1:1")
+        structured_prompt = payload.get("structured_prompt") or json.dumps(
+            {"short_description": payload.get("prompt", ""), "aspect_ratio": aspect_ratio}
+        )
+        host = self.headers.get("Host", f"127.0.0.1:{self.server.server_port}")
+        result = {
+            "image_url": f"http://{host}/images/{seed}_{aspect_ratio.replace(':', 'x')}.png",
+            "seed": seed,
+            "structured_prompt": structured_prompt,
+        }
+        if payload.get("sync", True):
+            time.sleep(self.server.sync_seconds)
+            self._send(200, json.dumps({"result": result}).encode("utf-8"), "application/json")
+            return
+        request_id = uuid.uuid4().hex
+        with _renders_lock:
+            _renders[request_id] = (time.monotonic() + self.server.render_seconds, result)
+        body = {"request_id": request_id, "status_url": f"http://{host}/v2/status/{request_id}"}
+        self._send(202, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _send_status(self, request_id: str) -> None:
+        with _renders_lock:
+            render = _renders.get(request_id)
+        if render is None:
+            body = {"request_id": request_id, "status": "UNKNOWN"}
+        elif time.monotonic() < render[0]:
+            body = {"request_id": request_id, "status": "IN_PROGRESS"}
+        else:
+            body = {"request_id": request_id, "status": "COMPLETED", "result": render[1]}
+        self._send(200, json.dumps(body).encode("utf-8"), "application/json")
+
+    def do_GET(self):  # noqa: N802
+        if self.path.startswith("/v2/status/"):
+            self._send_status(self.path.rsplit("/", 1)[-1])
+            return
+        name = self.path.rsplit("/", 1)[-1].removesuffix(".png")
+        try:
+            seed, ratio = name.split("_", 1)
+            body = _png(int(seed), ratio.replace("x", ":"))
+        except ValueError:
+            self._send(404, b"not found", "text/plain")
+            return
+        self._send(200, body, "image/png")
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # socketserver's default backlog of 5 resets connections under load tests.
+    request_queue_size = 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--render-seconds", type=float, default=2.0, help="Duration of async renders.")
+    parser.add_argument("--sync-seconds", type=float, default=0.0, help="Delay before answering sync renders.")
+    args = parser.parse_args()
+    server = _Server((args.host, args.port), _Handler)
+    server.render_seconds = args.render_seconds
+    server.sync_seconds = args.sync_seconds
+    print(f"Bria stub listening on http://{args.host}:{args.port}/v2/image/generate")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
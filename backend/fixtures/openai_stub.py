@@ -0,0 +1,82 @@
+"""Local stand-in for the OpenAI chat-completions API, for benchmarks and load tests.
+
+Run ``python -m backend.fixtures.openai_stub --port 8766`` and set
+``OPENAI_BASE_URL=http://127.0.0.1:8766/v1``. Every completion is answered after
+``--delay-seconds`` (default: at once). Shot-agent calls get a fixed "refine"
+decision; every other agent gets an empty JSON object, so ingestion is not
+covered.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_SHOT_DECISION = {
+    "action": "refine",
+    "shot_description": None,
+    "edit_prompt": "make it night",
+    "use_reference_images": False,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling shows up in timings
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per call.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):  # noqa: N802 (http.server naming)
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        time.sleep(self.server.delay_seconds)
+        prompts = " ".join(str(message.get("content", "")) for message in payload.get("messages", []))
+        content = _SHOT_DECISION if "refine or regenerate" in prompts else {}
+        body = json.dumps(
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": json.dumps(content)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--delay-seconds", type=float, default=0.0, help="Model latency per completion.")
+    args = parser.parse_args()
+    server = _Server((args.host, args.port), _Handler)
+    server.delay_seconds = args.delay_seconds
+    print(f"OpenAI stub listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Thumbnail derivatives of mirrored images.
+
+Each blob in the image mirror gets downscaled copies (WebP by default) at the widths
+in ``IMAGE_THUMBNAIL_WIDTHS``. Resizing and encoding run in a process pool so the
+Pillow work never occupies request threads or the event loop.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+_MEDIA_TYPES = {"webp": "image/webp", "avif": "image/avif", "jpeg": "image/jpeg"}
+# The pool starts lazily inside a process already running threads; a forked child could
+# inherit a lock held at fork time and deadlock. Forkserver children come from a clean
+# single-threaded server process instead.
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def render_derivatives(source: str, targets: list[tuple[int, str]], fmt: str, quality: int) -> list[int]:
+    """Write a downscaled copy of ``source`` for each ``(width, path)``; return the widths written.
+
+    Runs inside a worker process. Images narrower than a target width are re-encoded
+    at their own size rather than upscaled.
+    """
+
+    from PIL import Image
+
+    written: list[int] = []
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in {"RGB", "RGBA"}:
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        # Largest first, so each smaller size is resampled from a closer source.
+        current = image
+        for width, path in sorted(targets, reverse=True):
+            if os.path.exists(path):
+                continue
+            if current.width > width:
+                height = max(1, round(current.height * width / current.width))
+                current = current.resize((width, height), Image.LANCZOS)
+            options = {"quality": quality}
+            if fmt == "webp":
+                options["method"] = 4
+            tmp = f"{path}.{os.getpid()}.tmp"
+            current.save(tmp, format=fmt.upper(), **options)
+            os.replace(tmp, path)
+            written.append(width)
+    return written
+
+
+class DerivativeStore:
+    def __init__(self, root: Path, *, widths: tuple[int, ...], fmt: str, quality: int, workers: int) -> None:
+        self.root = root
+        self.widths = tuple(sorted(set(widths)))
+        self.fmt = fmt
+        self.quality = quality
+        self.workers = workers
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES.get(self.fmt, f"image/{self.fmt}")
+
+    def path(self, digest: str, width: int) -> Path:
+        return self.root / digest[:2] / f"{digest}_{width}.{self.fmt}"
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, self.workers), mp_context=multiprocessing.get_context(_START_METHOD)
+                )
+            return self._executor
+
+    def _done(self, digest: str, future: Future) -> None:
+        with self._lock:
+            self._inflight.pop(digest, None)
+        exc = future.exception()
+        if exc is not None:
+            print(f"⚠️ Thumbnail generation failed for {digest}: {exc}")
+
+    def submit(self, digest: str, source: Path) -> Future | None:
+        """Queue every missing derivative of ``digest``; return the pending future, if any."""
+
+        targets = [(width, str(self.path(digest, width))) for width in self.widths]
+        targets = [(width, path) for width, path in targets if not os.path.exists(path)]
+        if not targets:
+            return None
+        executor = self._get_executor()
+        with self._lock:
+            future = self._inflight.get(digest)
+            if future is not None:
+                return future
+            (self.root / digest[:2]).mkdir(parents=True, exist_ok=True)
+            future = executor.submit(render_derivatives, str(source), targets, self.fmt, self.quality)
+            self._inflight[digest] = future
+        # Registered outside the lock: the callback runs inline if the future already finished.
+        future.add_done_callback(lambda f: self._done(digest, f))
+        return future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
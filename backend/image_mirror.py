@@ -0,0 +1,333 @@
+"""Local content-addressed mirror of generated images.
+
+Every Bria ``image_url`` is downloaded in the background and stored once under the
+SHA-256 of its bytes. Assets carry a stable ``local_url`` (``/images/<key>``, where
+``key`` hashes the remote URL) that the API serves from disk with a strong ETag,
+long-lived caching and byte-range support, so the browser no longer depends on
+remote latency or on the remote URL still being valid.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from fastapi import HTTPException, Request, status
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+
+from . import bria_transport
+from .image_derivatives import DerivativeStore
+from .settings import get_settings
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+_CHUNK = 64 * 1024
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class ImageMirror:
+    def __init__(
+        self,
+        root: str | None,
+        *,
+        workers: int = 4,
+        wait_seconds: float = 10.0,
+        thumbnail_widths: tuple[int, ...] = (),
+        thumbnail_format: str = "webp",
+        thumbnail_quality: int = 80,
+        thumbnail_workers: int = 2,
+    ) -> None:
+        self.root = Path(root) if root else None
+        self.workers = workers
+        self.wait_seconds = wait_seconds
+        self.derivatives = (
+            DerivativeStore(
+                self.root / "derived",
+                widths=thumbnail_widths,
+                fmt=thumbnail_format,
+                quality=thumbnail_quality,
+                workers=thumbnail_workers,
+            )
+            if self.root is not None and thumbnail_widths
+            else None
+        )
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    # ---- storage layout ----
+
+    def _ref_path(self, key: str) -> Path:
+        return self.root / "refs" / key[:2] / f"{key}.json"
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def _read_ref(self, key: str) -> dict | None:
+        try:
+            return json.loads(self._ref_path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_ref(self, key: str, ref: dict) -> None:
+        path = self._ref_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(ref), encoding="utf-8")
+        os.replace(tmp, path)
+
+    # ---- downloading ----
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="mirror")
+            return self._executor
+
+    def _download(self, key: str, url: str) -> dict:
+        tmp = self.root / "blobs" / f".{key}.{threading.get_ident()}.tmp"
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with bria_transport.get_session().get(
+                url, stream=True, timeout=bria_transport.default_timeout()
+            ) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "application/octet-stream")
+                with tmp.open("wb") as handle:
+                    for chunk in response.iter_content(_CHUNK):
+                        digest.update(chunk)
+                        handle.write(chunk)
+                        size += len(chunk)
+            blob = self.blob_path(digest.hexdigest())
+            if blob.exists():
+                tmp.unlink()
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, blob)
+        finally:
+            tmp.unlink(missing_ok=True)
+        ref = {"url": url, "digest": digest.hexdigest(), "content_type": content_type, "size": size}
+        self._write_ref(key, ref)
+        if self.derivatives is not None:
+            self.derivatives.submit(ref["digest"], self.blob_path(ref["digest"]))
+        return ref
+
+    def _run(self, key: str, url: str) -> dict | None:
+        try:
+            return self._download(key, url)
+        except (requests.RequestException, OSError) as exc:
+            print(f"⚠️ Image mirror download failed for {url}: {exc}")
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _schedule(self, key: str, url: str) -> Future:
+        executor = self._get_executor()
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = executor.submit(self._run, key, url)
+                self._inflight[key] = future
+            return future
+
+    def submit(self, url: str | None) -> str | None:
+        """Queue ``url`` for mirroring and return its local URL (None when disabled)."""
+
+        if not self.enabled or not url:
+            return None
+        key = url_key(url)
+        ref = self._read_ref(key)
+        if ref is None or not ref.get("digest"):
+            if ref is None:
+                # Remember the source first so the image can still be fetched after a restart.
+                self._write_ref(key, {"url": url, "digest": None})
+            self._schedule(key, url)
+        return f"/images/{key}"
+
+    async def asubmit(self, url: str | None) -> str | None:
+        """Async counterpart of :meth:`submit`; the ref reads and writes run on a worker thread."""
+
+        if not self.enabled or not url:
+            return None
+        return await asyncio.to_thread(self.submit, url)
+
+    def thumbnail_urls(self, local_url: str | None) -> dict[str, str]:
+        """Map each configured thumbnail width to its URL under ``local_url``."""
+
+        if not local_url or self.derivatives is None:
+            return {}
+        return {str(width): f"{local_url}/thumb/{width}" for width in self.derivatives.widths}
+
+    def resolve_thumbnail(self, key: str, width: int) -> tuple[Path, str] | None:
+        """Return ``(path, etag)`` of a thumbnail, rendering it now if it is missing."""
+
+        if self.derivatives is None or width not in self.derivatives.widths:
+            return None
+        ref = self.resolve(key)
+        digest = ref.get("digest") if ref else None
+        if not digest or not self.blob_path(digest).exists():
+            return None
+        path = self.derivatives.path(digest, width)
+        if not path.exists():
+            future = self.derivatives.submit(digest, self.blob_path(digest))
+            if future is not None:
+                try:
+                    future.result(timeout=self.wait_seconds)
+                except Exception:  # pylint: disable=broad-except
+                    return None
+        return (path, f"{digest}-{width}") if path.exists() else None
+
+    def resolve(self, key: str) -> dict | None:
+        """Return the stored ref for ``key``, waiting briefly for an in-flight download."""
+
+        if not self.enabled or not _KEY_RE.match(key):
+            return None
+        ref = self._read_ref(key)
+        if ref is None:
+            return None
+        if not ref.get("digest") or not self.blob_path(ref["digest"]).exists():
+            future = self._schedule(key, ref["url"])
+            try:
+                ref = future.result(timeout=self.wait_seconds) or ref
+            except TimeoutError:
+                pass
+        return ref
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.derivatives is not None:
+            self.derivatives.shutdown()
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=`` range; return inclusive ``(start, end)`` or None if unusable."""
+
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def _iter_file(path: Path, start: int, length: int):
+    with path.open("rb") as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(_CHUNK, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_blob(path: Path, *, etag: str, content_type: str, request: Request) -> Response:
+    """Serve an immutable file with a strong ETag, conditional GET and single-range support."""
+
+    size = path.stat().st_size
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if f'"{etag}"' in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == f'"{etag}"'):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"},
+            )
+        start, end = byte_range
+        length = end - start + 1
+        headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(length)})
+        return StreamingResponse(
+            _iter_file(path, start, length),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=content_type,
+            headers=headers,
+        )
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_iter_file(path, 0, size), media_type=content_type, headers=headers)
+
+
+def image_response(key: str, request: Request) -> Response:
+    """Serve a mirrored image, falling back to a redirect while it is still unavailable."""
+
+    ref = image_mirror.resolve(key)
+    if ref is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    digest = ref.get("digest")
+    if not digest or not image_mirror.blob_path(digest).exists():
+        return RedirectResponse(ref["url"], status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    return serve_blob(
+        image_mirror.blob_path(digest),
+        etag=digest,
+        content_type=ref.get("content_type") or "application/octet-stream",
+        request=request,
+    )
+
+
+def thumbnail_response(key: str, width: int, request: Request) -> Response:
+    """Serve a thumbnail of a mirrored image, falling back to the full image."""
+
+    if not _KEY_RE.match(key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    resolved = image_mirror.resolve_thumbnail(key, width)
+    if resolved is None:
+        # Serve the full image in place: a redirect to "/images/..." would drop the path
+        # prefix of a reverse proxy. Revalidate every time so the thumbnail replaces it once
+        # it has been rendered.
+        response = image_response(key, request)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    path, etag = resolved
+    return serve_blob(path, etag=etag, content_type=image_mirror.derivatives.media_type, request=request)
+
+
+def _build_image_mirror() -> ImageMirror:
+    settings = get_settings()
+    return ImageMirror(
+        settings.image_mirror_dir,
+        workers=settings.image_mirror_workers,
+        thumbnail_widths=settings.image_thumbnail_widths,
+        thumbnail_format=settings.image_thumbnail_format,
+        thumbnail_quality=settings.image_thumbnail_quality,
+        thumbnail_workers=settings.image_thumbnail_workers,
+    )
+
+
+image_mirror = _build_image_mirror()
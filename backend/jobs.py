@@ -0,0 +1,181 @@
+"""Background job execution for long-running generation batches."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, Literal
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from .schemas import JobStatus, JobStatusResponse
+from .settings import get_settings
+
+JobKind = Literal["shots", "characters"]
+
+_RESULT_EVENTS = {"shot", "character"}
+
+
+class _Job:
+    """Mutable job state shared between the worker thread and API readers."""
+
+    def __init__(self, kind: JobKind, session_id: str) -> None:
+        self.job_id = uuid4().hex
+        self.kind = kind
+        self.session_id = session_id
+        self.status = "queued"
+        self.total: int | None = None
+        self.results: list[BaseModel] = []
+        self.failures: list[BaseModel] = []
+        self.events: list[tuple[str, BaseModel]] = []
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in {"succeeded", "failed"}
+
+    def record(self, event: str, record: BaseModel) -> None:
+        with self.lock:
+            if event == "plan":
+                self.total = record.total
+            elif event in _RESULT_EVENTS:
+                self.results.append(record)
+            elif event == "failure":
+                self.failures.append(record)
+            self.events.append((event, record))
+
+    def status_model(self) -> JobStatus:
+        with self.lock:
+            return JobStatus(
+                job_id=self.job_id,
+                kind=self.kind,
+                session_id=self.session_id,
+                status=self.status,
+                total=self.total,
+                completed=len(self.results),
+                failed=len(self.failures),
+                error=self.error,
+                created_at=self.created_at,
+                started_at=self.started_at,
+                finished_at=self.finished_at,
+            )
+
+    def response_model(self) -> JobStatusResponse:
+        status = self.status_model()
+        with self.lock:
+            return JobStatusResponse(
+                **status.model_dump(),
+                results=list(self.results),
+                failures=list(self.failures),
+            )
+
+
+class JobManager:
+    """Run generation event streams on a local worker pool and keep their progress for polling.
+
+    Finished jobs are dropped ``job_ttl_seconds`` after completion.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                workers = max(1, get_settings().job_workers)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+            return self._executor
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - get_settings().job_ttl_seconds
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _run(self, job: _Job, events: Iterable[tuple[str, BaseModel]]) -> None:
+        with job.lock:
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            for event, record in events:
+                job.record(event, record)
+        except Exception as exc:  # pylint: disable=broad-except
+            detail = getattr(exc, "detail", None) or str(exc)
+            with job.lock:
+                job.error = str(detail)
+                job.status = "failed"
+                job.finished_at = time.time()
+            return
+        with job.lock:
+            job.status = "succeeded"
+            job.finished_at = time.time()
+
+    def submit(self, kind: JobKind, session_id: str, events: Iterable[tuple[str, BaseModel]]) -> JobStatus:
+        """Queue an already-validated event stream (see the services' ``stream`` methods)."""
+
+        self._purge_expired()
+        job = _Job(kind, session_id)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._get_executor().submit(self._run, job, events)
+        return job.status_model()
+
+    def _get_job(self, job_id: str) -> _Job | None:
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get(self, job_id: str) -> JobStatusResponse | None:
+        job = self._get_job(job_id)
+        return job.response_model() if job else None
+
+    def subscribe(self, job_id: str, poll_interval: float = 0.25) -> AsyncIterator[tuple[str, BaseModel]] | None:
+        """Replay a job's events from the start and follow it until it finishes.
+
+        The iterator ends with a ``"status"`` record carrying the final :class:`JobStatus`.
+        Waiting happens on the event loop, so subscribers do not hold worker threads.
+        """
+
+        job = self._get_job(job_id)
+        if job is None:
+            return None
+
+        async def _follow():
+            cursor = 0
+            while True:
+                with job.lock:
+                    batch = job.events[cursor:]
+                    done = job.done
+                cursor += len(batch)
+                for item in batch:
+                    yield item
+                if done:
+                    yield "status", job.status_model()
+                    return
+                if not batch:
+                    await asyncio.sleep(poll_interval)
+
+        return _follow()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = JobManager()
@@ -0,0 +1,347 @@
+"""Content-addressed cache for Bria render results.
+
+Entries are keyed by a SHA-256 of the exact request payload sent to Bria (prompt,
+style text, reference images, aspect ratio, seed and structured prompt) and of the
+Bria token it was paid with, so a repeated render is served locally instead of
+paying for another Bria call, but never to a caller holding a different token.
+An in-memory LRU tier is always used; an on-disk tier is enabled by setting
+``RENDER_CACHE_DIR``. Concurrent identical renders are coalesced into one call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from .settings import get_settings
+
+# How often a coroutine waiting on an identical in-flight render checks for its result.
+_ASYNC_WAIT_POLL = 0.05
+
+
+class RenderCache:
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 6 * 3600,
+        disk_dir: str | None = None,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+        share_across_tokens: bool = False,
+    ) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.share_across_tokens = share_across_tokens
+        # key -> (stored_at, serialized result)
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: int | None = None
+        self._inflight: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "coalesced": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evictions": 0,
+        }
+
+    def make_key(self, url: str, payload: dict, token: str) -> str:
+        """Key for ``payload`` rendered with ``token``; only the token's fingerprint enters the key."""
+
+        scope = None if self.share_across_tokens else hashlib.sha256(token.encode("utf-8")).hexdigest()
+        canonical = json.dumps({"url": url, "payload": payload, "token": scope}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    # ---- memory tier ----
+
+    def _memory_get(self, key: str) -> str | None:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        stored_at, blob = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            self._memory_pop(key)
+            return None
+        self._memory.move_to_end(key)
+        return blob
+
+    def _memory_pop(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1])
+
+    def _memory_put(self, key: str, stored_at: float, blob: str) -> None:
+        self._memory_pop(key)
+        self._memory[key] = (stored_at, blob)
+        self._memory_bytes += len(blob)
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            oldest = next(iter(self._memory))
+            self._memory_pop(oldest)
+            self._counters["evictions"] += 1
+
+    # ---- disk tier ----
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _disk_get(self, key: str) -> tuple[float, str] | None:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        stored_at = entry.get("stored_at", 0)
+        if time.time() - stored_at > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        return stored_at, entry["value"]
+
+    def _disk_put(self, key: str, stored_at: float, blob: str) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            data = json.dumps({"stored_at": stored_at, "value": blob})
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(p.stat().st_size for p in self.disk_dir.glob("*/*.json"))
+            else:
+                self._disk_bytes += len(data)
+            over_limit = self._disk_bytes > self.disk_max_bytes
+        if over_limit:
+            self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        """Delete the oldest disk entries until the tier is back under 90% of its budget."""
+
+        files = []
+        for path in self.disk_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.disk_max_bytes * 0.9)
+        evicted = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._counters["evictions"] += evicted
+
+    # ---- public API ----
+
+    def _lookup(self, key: str) -> tuple[dict | None, str | None]:
+        """Return ``(value, tier)`` without touching the hit counters."""
+
+        with self._lock:
+            blob = self._memory_get(key)
+        if blob is not None:
+            return json.loads(blob), "memory"
+        entry = self._disk_get(key)
+        if entry is None:
+            return None, None
+        with self._lock:
+            self._memory_put(key, *entry)
+        return json.loads(entry[1]), "disk"
+
+    async def _alookup(self, key: str) -> tuple[dict | None, str | None]:
+        """Async counterpart of :meth:`_lookup`; only the disk tier runs on a worker thread."""
+
+        with self._lock:
+            blob = self._memory_get(key)
+        if blob is not None:
+            return json.loads(blob), "memory"
+        if not self.disk_dir:
+            return None, None
+        return await asyncio.to_thread(self._lookup, key)
+
+    def _count_hit(self, tier: str | None) -> None:
+        if tier is not None:
+            with self._lock:
+                self._counters[f"{tier}_hits"] += 1
+
+    def get(self, key: str) -> dict | None:
+        value, tier = self._lookup(key)
+        self._count_hit(tier)
+        return value
+
+    async def aget(self, key: str) -> dict | None:
+        """Async counterpart of :meth:`get`."""
+
+        value, tier = await self._alookup(key)
+        self._count_hit(tier)
+        return value
+
+    def _memory_set(self, key: str, value: dict) -> tuple[float, str]:
+        stored_at = time.time()
+        blob = json.dumps(value)
+        with self._lock:
+            self._memory_put(key, stored_at, blob)
+        return stored_at, blob
+
+    def set(self, key: str, value: dict) -> None:
+        self._disk_put(key, *self._memory_set(key, value))
+
+    async def aset(self, key: str, value: dict) -> None:
+        """Async counterpart of :meth:`set`; the disk write and any trim run on a worker thread."""
+
+        entry = self._memory_set(key, value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, *entry)
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict], *, bypass: bool = False) -> tuple[dict, bool]:
+        """Return ``(result, from_cache)``, calling ``compute`` at most once per key at a time.
+
+        ``bypass`` skips the lookup (the fresh result still replaces the cached one).
+        """
+
+        if not self.enabled:
+            return compute(), False
+        if bypass:
+            with self._lock:
+                self._counters["bypassed"] += 1
+            value = compute()
+            self.set(key, value)
+            return value, False
+
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+
+        with self._lock:
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                self._inflight[key] = threading.Event()
+        if waiter is not None:
+            waiter.wait()
+            cached, _ = self._lookup(key)
+            if cached is not None:
+                with self._lock:
+                    self._counters["coalesced"] += 1
+                return cached, True
+            # The leading call failed; fall through and try ourselves.
+            return self.get_or_compute(key, compute)
+
+        try:
+            with self._lock:
+                self._counters["misses"] += 1
+            value = compute()
+            self.set(key, value)
+            return value, False
+        finally:
+            with self._lock:
+                event = self._inflight.pop(key, None)
+            if event is not None:
+                event.set()
+
+    async def aget_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[dict]], *, bypass: bool = False
+    ) -> tuple[dict, bool]:
+        """Async counterpart of :meth:`get_or_compute`, coalescing with sync callers too."""
+
+        if not self.enabled:
+            return await compute(), False
+        if bypass:
+            with self._lock:
+                self._counters["bypassed"] += 1
+            value = await compute()
+            await self.aset(key, value)
+            return value, False
+
+        cached = await self.aget(key)
+        if cached is not None:
+            return cached, True
+
+        with self._lock:
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                self._inflight[key] = threading.Event()
+        if waiter is not None:
+            # Poll rather than block: the leader may be a thread or another coroutine on this loop.
+            while not waiter.is_set():
+                await asyncio.sleep(_ASYNC_WAIT_POLL)
+            cached, _ = await self._alookup(key)
+            if cached is not None:
+                with self._lock:
+                    self._counters["coalesced"] += 1
+                return cached, True
+            return await self.aget_or_compute(key, compute)
+
+        try:
+            with self._lock:
+                self._counters["misses"] += 1
+            value = await compute()
+            await self.aset(key, value)
+            return value, False
+        finally:
+            with self._lock:
+                event = self._inflight.pop(key, None)
+            if event is not None:
+                event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            hits = counters["memory_hits"] + counters["disk_hits"] + counters["coalesced"]
+            lookups = hits + counters["misses"]
+            return {
+                "enabled": self.enabled,
+                **counters,
+                "hits": hits,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_enabled": self.disk_dir is not None,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+
+def _build_render_cache() -> RenderCache:
+    settings = get_settings()
+    return RenderCache(
+        enabled=settings.render_cache_enabled,
+        max_entries=settings.render_cache_max_entries,
+        max_bytes=settings.render_cache_max_bytes,
+        ttl_seconds=settings.render_cache_ttl_seconds,
+        disk_dir=settings.render_cache_dir,
+        disk_max_bytes=settings.render_cache_disk_max_bytes,
+        share_across_tokens=settings.render_cache_share_across_tokens,
+    )
+
+
+render_cache = _build_render_cache()
@@ -16,6 +16,16 @@ class ScriptIngestionRequest(BaseModel):
     openai_api_key: str | None = Field(
         default=None, description="Optional override for OpenAI API key; '1' uses server default."
     )
+    bypass_cache: bool = Field(
+        default=False, description="Skip cached agent outputs and always call the LLM."
+    )
+    chunked: bool = Field(
+        default=True,
+        description=(
+            "Split scripts longer than the configured chunk size at scene boundaries and break the "
+            "chunks down in parallel; false sends the whole script in one prompt."
+        ),
+    )
 
 
 class ScriptIngestionResponse(BaseModel):
@@ -33,6 +43,12 @@ class CharacterAsset(BaseModel):
     seed: int
     structured_prompt: Dict[str, Any]
     raw_structured_prompt: str
+    local_url: Optional[str] = Field(
+        default=None, description="Path of the locally mirrored copy of image_url, served by this API."
+    )
+    thumbnails: Dict[str, str] = Field(
+        default_factory=dict, description="Downscaled copies of the mirrored image, keyed by pixel width."
+    )
 
 
 class CharacterGenerationRequest(BaseModel):
@@ -44,6 +60,9 @@ class CharacterGenerationRequest(BaseModel):
         default=None,
         description="Optional subset of character names to generate; defaults to all main cast.",
     )
+    bypass_cache: bool = Field(
+        default=False, description="Skip the render cache and always call Bria for a fresh image."
+    )
 
 
 class CharacterGenerationResponse(BaseModel):
@@ -51,6 +70,23 @@ class CharacterGenerationResponse(BaseModel):
     characters: List[CharacterAsset]
 
 
+class CharacterGenerationFailure(BaseModel):
+    name: str
+    detail: str
+
+
+class CharacterGenerationSummary(BaseModel):
+    session_id: str
+    total: int = Field(..., description="Number of characters scheduled for rendering.")
+    generated: int = Field(..., description="Number of characters rendered successfully.")
+    failures: List[CharacterGenerationFailure]
+
+
+class GenerationPlan(BaseModel):
+    session_id: str
+    total: int = Field(..., description="Number of items that will be rendered.")
+
+
 class ShotAsset(BaseModel):
     scene_number: int
     shot_number: int
@@ -60,6 +96,12 @@ class ShotAsset(BaseModel):
     seed: int
     structured_prompt: Dict[str, Any]
     raw_structured_prompt: str
+    local_url: Optional[str] = Field(
+        default=None, description="Path of the locally mirrored copy of image_url, served by this API."
+    )
+    thumbnails: Dict[str, str] = Field(
+        default_factory=dict, description="Downscaled copies of the mirrored image, keyed by pixel width."
+    )
 
 
 class ShotGenerationRequest(BaseModel):
@@ -71,6 +113,14 @@ class ShotGenerationRequest(BaseModel):
         default=None,
         description="Optional subset of scenes to process; defaults to all scenes in the session.",
     )
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Optional cap on shots rendered in parallel; defaults to the server limit.",
+    )
+    bypass_cache: bool = Field(
+        default=False, description="Skip the render cache and always call Bria for a fresh image."
+    )
 
 
 class ShotGenerationResponse(BaseModel):
@@ -78,6 +128,19 @@ class ShotGenerationResponse(BaseModel):
     shots: List[ShotAsset]
 
 
+class ShotGenerationFailure(BaseModel):
+    scene_number: int
+    shot_number: int
+    detail: str
+
+
+class ShotGenerationSummary(BaseModel):
+    session_id: str
+    total: int = Field(..., description="Number of shots scheduled for rendering.")
+    generated: int = Field(..., description="Number of shots rendered successfully.")
+    failures: List[ShotGenerationFailure]
+
+
 class SingleShotGenerationRequest(BaseModel):
     session_id: str
     scene_number: int
@@ -85,6 +148,9 @@ class SingleShotGenerationRequest(BaseModel):
     bria_api_token: str | None = Field(
         default=None, description="Optional override for Bria API token; '1' uses server default."
     )
+    bypass_cache: bool = Field(
+        default=False, description="Skip the render cache and always call Bria for a fresh image."
+    )
 
 
 class SingleShotGenerationResponse(BaseModel):
@@ -104,6 +170,9 @@ class ShotRefineRequest(BaseModel):
         default=False,
         description="Optionally pass character reference images to the refine call if identity drifted.",
     )
+    bypass_cache: bool = Field(
+        default=False, description="Skip the render cache and always call Bria for a fresh image."
+    )
 
 
 class ShotRefineResponse(BaseModel):
@@ -122,6 +191,9 @@ class ShotEditRequest(BaseModel):
     bria_api_token: str | None = Field(
         default=None, description="Optional override for Bria API token; '1' uses server default."
     )
+    bypass_cache: bool = Field(
+        default=False, description="Skip the render cache and always call Bria for a fresh image."
+    )
 
 
 class ShotEditResponse(BaseModel):
@@ -134,11 +206,16 @@ class CharacterUpdateRequest(BaseModel):
     session_id: str
     name: str = Field(..., description="Character name to update.")
     character_description: str = Field(..., description="New description to use for generation/refine.")
+    expected_version: Optional[int] = Field(
+        default=None,
+        description="If set, reject the update with 409 unless the session is still at this version.",
+    )
 
 
 class CharacterUpdateResponse(BaseModel):
     session_id: str
     characters: List[CharacterInfo]
+    version: int
 
 
 class ShotUpdateRequest(BaseModel):
@@ -150,17 +227,124 @@ class ShotUpdateRequest(BaseModel):
         default=False,
         description="If true and shot_number exists, insert a new shot before it instead of updating the existing shot.",
     )
+    expected_version: Optional[int] = Field(
+        default=None,
+        description="If set, reject the update with 409 unless the session is still at this version.",
+    )
 
 
 class ShotUpdateResponse(BaseModel):
     session_id: str
-    scenes: List[Scene]
-    shot_assets: List[ShotAsset] | None = Field(
+    scene: Scene = Field(..., description="The updated scene, with shots renumbered after an insert.")
+    shot_assets: List[ShotAsset] = Field(
+        default_factory=list,
+        description="Generated assets of the updated scene, keyed to the renumbered shots.",
+    )
+    version: int
+
+
+class ShotUpdateAndGenerateRequest(BaseModel):
+    session_id: str
+    scene_number: int
+    shot_number: int
+    shot_description: str = Field(..., description="New shot description to save before rendering.")
+    expected_version: Optional[int] = None
+    force: bool = Field(
+        default=False,
+        description="Render even if the description is unchanged and the shot already has an image.",
+    )
+    bria_api_token: str | None = Field(
+        default=None, description="Optional override for Bria API token; '1' uses server default."
+    )
+    bypass_cache: bool = Field(
+        default=False, description="Skip the render cache and always call Bria for a fresh image."
+    )
+
+
+class ShotUpdateAndGenerateResponse(BaseModel):
+    session_id: str
+    scene: Scene
+    shot: ShotAsset
+    rendered: bool = Field(..., description="False when the existing image was kept because nothing changed.")
+    version: int
+
+
+class CharacterUpdateAndGenerateRequest(BaseModel):
+    session_id: str
+    name: str
+    character_description: str = Field(..., description="New description to save before rendering.")
+    expected_version: Optional[int] = None
+    bria_api_token: str | None = Field(
+        default=None, description="Optional override for Bria API token; '1' uses server default."
+    )
+    bypass_cache: bool = Field(
+        default=False, description="Skip the render cache and always call Bria for a fresh image."
+    )
+
+
+class CharacterUpdateAndGenerateResponse(BaseModel):
+    session_id: str
+    characters: List[CharacterInfo]
+    character: CharacterAsset
+    rendered: bool = Field(..., description="False when the existing image was kept because nothing changed.")
+    version: int
+
+
+class ShotOperation(BaseModel):
+    op: Literal["update", "insert", "delete"]
+    scene_number: int
+    shot_number: int = Field(
+        ...,
+        description=(
+            "Shot number before the batch is applied. Inserts go before this shot, "
+            "or at the end of the scene if it does not exist."
+        ),
+    )
+    shot_description: Optional[str] = Field(default=None, description="Required for update and insert.")
+
+
+class CharacterDescriptionChange(BaseModel):
+    name: str
+    character_description: str
+
+
+class BatchUpdateRequest(BaseModel):
+    session_id: str
+    shots: List[ShotOperation] = Field(default_factory=list, description="Applied in order.")
+    characters: List[CharacterDescriptionChange] = Field(default_factory=list)
+    expected_version: Optional[int] = Field(
         default=None,
-        description="Optional list of shot assets after the update; included when renumbering occurs.",
+        description="If set, reject the batch with 409 unless the session is still at this version.",
     )
 
 
+class BatchUpdateResponse(BaseModel):
+    session_id: str
+    characters: List[CharacterInfo]
+    scenes: List[Scene] = Field(..., description="Scenes touched by the batch, after renumbering.")
+    shot_assets: List[ShotAsset] = Field(..., description="Generated assets of the touched scenes.")
+    version: int
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: Literal["shots", "characters"]
+    session_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    total: int | None = Field(default=None, description="Items to render; known once the job starts.")
+    completed: int = 0
+    failed: int = 0
+    error: str | None = Field(default=None, description="Set when the job itself crashed.")
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+class JobStatusResponse(JobStatus):
+    results: List[ShotAsset | CharacterAsset] = Field(default_factory=list)
+    failures: List[ShotGenerationFailure | CharacterGenerationFailure] = Field(default_factory=list)
+
+
 class FixtureLoadRequest(BaseModel):
     style: Literal["outline", "realistic", "3d", "anime"] = Field(
         default="realistic", description="Optional style override for the debug fixture."
@@ -6,6 +6,8 @@ from .shot_generation import ShotGenerationService
 from .shot_refinement import ShotRefinementService
 from .shot_edit import ShotEditService
 from .session_updates import SessionUpdateService
+from .update_and_render import UpdateAndRenderService
+from .export import StoryboardExportService
 
 __all__ = [
     "ScriptIngestionService",
@@ -14,4 +16,6 @@ __all__ = [
     "ShotRefinementService",
     "ShotEditService",
     "SessionUpdateService",
+    "UpdateAndRenderService",
+    "StoryboardExportService",
 ]
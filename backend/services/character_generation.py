@@ -2,19 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Iterable
+from typing import AsyncIterator, Iterable, Iterator
 
 from fastapi import HTTPException, status
 
-from ..agent_tools import generate_character
+from ..agent_tools import agenerate_character, generate_character
 from ..schemas import (
+    CharacterGenerationFailure,
     CharacterGenerationRequest,
     CharacterGenerationResponse,
+    CharacterGenerationSummary,
     CharacterAsset,
+    GenerationPlan,
 )
 from ..session_store import session_store, SessionStore
 
+# Characters of one request rendered at once.
+_MAX_PARALLEL_RENDERS = 8
+
 
 class CharacterGenerationService:
     def __init__(self, store: SessionStore | None = None) -> None:
@@ -37,55 +44,176 @@ class CharacterGenerationService:
         existing = {name.lower() for name in session.character_assets.keys()}
         return [c for c in targets if c.name.lower() not in existing]
 
-    def generate(self, payload: CharacterGenerationRequest) -> CharacterGenerationResponse:
-        session = self.store.get_session(payload.session_id)
+    def _targets_for(self, session, payload: CharacterGenerationRequest):
         if not session:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
         targets = self._resolve_characters(session, payload.character_names)
-        targets = self._filter_missing_assets(session, targets)
+        return session, self._filter_missing_assets(session, targets)
 
-        # Nothing to do; return empty list but keep session intact.
-        if not targets:
-            return CharacterGenerationResponse(session_id=session.session_id, characters=[])
+    def _plan_targets(self, payload: CharacterGenerationRequest):
+        return self._targets_for(self.store.get_session(payload.session_id), payload)
+
+    async def _aplan_targets(self, payload: CharacterGenerationRequest):
+        return self._targets_for(await self.store.aget_session(payload.session_id), payload)
+
+    def _apply_asset(self, current, asset: CharacterAsset) -> bool:
+        character = next((c for c in current.characters if c.name == asset.name), None)
+        if character is None or character.character_description != asset.description:
+            return False
+        current.character_assets[asset.name] = asset
+        return True
+
+    def _commit_asset(self, session_id: str, asset: CharacterAsset) -> bool:
+        """Store a rendered character on the latest session unless its description changed meanwhile."""
+
+        with self.store.edit_session(session_id) as current:
+            return self._apply_asset(current, asset)
+
+    async def _acommit_asset(self, session_id: str, asset: CharacterAsset) -> bool:
+        return await self.store.aedit_session(session_id, lambda current: self._apply_asset(current, asset))
+
+    def _build_asset(self, character, result: dict) -> CharacterAsset:
+        return CharacterAsset(
+            name=character.name,
+            description=character.character_description,
+            image_url=result["image_url"],
+            seed=result["seed"],
+            structured_prompt=result["structured_prompt"],
+            raw_structured_prompt=result["raw_structured_prompt"],
+            local_url=result.get("local_url"),
+            thumbnails=result.get("thumbnails") or {},
+        )
+
+    def _iter_renders(
+        self, session, targets, payload: CharacterGenerationRequest
+    ) -> Iterator[tuple[str, CharacterAsset | RuntimeError]]:
+        """Render characters concurrently and yield ``(name, asset or error)`` as each finishes."""
 
         def _generate(character):
             try:
                 result = generate_character(
-                    character.character_description, session.style, bria_api_token=payload.bria_api_token
+                    character.character_description,
+                    session.style,
+                    bria_api_token=payload.bria_api_token,
+                    bypass_cache=payload.bypass_cache,
                 )
                 return character, result
             except Exception as exc:  # pylint: disable=broad-except
                 # Convert to RuntimeError so outer handler can wrap as HTTPException
                 raise RuntimeError(exc) from exc
 
-        generated_assets: list[CharacterAsset] = []
-        max_workers = min(len(targets), 8) or 1
+        max_workers = min(len(targets), _MAX_PARALLEL_RENDERS) or 1
+        executor = ThreadPoolExecutor(max_workers=max_workers)
         try:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_map = {executor.submit(_generate, character): character.name for character in targets}
-                for future in as_completed(future_map):
+            future_map = {executor.submit(_generate, character): character.name for character in targets}
+            for future in as_completed(future_map):
+                try:
                     character, result = future.result()
-                    asset = CharacterAsset(
-                        name=character.name,
-                        description=character.character_description,
-                        image_url=result["image_url"],
-                        seed=result["seed"],
-                        structured_prompt=result["structured_prompt"],
-                        raw_structured_prompt=result["raw_structured_prompt"],
+                except RuntimeError as exc:
+                    yield future_map[future], exc
+                    continue
+                asset = self._build_asset(character, result)
+                if not self._commit_asset(session.session_id, asset):
+                    yield character.name, RuntimeError("character was edited while rendering; result discarded")
+                    continue
+                yield character.name, asset
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _aiter_renders(
+        self, session, targets, payload: CharacterGenerationRequest
+    ) -> AsyncIterator[tuple[str, CharacterAsset | RuntimeError]]:
+        """Async counterpart of :meth:`_iter_renders`; closing it cancels renders still in flight."""
+
+        semaphore = asyncio.Semaphore(_MAX_PARALLEL_RENDERS)
+
+        async def _generate(character):
+            try:
+                async with semaphore:
+                    return await agenerate_character(
+                        character.character_description,
+                        session.style,
+                        bria_api_token=payload.bria_api_token,
+                        bypass_cache=payload.bypass_cache,
                     )
-                    session.character_assets[character.name] = asset
-                    generated_assets.append(asset)
-        except RuntimeError as exc:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Character generation failed: {exc}",
-            ) from exc
-        except Exception as exc:  # pylint: disable=broad-except
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Character generation failed: {exc}",
-            ) from exc
-
-        self.store.update_session(session)
+            except Exception as exc:  # pylint: disable=broad-except
+                raise RuntimeError(exc) from exc
+
+        task_map = {asyncio.ensure_future(_generate(character)): character for character in targets}
+        pending = set(task_map)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    character = task_map[task]
+                    try:
+                        result = task.result()
+                    except RuntimeError as exc:
+                        yield character.name, exc
+                        continue
+                    asset = self._build_asset(character, result)
+                    if not await self._acommit_asset(session.session_id, asset):
+                        yield character.name, RuntimeError("character was edited while rendering; result discarded")
+                        continue
+                    yield character.name, asset
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(self, payload: CharacterGenerationRequest) -> CharacterGenerationResponse:
+        session, targets = await self._aplan_targets(payload)
+
+        # Nothing to do; return empty list but keep session intact.
+        if not targets:
+            return CharacterGenerationResponse(session_id=session.session_id, characters=[])
+
+        generated_assets: list[CharacterAsset] = []
+        renders = self._aiter_renders(session, targets, payload)
+        try:
+            async for _, outcome in renders:
+                if isinstance(outcome, Exception):
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                        detail=f"Character generation failed: {outcome}",
+                    ) from outcome
+                generated_assets.append(outcome)
+        finally:
+            await renders.aclose()
+
         return CharacterGenerationResponse(session_id=session.session_id, characters=generated_assets)
+
+    def stream(
+        self, payload: CharacterGenerationRequest
+    ) -> Iterator[
+        tuple[str, GenerationPlan | CharacterAsset | CharacterGenerationFailure | CharacterGenerationSummary]
+    ]:
+        """Validate the request eagerly, then return an iterator of ``(event, record)`` pairs.
+
+        Emits a ``"plan"`` record, one ``"character"`` or ``"failure"`` record per
+        character as it finishes, and a closing ``"summary"`` record.
+        """
+
+        session, targets = self._plan_targets(payload)
+
+        def _events():
+            yield "plan", GenerationPlan(session_id=session.session_id, total=len(targets))
+            failures: list[CharacterGenerationFailure] = []
+            generated = 0
+            if targets:
+                for name, outcome in self._iter_renders(session, targets, payload):
+                    if isinstance(outcome, Exception):
+                        failure = CharacterGenerationFailure(name=name, detail=str(outcome))
+                        failures.append(failure)
+                        yield "failure", failure
+                        continue
+                    generated += 1
+                    yield "character", outcome
+            yield "summary", CharacterGenerationSummary(
+                session_id=session.session_id,
+                total=len(targets),
+                generated=generated,
+                failures=failures,
+            )
+
+        return _events()
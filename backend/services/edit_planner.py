@@ -0,0 +1,296 @@
+"""Local planning of simple shot edits, without the shot agent.
+
+Requests such as "make it night" or "change her jacket to red" touch one part of a
+shot's structured prompt. The shot agent always answers them the same way: refine
+with the same seed and no reference images. :func:`EditPlanner.plan` recognises a
+few of these patterns and returns that decision directly, together with a copy of
+the structured prompt whose matching field is already patched. Anything it is not
+sure about returns ``None`` and goes to the LLM as before.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from ..agent_structured_outputs import ShotAgentDecision
+
+_POLITE = re.compile(r"^(?:please|pls|can you|could you|would you)\s+|\s+please$")
+
+_TIMES_OF_DAY = {
+    "night": "nighttime, dark sky, moonlight and practical light sources",
+    "day": "bright daytime, natural daylight",
+    "morning": "early morning, soft low sunlight",
+    "noon": "midday, harsh overhead sunlight",
+    "evening": "evening, fading warm light",
+    "sunrise": "sunrise, soft warm low-angle sunlight",
+    "sunset": "sunset, warm golden low-angle sunlight",
+    "golden hour": "golden hour, warm low-angle sunlight",
+    "dawn": "dawn, cool pale light before sunrise",
+    "dusk": "dusk, deep blue twilight",
+}
+_TIME_ALIASES = {
+    "nighttime": "night",
+    "night-time": "night",
+    "night time": "night",
+    "daytime": "day",
+    "day time": "day",
+    "daylight": "day",
+    "midday": "noon",
+    "twilight": "dusk",
+}
+
+_WEATHER = {
+    "rain": "heavy rain falling",
+    "snow": "snow falling",
+    "fog": "thick fog",
+    "storm": "dark stormy sky",
+    "overcast": "overcast sky",
+    "sunny": "clear sunny sky",
+}
+_WEATHER_ALIASES = {
+    "rainy": "rain",
+    "raining": "rain",
+    "snowy": "snow",
+    "snowing": "snow",
+    "foggy": "fog",
+    "misty": "fog",
+    "mist": "fog",
+    "stormy": "storm",
+    "cloudy": "overcast",
+}
+
+_CAMERA_ANGLES = {
+    "low": "low angle",
+    "high": "high angle",
+    "eye level": "eye level",
+    "eye-level": "eye level",
+    "bird's eye": "bird's-eye view",
+    "bird's-eye": "bird's-eye view",
+    "birds eye": "bird's-eye view",
+    "overhead": "bird's-eye view",
+    "top-down": "bird's-eye view",
+    "top down": "bird's-eye view",
+    "dutch": "dutch angle",
+    "worm's eye": "worm's-eye view",
+    "worm's-eye": "worm's-eye view",
+}
+
+_COLORS = (
+    "red", "orange", "yellow", "green", "blue", "purple", "violet", "pink", "brown", "black", "white",
+    "gray", "grey", "beige", "gold", "golden", "silver", "teal", "cyan", "magenta", "navy", "maroon",
+    "crimson", "turquoise", "lavender", "burgundy", "olive", "cream",
+)
+_SHADES = ("light", "dark", "bright", "pale", "deep")
+
+# Words that name the whole frame rather than an object in it.
+_NOT_OBJECTS = {"it", "this", "that", "everything", "all", "image", "picture", "shot", "scene", "frame", "style"}
+
+
+def _alternation(words: Iterable[str]) -> str:
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+_COLOR = rf"(?:(?:{_alternation(_SHADES)})\s+)?(?:{_alternation(_COLORS)})"
+_FRAME = r"(?:it|this|the\s+(?:shot|scene|image|frame|setting))"
+
+_TIME_RE = re.compile(
+    rf"^(?:(?:make|turn|change|set|switch)\s+{_FRAME}\s+(?:to\s+|into\s+)?)?(?:at\s+|during\s+)?(?:a\s+|the\s+)?"
+    rf"(?P<time>{_alternation([*_TIMES_OF_DAY, *_TIME_ALIASES])})(?:\s*time)?$"
+)
+_WEATHER_RE = re.compile(
+    rf"^(?:(?:make|turn)\s+(?:{_FRAME}|the\s+(?:weather|sky))\s+|add\s+(?:some\s+)?)"
+    rf"(?P<weather>{_alternation([*_WEATHER, *_WEATHER_ALIASES])})(?:\s+weather)?$"
+)
+_CAMERA_RE = re.compile(
+    r"^(?:use|try|make\s+it|switch\s+to|change\s+to|change\s+(?:it|the\s+(?:camera|angle|shot))\s+to|"
+    r"shoot\s+(?:it|this)\s+from)\s+(?:an?\s+|the\s+)?"
+    rf"(?P<angle>{_alternation(_CAMERA_ANGLES)})(?:[\s-]+angle)?(?:\s+(?:shot|view))?$"
+)
+_OWNER = r"(?:(?P<pronoun>her|his|their|its)\s+|the\s+|(?P<owner>[a-z]+)'s\s+)?"
+_COLOR_RES = (
+    re.compile(
+        rf"^(?:change|make|turn|paint|color|colour|recolor|recolour|switch)\s+{_OWNER}"
+        rf"(?P<noun>[a-z]+(?:[ -][a-z]+){{0,2}}?)\s+(?:to\s+|into\s+)?(?:be\s+)?(?:a\s+)?"
+        rf"(?P<color>{_COLOR})(?:\s+(?:one|color|colour))?$"
+    ),
+    re.compile(
+        rf"^{_OWNER}(?P<noun>[a-z]+(?:[ -][a-z]+){{0,2}}?)\s+(?:should\s+be|must\s+be|is\s+now|in)\s+"
+        rf"(?P<color>{_COLOR})$"
+    ),
+)
+
+
+@dataclass
+class EditPlan:
+    """A locally planned edit: the decision and the structured prompt to refine from."""
+
+    rule: str
+    decision: ShotAgentDecision
+    structured_prompt: dict
+
+
+def _normalize(text: str) -> str:
+    text = " ".join(text.lower().replace("’", "'").split()).rstrip(".! ")
+    for _ in range(2):
+        text = _POLITE.sub("", text).strip()
+    return text
+
+
+def _patch_time_of_day(text: str, structured_prompt: dict, characters: list[str]) -> dict | None:
+    match = _TIME_RE.match(text)
+    if not match or not isinstance(structured_prompt.get("lighting"), dict):
+        return None
+    time_of_day = _TIME_ALIASES.get(match["time"], match["time"])
+    patched = copy.deepcopy(structured_prompt)
+    patched["lighting"]["conditions"] = _TIMES_OF_DAY[time_of_day]
+    return patched
+
+
+def _patch_weather(text: str, structured_prompt: dict, characters: list[str]) -> dict | None:
+    match = _WEATHER_RE.match(text)
+    background = structured_prompt.get("background_setting")
+    if not match or not isinstance(background, str):
+        return None
+    weather = _WEATHER[_WEATHER_ALIASES.get(match["weather"], match["weather"])]
+    patched = copy.deepcopy(structured_prompt)
+    patched["background_setting"] = f"{background.rstrip('. ')}; {weather}"
+    return patched
+
+
+def _patch_camera_angle(text: str, structured_prompt: dict, characters: list[str]) -> dict | None:
+    match = _CAMERA_RE.match(text)
+    if not match or not isinstance(structured_prompt.get("photographic_characteristics"), dict):
+        return None
+    patched = copy.deepcopy(structured_prompt)
+    patched["photographic_characteristics"]["camera_angle"] = _CAMERA_ANGLES[match["angle"]]
+    return patched
+
+
+def _recolor(value, noun_re: re.Pattern, color: str):
+    if isinstance(value, str):
+        return noun_re.sub(lambda m: f"{color} {m['between']}{m['noun']}", value)
+    if isinstance(value, dict):
+        return {key: _recolor(item, noun_re, color) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_recolor(item, noun_re, color) for item in value]
+    return value
+
+
+def _name_tokens(name: str) -> set[str]:
+    return {token.lower() for token in name.split()}
+
+
+def _mentions(value, tokens: set[str]) -> bool:
+    text = json.dumps(value).lower()
+    return any(re.search(rf"\b{re.escape(token)}\b", text) for token in tokens)
+
+
+def _owner_tokens(match: re.Match, characters: list[str]) -> set[str] | None:
+    """Name tokens of the character whose object is recolored, empty for "the jacket".
+
+    Returns None when the owner cannot be pinned to exactly one character in the shot.
+    """
+
+    if match["owner"]:
+        named = [_name_tokens(name) for name in characters if match["owner"] in _name_tokens(name)]
+        return named[0] if len(named) == 1 else None
+    if match["pronoun"]:
+        return _name_tokens(characters[0]) if len(characters) == 1 else None
+    return set()
+
+
+def _patch_color(text: str, structured_prompt: dict, characters: list[str]) -> dict | None:
+    match = next((m for m in (regex.match(text) for regex in _COLOR_RES) if m), None)
+    objects = structured_prompt.get("objects")
+    if not match or not isinstance(objects, list):
+        return None
+    noun, color = match["noun"], match["color"]
+    everyone = set().union(*map(_name_tokens, characters))
+    owner = _owner_tokens(match, characters)
+    if noun in _NOT_OBJECTS or noun in everyone or owner is None:
+        return None
+    # "blue denim jacket" -> "red denim jacket": swap the color word in front of the noun,
+    # skipping up to two other adjectives. Mentions without a color are left to the edit prompt.
+    noun_re = re.compile(
+        rf"\b{_COLOR}\s+(?P<between>(?:(?!(?:and|or|with|of|in)\b)[a-z-]+\s+){{0,2}}?)(?P<noun>{re.escape(noun)})\b",
+        flags=re.IGNORECASE,
+    )
+    recolored = {index: _recolor(item, noun_re, color) for index, item in enumerate(objects)}
+    changed = [index for index, item in recolored.items() if item != objects[index]]
+    if owner:
+        # Prefer the entry naming the owner; an unnamed entry is only theirs if nobody else is in the shot.
+        named = [index for index in changed if _mentions(objects[index], owner)]
+        changed = named or (changed if len(characters) == 1 else [])
+    # Nothing to recolor, or the same noun on several objects: let the shot agent decide.
+    if len(changed) != 1:
+        return None
+    patched = copy.deepcopy(structured_prompt)
+    patched["objects"][changed[0]] = recolored[changed[0]]
+    return patched
+
+
+_RULES: tuple[tuple[str, Callable[[str, dict, list[str]], dict | None]], ...] = (
+    ("time_of_day", _patch_time_of_day),
+    ("weather", _patch_weather),
+    ("camera_angle", _patch_camera_angle),
+    ("color", _patch_color),
+)
+
+
+class EditPlanner:
+    """Plans simple edits locally and counts how often the LLM was skipped."""
+
+    def __init__(self) -> None:
+        self._counters: dict[str, int] = {"fallbacks": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def plan(
+        self,
+        user_request: str,
+        structured_prompt: dict,
+        *,
+        characters_in_shot: list[str],
+        mentioned_characters: list[str],
+    ) -> EditPlan | None:
+        """Return a refine plan for ``user_request``, or None when the shot agent should decide.
+
+        The whole request must match one pattern, so compound requests ("make it
+        night and add Tom") always go to the agent. The same goes for requests naming
+        a character who is not in the shot, which need a regenerate.
+        """
+
+        text = _normalize(user_request or "")
+        usable = bool(text) and isinstance(structured_prompt, dict) and bool(structured_prompt)
+        if not usable or set(mentioned_characters) - set(characters_in_shot):
+            self._count("fallbacks")
+            return None
+        for rule, patch in _RULES:
+            patched = patch(text, structured_prompt, characters_in_shot)
+            if patched is not None:
+                self._count(rule)
+                print(f"⚡ Planned shot edit locally ({rule}): {user_request.strip()!r}")
+                decision = ShotAgentDecision(
+                    action="refine",
+                    edit_prompt=user_request.strip(),
+                    shot_description=None,
+                    use_reference_images=False,
+                )
+                return EditPlan(rule=rule, decision=decision, structured_prompt=patched)
+        self._count("fallbacks")
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+
+edit_planner = EditPlanner()
@@ -0,0 +1,259 @@
+"""Service streaming a storyboard export as a ZIP archive.
+
+The archive holds every rendered image, each asset's ``structured_prompt`` JSON,
+a paginated PDF contact sheet and a ``storyboard.json`` manifest. It is produced
+chunk by chunk while images are fetched ahead by a small thread pool, so exports
+of hundreds of frames run in bounded memory.
+"""
+
+from __future__ import annotations
+
+import json
+import mimetypes
+import re
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import requests
+from fastapi import HTTPException, status
+from PIL import Image
+
+from .. import bria_transport
+from ..contact_sheet import ContactSheet
+from ..image_mirror import image_mirror, url_key
+from ..session_store import SessionStore, session_store
+from ..settings import get_settings
+
+_CHUNK = 64 * 1024
+# The contact sheet is spooled here until the images are written; pages are ~200 KB each.
+_SPOOL_BYTES = 4 * 1024 * 1024
+
+
+@dataclass
+class _Frame:
+    stem: str
+    caption: str
+    image_url: str
+    structured_prompt: dict
+
+
+@dataclass
+class _Fetched:
+    frame: _Frame
+    path: Path | None = None
+    extension: str = ""
+    temporary: bool = False
+    tile: Image.Image | None = None
+    error: str | None = None
+
+    def cleanup(self) -> None:
+        if self.temporary and self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class _ZipSink:
+    """Write-only, unseekable file object; ``zipfile`` then emits data descriptors."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_") or "character"
+
+
+def _extension(content_type: str | None, url: str) -> str:
+    content_type = (content_type or "").split(";")[0].strip()
+    extension = mimetypes.guess_extension(content_type) if content_type else None
+    if extension in {None, ".jpe"}:
+        extension = {"image/jpeg": ".jpg"}.get(content_type) or Path(url.split("?")[0]).suffix or ".png"
+    return extension
+
+
+class StoryboardExportService:
+    def __init__(self, store: SessionStore | None = None) -> None:
+        self.store = store or session_store
+
+    def _frames(self, session_id: str) -> tuple[list[_Frame], dict]:
+        with self.store.session_lock(session_id):
+            session = self.store.get_session(session_id)
+            if session is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+            frames: list[_Frame] = []
+            for character in session.characters:
+                asset = session.character_assets.get(character.name)
+                if asset is not None:
+                    frames.append(
+                        _Frame(
+                            f"characters/{_slug(character.name)}",
+                            character.name,
+                            asset.image_url,
+                            asset.structured_prompt,
+                        )
+                    )
+            for scene in session.scenes:
+                for shot in scene.shots:
+                    asset = session.shot_assets.get((scene.scene_number, shot.shot_number))
+                    if asset is not None:
+                        frames.append(
+                            _Frame(
+                                f"shots/scene_{scene.scene_number:02d}_shot_{shot.shot_number:02d}",
+                                f"Scene {scene.scene_number} · Shot {shot.shot_number}",
+                                asset.image_url,
+                                asset.structured_prompt,
+                            )
+                        )
+            manifest = {
+                "session_id": session.session_id,
+                "version": session.version,
+                "style": session.style,
+                "characters": [c.model_dump() for c in session.characters],
+                "scenes": [s.model_dump() for s in session.scenes],
+            }
+        return frames, manifest
+
+    def _download(self, url: str) -> tuple[Path, str]:
+        handle = tempfile.NamedTemporaryFile(prefix="export-", delete=False)
+        path = Path(handle.name)
+        try:
+            with handle, bria_transport.get_session().get(
+                url, stream=True, timeout=bria_transport.default_timeout()
+            ) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(_CHUNK):
+                    handle.write(chunk)
+            return path, response.headers.get("Content-Type", "")
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+    def _fetch(self, frame: _Frame, tile_size: tuple[int, int]) -> _Fetched:
+        """Locate the frame's image (mirror first, then the remote URL) and shrink a tile from it."""
+
+        fetched = _Fetched(frame)
+        try:
+            local_url = image_mirror.submit(frame.image_url)
+            ref = image_mirror.resolve(url_key(frame.image_url)) if local_url else None
+            digest = ref.get("digest") if ref else None
+            if digest and image_mirror.blob_path(digest).exists():
+                fetched.path = image_mirror.blob_path(digest)
+                content_type = ref.get("content_type")
+            else:
+                fetched.path, content_type = self._download(frame.image_url)
+                fetched.temporary = True
+            fetched.extension = _extension(content_type, frame.image_url)
+            with Image.open(fetched.path) as image:
+                image.draft("RGB", tile_size)
+                image.thumbnail(tile_size, reducing_gap=2.0)
+                fetched.tile = image.convert("RGB")
+        except (requests.RequestException, OSError) as exc:
+            fetched.error = str(exc)
+        return fetched
+
+    def _prefetch(
+        self, frames: Iterable[_Frame], tile_size: tuple[int, int], workers: int
+    ) -> Iterator[_Fetched]:
+        """Yield fetched frames in order, keeping at most ``2 * workers`` in flight."""
+
+        pending: deque[Future] = deque()
+        remaining = iter(frames)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        try:
+            for frame in remaining:
+                pending.append(executor.submit(self._fetch, frame, tile_size))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                fetched = pending.popleft().result()
+                frame = next(remaining, None)
+                if frame is not None:
+                    pending.append(executor.submit(self._fetch, frame, tile_size))
+                yield fetched
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future in pending:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    future.result().cleanup()
+
+    def stream_zip(self, session_id: str) -> Iterator[bytes]:
+        """Return an iterator of ZIP bytes for the session (raises 404 before streaming starts)."""
+
+        frames, manifest = self._frames(session_id)
+        return self._stream(frames, manifest)
+
+    def _stream(self, frames: list[_Frame], manifest: dict) -> Iterator[bytes]:
+        settings = get_settings()
+        sink = _ZipSink()
+        stamp = time.localtime()[:6]
+
+        def entry(name: str, compress_type: int) -> zipfile.ZipInfo:
+            info = zipfile.ZipInfo(name, date_time=stamp)
+            info.compress_type = compress_type
+            return info
+
+        files: list[dict] = []
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES) as sheet_file, zipfile.ZipFile(
+            sink, mode="w"
+        ) as archive:
+            sheet = ContactSheet(
+                sheet_file,
+                title=f"Storyboard {manifest['session_id']}",
+                columns=settings.export_contact_sheet_columns,
+                rows=settings.export_contact_sheet_rows,
+            )
+            workers = max(1, settings.export_fetch_workers)
+            for fetched in self._prefetch(frames, sheet.tile_size, workers):
+                frame = fetched.frame
+                record = {"caption": frame.caption, "image_url": frame.image_url}
+                try:
+                    if fetched.path is not None and fetched.error is None:
+                        record["image"] = f"{frame.stem}{fetched.extension}"
+                        # Images are already compressed; storing them avoids burning CPU for nothing.
+                        with archive.open(entry(record["image"], zipfile.ZIP_STORED), mode="w") as out, open(
+                            fetched.path, "rb"
+                        ) as source:
+                            for chunk in iter(lambda: source.read(_CHUNK), b""):
+                                out.write(chunk)
+                                yield sink.drain()
+                    else:
+                        record["error"] = fetched.error
+                    record["structured_prompt"] = f"{frame.stem}.json"
+                    archive.writestr(
+                        entry(record["structured_prompt"], zipfile.ZIP_DEFLATED),
+                        json.dumps(frame.structured_prompt, indent=2, ensure_ascii=False),
+                    )
+                    yield sink.drain()
+                    sheet.add(fetched.tile, frame.caption)
+                finally:
+                    fetched.cleanup()
+                files.append(record)
+
+            sheet.close()
+            sheet_file.seek(0)
+            with archive.open(entry("contact_sheet.pdf", zipfile.ZIP_DEFLATED), mode="w") as out:
+                for chunk in iter(lambda: sheet_file.read(_CHUNK), b""):
+                    out.write(chunk)
+                    yield sink.drain()
+            archive.writestr(
+                entry("storyboard.json", zipfile.ZIP_DEFLATED),
+                json.dumps({**manifest, "files": files}, indent=2, ensure_ascii=False),
+            )
+        yield sink.drain()
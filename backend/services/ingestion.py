@@ -7,16 +7,26 @@ from fastapi import HTTPException, status
 from ..agent_structured_outputs import CharacterInfo, Scene
 from ..schemas import ScriptIngestionResponse
 from ..session_store import session_store, SessionStore
-from .llm_agents import run_character_cast_agent, run_script_agent
+from .llm_agents import arun_character_cast_agent, arun_script_agent, arun_script_agent_chunked
 
 
 class ScriptIngestionService:
     def __init__(self, store: SessionStore | None = None) -> None:
         self.store = store or session_store
 
-    def ingest_script(self, *, script: str, style: str, openai_api_key: str | None = None) -> ScriptIngestionResponse:
+    async def ingest_script(
+        self,
+        *,
+        script: str,
+        style: str,
+        openai_api_key: str | None = None,
+        bypass_cache: bool = False,
+        chunked: bool = True,
+    ) -> ScriptIngestionResponse:
         try:
-            character_output = run_character_cast_agent(script, style, openai_api_key=openai_api_key)
+            character_output = await arun_character_cast_agent(
+                script, style, openai_api_key=openai_api_key, bypass_cache=bypass_cache
+            )
         except RuntimeError as exc:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -24,14 +34,17 @@ class ScriptIngestionService:
             ) from exc
 
         try:
-            script_output = run_script_agent(script, character_output.characters, style, openai_api_key=openai_api_key)
+            script_agent = arun_script_agent_chunked if chunked else arun_script_agent
+            script_output = await script_agent(
+                script, character_output.characters, style, openai_api_key=openai_api_key, bypass_cache=bypass_cache
+            )
         except RuntimeError as exc:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Script agent failed: {exc}",
             ) from exc
 
-        session = self.store.create_session(
+        session = await self.store.acreate_session(
             script=script,
             style=style,
             characters=character_output.characters,
@@ -2,23 +2,41 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import re
-from typing import List, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Type, TypeVar
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel
 
-from ..agent_prompts import character_cast_agent_prompt, script_agent_prompt, shot_agent_prompt
 from ..agent_structured_outputs import (
     CharacterCastAgentOutput,
     CharacterInfo,
+    Scene,
     ScriptAgentOutput,
+    Shot,
     ShotAgentDecision,
 )
 from ..settings import get_settings
+from . import llm_clients
+from .llm_cache import agent_cache_key, agent_output_cache, normalize_script
+from .llm_usage import llm_usage
+from .prompt_compiler import (
+    CHARACTER_CAST,
+    SCRIPT,
+    SHOT,
+    AgentPrompt,
+    character_cast_user_prompt,
+    script_user_prompt,
+    shot_user_prompt,
+)
 
+T = TypeVar("T", bound=BaseModel)
 
-def _get_client(api_key_override: str | None = None) -> OpenAI:
+
+def _resolve_api_key(api_key_override: str | None = None) -> str:
     settings = get_settings()
     api_key = settings.openai_api_key
     if api_key_override:
@@ -28,7 +46,15 @@ def _get_client(api_key_override: str | None = None) -> OpenAI:
             api_key = api_key_override
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not configured")
-    return OpenAI(api_key=api_key)
+    return api_key
+
+
+def _get_client(api_key_override: str | None = None) -> OpenAI:
+    return llm_clients.get_client(_resolve_api_key(api_key_override))
+
+
+def _get_async_client(api_key_override: str | None = None) -> AsyncOpenAI:
+    return llm_clients.get_async_client(_resolve_api_key(api_key_override))
 
 
 def _extract_output_text(resp: Any) -> str:
@@ -54,15 +80,15 @@ def _extract_output_text(resp: Any) -> str:
     return ""
 
 
-def _call_llm(system_prompt: str, user_prompt: str, *, force_json: bool = True, api_key_override: str | None = None) -> str:
+def _call_llm(
+    prompt: AgentPrompt, user_prompt: str, *, force_json: bool = True, api_key_override: str | None = None
+) -> str:
     settings = get_settings()
     client = _get_client(api_key_override)
     response_format = {"type": "json_object"} if force_json else None
 
-    system_user_messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt},
-    ]
+    system_user_messages = prompt.messages(user_prompt)
+    started = time.monotonic()
 
     # Prefer Responses API if available
     if hasattr(client, "responses"):
@@ -75,12 +101,40 @@ def _call_llm(system_prompt: str, user_prompt: str, *, force_json: bool = True,
             # Older responses.create without response_format
             kwargs.pop("response_format", None)
             response = client.responses.create(**kwargs)
-        return _extract_output_text(response)
+    else:
+        # Fallback to legacy chat.completions
+        kwargs = {"model": settings.openai_model, "messages": system_user_messages}
+        # response_format is not supported on older chat endpoints; omit to avoid errors
+        response = client.chat.completions.create(**kwargs)
+    llm_usage.record(prompt.agent, response, time.monotonic() - started)
+    return _extract_output_text(response)
+
 
-    # Fallback to legacy chat.completions
-    kwargs = {"model": settings.openai_model, "messages": system_user_messages}
-    # response_format is not supported on older chat endpoints; omit to avoid errors
-    response = client.chat.completions.create(**kwargs)
+async def _acall_llm(
+    prompt: AgentPrompt, user_prompt: str, *, force_json: bool = True, api_key_override: str | None = None
+) -> str:
+    """Async counterpart of :func:`_call_llm`; the request does not hold a worker thread."""
+
+    settings = get_settings()
+    client = _get_async_client(api_key_override)
+    response_format = {"type": "json_object"} if force_json else None
+
+    system_user_messages = prompt.messages(user_prompt)
+    started = time.monotonic()
+
+    if hasattr(client, "responses"):
+        kwargs = {"model": settings.openai_model, "input": system_user_messages}
+        if response_format:
+            kwargs["response_format"] = response_format
+        try:
+            response = await client.responses.create(**kwargs)
+        except TypeError:
+            kwargs.pop("response_format", None)
+            response = await client.responses.create(**kwargs)
+    else:
+        kwargs = {"model": settings.openai_model, "messages": system_user_messages}
+        response = await client.chat.completions.create(**kwargs)
+    llm_usage.record(prompt.agent, response, time.monotonic() - started)
     return _extract_output_text(response)
 
 
@@ -94,45 +148,288 @@ def _extract_json_block(text: str) -> str:
     return text
 
 
-def run_character_cast_agent(script: str, style: str, openai_api_key: str | None = None) -> CharacterCastAgentOutput:
-    schema = json.dumps(CharacterCastAgentOutput.model_json_schema(), indent=2)
-    user_prompt = (
-        "Read the following script and respond ONLY with valid JSON conforming to the schema.\n"
-        f"Style (for visual intent): {style}. If style=outline, avoid all color terms; focus on line work only. "
-        "If style=3d, assume Pixar-like stylized 3D. If style=anime, assume flat 2D anime. If style=realistic, assume cinematic realism.\n"
-        f"Schema:\n{schema}\n\n"
-        f"Script:\n" + script.strip()
-    )
-    content = _call_llm(character_cast_agent_prompt.strip(), user_prompt, force_json=True, api_key_override=openai_api_key)
+def _parse_agent_output(content: str, output_model: Type[T], agent: str) -> T:
     json_payload = _extract_json_block(content)
     try:
-        return CharacterCastAgentOutput.model_validate_json(json_payload)
+        return output_model.model_validate_json(json_payload)
     except Exception as exc:  # pylint: disable=broad-except
         snippet = json_payload[:500] if isinstance(json_payload, str) else str(json_payload)[:500]
-        raise RuntimeError(f"Unable to parse character agent output: {exc}. Raw: {snippet}") from exc
-
-
-def run_script_agent(script: str, characters: List[CharacterInfo], style: str, openai_api_key: str | None = None) -> ScriptAgentOutput:
-    schema = json.dumps(ScriptAgentOutput.model_json_schema(), indent=2)
-    characters_json = json.dumps([c.model_dump() for c in characters], indent=2)
-    user_prompt = (
-        "Use the provided script and main characters to output scenes and shots as JSON.\n"
-        f"Style (for framing + tone): {style}. If style=outline, keep descriptions minimal on color and lean on shapes/line clarity; "
-        "3d = Pixar-like stylized 3D; anime = 2D flat anime; realistic = cinematic realism.\n"
-        f"Schema:\n{schema}\n\n"
-        f"Characters:\n{characters_json}\n\n"
-        f"Script:\n{script.strip()}"
+        raise RuntimeError(f"Unable to parse {agent} agent output: {exc}. Raw: {snippet}") from exc
+
+
+def _character_cast_request(script: str, style: str) -> tuple[str, str]:
+    """Return ``(cache_key, user_prompt)`` for a character cast agent call."""
+
+    cache_key = agent_cache_key(
+        CHARACTER_CAST.agent,
+        CHARACTER_CAST.system,
+        CHARACTER_CAST.output_model,
+        {"script": normalize_script(script), "style": style},
     )
-    content = _call_llm(script_agent_prompt.strip(), user_prompt, force_json=True, api_key_override=openai_api_key)
-    json_payload = _extract_json_block(content)
-    try:
-        return ScriptAgentOutput.model_validate_json(json_payload)
-    except Exception as exc:  # pylint: disable=broad-except
-        snippet = json_payload[:500] if isinstance(json_payload, str) else str(json_payload)[:500]
-        raise RuntimeError(f"Unable to parse script agent output: {exc}. Raw: {snippet}") from exc
+    return cache_key, character_cast_user_prompt(script, style)
 
 
-def run_shot_agent(
+def run_character_cast_agent(
+    script: str, style: str, openai_api_key: str | None = None, *, bypass_cache: bool = False
+) -> CharacterCastAgentOutput:
+    cache_key, user_prompt = _character_cast_request(script, style)
+    if not bypass_cache:
+        cached = agent_output_cache.get(cache_key, CharacterCastAgentOutput)
+        if cached is not None:
+            return cached
+
+    content = _call_llm(CHARACTER_CAST, user_prompt, force_json=True, api_key_override=openai_api_key)
+    output = _parse_agent_output(content, CharacterCastAgentOutput, "character")
+    agent_output_cache.set(cache_key, "character_cast", output)
+    return output
+
+
+async def arun_character_cast_agent(
+    script: str, style: str, openai_api_key: str | None = None, *, bypass_cache: bool = False
+) -> CharacterCastAgentOutput:
+    """Async counterpart of :func:`run_character_cast_agent`."""
+
+    cache_key, user_prompt = _character_cast_request(script, style)
+    if not bypass_cache:
+        cached = agent_output_cache.get(cache_key, CharacterCastAgentOutput)
+        if cached is not None:
+            return cached
+
+    content = await _acall_llm(CHARACTER_CAST, user_prompt, force_json=True, api_key_override=openai_api_key)
+    output = _parse_agent_output(content, CharacterCastAgentOutput, "character")
+    agent_output_cache.set(cache_key, "character_cast", output)
+    return output
+
+
+def _script_request(
+    script: str, characters: List[CharacterInfo], style: str, part: tuple[int, int] | None
+) -> tuple[str, str]:
+    """Return ``(cache_key, user_prompt)`` for a script agent call."""
+
+    characters_payload = [c.model_dump() for c in characters]
+    cache_key = agent_cache_key(
+        SCRIPT.agent,
+        SCRIPT.system,
+        SCRIPT.output_model,
+        {"script": normalize_script(script), "style": style, "characters": characters_payload, "part": part},
+    )
+    return cache_key, script_user_prompt(script, characters_payload, style, part)
+
+
+def run_script_agent(
+    script: str,
+    characters: List[CharacterInfo],
+    style: str,
+    openai_api_key: str | None = None,
+    *,
+    bypass_cache: bool = False,
+    part: tuple[int, int] | None = None,
+) -> ScriptAgentOutput:
+    """Break a script into scenes and shots.
+
+    ``part`` is ``(index, total)`` when ``script`` is one chunk of a longer script
+    (see :func:`run_script_agent_chunked`).
+    """
+
+    cache_key, user_prompt = _script_request(script, characters, style, part)
+    if not bypass_cache:
+        cached = agent_output_cache.get(cache_key, ScriptAgentOutput)
+        if cached is not None:
+            return cached
+
+    content = _call_llm(SCRIPT, user_prompt, force_json=True, api_key_override=openai_api_key)
+    output = _parse_agent_output(content, ScriptAgentOutput, "script")
+    agent_output_cache.set(cache_key, "script", output)
+    return output
+
+
+async def arun_script_agent(
+    script: str,
+    characters: List[CharacterInfo],
+    style: str,
+    openai_api_key: str | None = None,
+    *,
+    bypass_cache: bool = False,
+    part: tuple[int, int] | None = None,
+) -> ScriptAgentOutput:
+    """Async counterpart of :func:`run_script_agent`."""
+
+    cache_key, user_prompt = _script_request(script, characters, style, part)
+    if not bypass_cache:
+        cached = agent_output_cache.get(cache_key, ScriptAgentOutput)
+        if cached is not None:
+            return cached
+
+    content = await _acall_llm(SCRIPT, user_prompt, force_json=True, api_key_override=openai_api_key)
+    output = _parse_agent_output(content, ScriptAgentOutput, "script")
+    agent_output_cache.set(cache_key, "script", output)
+    return output
+
+
+_SCENE_HEADING = re.compile(
+    r"^[ \t]*(?:\d+[.)]?[ \t]+)?(?:INT\.|EXT\.|INT/EXT|I/E|EST\.)"
+    r"|^[ \t]*(?:SCENE|Scene|CHAPTER|Chapter)\b"
+    r"|^[ \t]*#{1,6}[ \t]",
+    flags=re.MULTILINE,
+)
+
+
+def _pack_segments(segments: List[str], max_chars: int) -> List[str]:
+    chunks: List[str] = []
+    current = ""
+    for segment in segments:
+        if current and len(current) + len(segment) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += segment
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Cut points for a piece longer than max_chars, coarsest first: paragraphs, lines, sentences.
+_BREAKS = (
+    re.compile(r"(?<=\n\n)"),
+    re.compile(r"(?<=\n)"),
+    re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"'”’)]))(?=\s)"),
+)
+
+
+def _split_oversized(text: str, max_chars: int, level: int = 0) -> List[str]:
+    """Cut ``text`` into pieces of at most ``max_chars``, at the coarsest break that gets there."""
+
+    if len(text) <= max_chars:
+        return [text]
+    if level == len(_BREAKS):
+        # One unpunctuated run longer than a chunk: nothing left but a hard cut.
+        return [text[start : start + max_chars] for start in range(0, len(text), max_chars)]
+    pieces: List[str] = []
+    for part in _BREAKS[level].split(text):
+        pieces.extend(_split_oversized(part, max_chars, level + 1))
+    return pieces
+
+
+def split_script(script: str, max_chars: int) -> List[str]:
+    """Split a script into chunks of at most ``max_chars`` at scene boundaries.
+
+    Scene headings (INT./EXT. sluglines, "Scene"/"Chapter" lines, markdown headings)
+    are preferred cut points. Prose without headings, or a single scene longer than
+    ``max_chars``, is cut at paragraph breaks instead, then at line breaks and
+    sentence ends when a paragraph alone is still too long.
+    """
+
+    text = script.replace("\r\n", "\n").strip()
+    if len(text) <= max_chars:
+        return [text]
+
+    starts = [m.start() for m in _SCENE_HEADING.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    scenes = [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+
+    segments: List[str] = []
+    for scene in scenes:
+        segments.extend(_split_oversized(scene, max_chars))
+
+    return [chunk.strip() for chunk in _pack_segments(segments, max_chars) if chunk.strip()]
+
+
+def _merge_script_outputs(outputs: List[ScriptAgentOutput]) -> ScriptAgentOutput:
+    """Concatenate per-chunk breakdowns and renumber scenes and shots sequentially."""
+
+    scenes: List[Scene] = []
+    for output in outputs:
+        for scene in output.scenes:
+            scenes.append(
+                Scene(
+                    scene_number=len(scenes) + 1,
+                    scene_title=scene.scene_title,
+                    shots=[
+                        Shot(
+                            shot_number=idx,
+                            shot_description=shot.shot_description,
+                            characters_in_shot=shot.characters_in_shot,
+                        )
+                        for idx, shot in enumerate(scene.shots, start=1)
+                    ],
+                )
+            )
+    return ScriptAgentOutput(scenes=scenes)
+
+
+def run_script_agent_chunked(
+    script: str,
+    characters: List[CharacterInfo],
+    style: str,
+    openai_api_key: str | None = None,
+    *,
+    bypass_cache: bool = False,
+    max_chars: int | None = None,
+) -> ScriptAgentOutput:
+    """Map-reduce variant of :func:`run_script_agent` for long scripts.
+
+    The script is split at scene boundaries, each chunk is broken down by its own
+    script agent call in parallel, and the results are merged in script order.
+    """
+
+    settings = get_settings()
+    chunks = split_script(script, max_chars or settings.script_chunk_chars)
+    if len(chunks) == 1:
+        return run_script_agent(script, characters, style, openai_api_key=openai_api_key, bypass_cache=bypass_cache)
+
+    def _run(indexed_chunk):
+        idx, chunk = indexed_chunk
+        return run_script_agent(
+            chunk,
+            characters,
+            style,
+            openai_api_key=openai_api_key,
+            bypass_cache=bypass_cache,
+            part=(idx, len(chunks)),
+        )
+
+    max_workers = max(1, min(len(chunks), settings.script_chunk_max_workers))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outputs = list(executor.map(_run, enumerate(chunks, start=1)))
+    return _merge_script_outputs(outputs)
+
+
+async def arun_script_agent_chunked(
+    script: str,
+    characters: List[CharacterInfo],
+    style: str,
+    openai_api_key: str | None = None,
+    *,
+    bypass_cache: bool = False,
+    max_chars: int | None = None,
+) -> ScriptAgentOutput:
+    """Async counterpart of :func:`run_script_agent_chunked`."""
+
+    settings = get_settings()
+    chunks = split_script(script, max_chars or settings.script_chunk_chars)
+    if len(chunks) == 1:
+        return await arun_script_agent(
+            script, characters, style, openai_api_key=openai_api_key, bypass_cache=bypass_cache
+        )
+
+    semaphore = asyncio.Semaphore(max(1, settings.script_chunk_max_workers))
+
+    async def _run(idx: int, chunk: str) -> ScriptAgentOutput:
+        async with semaphore:
+            return await arun_script_agent(
+                chunk,
+                characters,
+                style,
+                openai_api_key=openai_api_key,
+                bypass_cache=bypass_cache,
+                part=(idx, len(chunks)),
+            )
+
+    outputs = await asyncio.gather(*(_run(idx, chunk) for idx, chunk in enumerate(chunks, start=1)))
+    return _merge_script_outputs(list(outputs))
+
+
+def _shot_agent_prompt(
     *,
     shot_description: str,
     user_request: str,
@@ -140,33 +437,28 @@ def run_shot_agent(
     seed: int,
     characters_in_shot: List[str],
     style: str,
-    characters_catalog: List[str] | None = None,
-    has_asset: bool | None = None,
-    openai_api_key: str | None = None,
-) -> ShotAgentDecision:
-    schema = json.dumps(ShotAgentDecision.model_json_schema(), indent=2)
+    characters_catalog: List[str] | None,
+    has_asset: bool | None,
+) -> str:
+    # Fields that rarely change between edits of a shot come first, the request last.
     context = {
-        "shot_description": shot_description,
-        "seed": seed,
+        "available_characters": characters_catalog or [],
         "characters_in_shot": characters_in_shot,
+        "seed": seed,
+        "has_existing_asset": has_asset,
+        "shot_description": shot_description,
         "previous_structured_prompt": previous_structured_prompt,
         "user_request": user_request,
-        "style": style,
-        "available_characters": characters_catalog or [],
-        "has_existing_asset": has_asset,
     }
-    user_prompt = (
-        "Decide whether to refine or regenerate this shot. Respond ONLY with JSON matching the schema.\n"
-        f"Schema:\n{schema}\n\n"
-        f"Context:\n{json.dumps(context, indent=2)}"
-    )
-    content = _call_llm(shot_agent_prompt.strip(), user_prompt, force_json=True, api_key_override=openai_api_key)
+    return shot_user_prompt(style, context)
+
+
+def _parse_shot_decision(content: str, shot_description: str, user_request: str) -> ShotAgentDecision:
     json_payload = _extract_json_block(content)
     try:
         return ShotAgentDecision.model_validate_json(json_payload)
-    except Exception as exc:  # pylint: disable=broad-except
+    except Exception:  # pylint: disable=broad-except
         # Fallback: if the model drifts off-schema, default to regenerate with user request appended.
-        snippet = json_payload[:500] if isinstance(json_payload, str) else str(json_payload)[:500]
         fallback_desc = f"{shot_description}\nEdit: {user_request}".strip()
         return ShotAgentDecision(
             action="generate",
@@ -174,3 +466,57 @@ def run_shot_agent(
             edit_prompt=None,
             use_reference_images=True,
         )
+
+
+def run_shot_agent(
+    *,
+    shot_description: str,
+    user_request: str,
+    previous_structured_prompt: dict,
+    seed: int,
+    characters_in_shot: List[str],
+    style: str,
+    characters_catalog: List[str] | None = None,
+    has_asset: bool | None = None,
+    openai_api_key: str | None = None,
+) -> ShotAgentDecision:
+    user_prompt = _shot_agent_prompt(
+        shot_description=shot_description,
+        user_request=user_request,
+        previous_structured_prompt=previous_structured_prompt,
+        seed=seed,
+        characters_in_shot=characters_in_shot,
+        style=style,
+        characters_catalog=characters_catalog,
+        has_asset=has_asset,
+    )
+    content = _call_llm(SHOT, user_prompt, force_json=True, api_key_override=openai_api_key)
+    return _parse_shot_decision(content, shot_description, user_request)
+
+
+async def arun_shot_agent(
+    *,
+    shot_description: str,
+    user_request: str,
+    previous_structured_prompt: dict,
+    seed: int,
+    characters_in_shot: List[str],
+    style: str,
+    characters_catalog: List[str] | None = None,
+    has_asset: bool | None = None,
+    openai_api_key: str | None = None,
+) -> ShotAgentDecision:
+    """Async counterpart of :func:`run_shot_agent`."""
+
+    user_prompt = _shot_agent_prompt(
+        shot_description=shot_description,
+        user_request=user_request,
+        previous_structured_prompt=previous_structured_prompt,
+        seed=seed,
+        characters_in_shot=characters_in_shot,
+        style=style,
+        characters_catalog=characters_catalog,
+        has_asset=has_asset,
+    )
+    content = await _acall_llm(SHOT, user_prompt, force_json=True, api_key_override=openai_api_key)
+    return _parse_shot_decision(content, shot_description, user_request)
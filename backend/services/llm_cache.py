@@ -0,0 +1,142 @@
+"""Persistent cache of validated LLM agent outputs.
+
+Ingesting the same script with the same style, model and prompts yields a cache
+hit instead of two sequential LLM round-trips. Entries live in a small SQLite
+database so they survive restarts.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Type, TypeVar
+
+from pydantic import BaseModel
+
+from ..settings import get_settings
+
+# Bump when the user-prompt templates in prompt_compiler change in a way that affects output.
+AGENT_PROMPT_VERSION = 2
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def normalize_script(script: str) -> str:
+    """Normalize line endings and trailing whitespace so cosmetic edits still hit the cache."""
+
+    lines = script.replace("\r\n", "\n").replace("\r", "\n").strip().split("\n")
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def _digest(value) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=32)
+def _prompt_version(system_prompt: str, output_model: Type[BaseModel]) -> str:
+    return _digest(
+        {
+            "version": AGENT_PROMPT_VERSION,
+            "system_prompt": system_prompt,
+            "schema": output_model.model_json_schema(),
+        }
+    )
+
+
+def agent_cache_key(agent: str, system_prompt: str, output_model: Type[BaseModel], inputs: dict) -> str:
+    """Build a cache key from the agent inputs, model name and a version of its prompt + schema."""
+
+    prompt_version = _prompt_version(system_prompt, output_model)
+    return _digest(
+        {
+            "agent": agent,
+            "model": get_settings().openai_model,
+            "prompt_version": prompt_version,
+            "inputs": inputs,
+        }
+    )
+
+
+class AgentOutputCache:
+    def __init__(self, path: str | None, ttl_seconds: float) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agent_outputs ("
+                "key TEXT PRIMARY KEY, agent TEXT NOT NULL, stored_at REAL NOT NULL, output TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, output_model: Type[T]) -> T | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT stored_at, output FROM agent_outputs WHERE key = ?", (key,)
+            ).fetchone()
+        output = None
+        if row is not None and time.time() - row[0] <= self.ttl_seconds:
+            try:
+                output = output_model.model_validate_json(row[1])
+            except Exception:  # pylint: disable=broad-except
+                # Schema drifted since the entry was written; treat as a miss.
+                output = None
+        with self._lock:
+            if output is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return output
+
+    def set(self, key: str, agent: str, output: BaseModel) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO agent_outputs (key, agent, stored_at, output) VALUES (?, ?, ?, ?)",
+                (key, agent, time.time(), output.model_dump_json()),
+            )
+            conn.execute("DELETE FROM agent_outputs WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _build_agent_cache() -> AgentOutputCache:
+    settings = get_settings()
+    return AgentOutputCache(settings.llm_cache_path, settings.llm_cache_ttl_seconds)
+
+
+agent_output_cache = _build_agent_cache()
@@ -0,0 +1,155 @@
+"""Pooled OpenAI clients shared by every agent call.
+
+Clients are cached per resolved API key in a bounded LRU, and entries idle longer
+than ``OPENAI_CLIENT_IDLE_SECONDS`` are dropped so user-supplied keys do not linger.
+All sync clients send through one shared httpx transport, and the async clients
+through one transport per event loop. Connection limits therefore apply across keys,
+and TCP/TLS connections to the API host are reused between calls instead of being
+set up by a fresh client each time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from ..settings import get_settings
+
+C = TypeVar("C")
+
+
+class ClientPool(Generic[C]):
+    """LRU of clients keyed by API key, with idle eviction."""
+
+    def __init__(self, factory: Callable[[str], C], *, max_entries: int, idle_seconds: float) -> None:
+        self._factory = factory
+        self.max_entries = max(1, max_entries)
+        self.idle_seconds = idle_seconds
+        self._clients: OrderedDict[str, tuple[C, float]] = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _evict_idle(self, now: float) -> None:
+        # Ordered least recently used first, so stop at the first fresh entry.
+        while self._clients:
+            _, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used <= self.idle_seconds:
+                return
+            self._clients.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, api_key: str) -> C:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.pop(api_key, None)
+            if entry is None:
+                self._counters["misses"] += 1
+                client = self._factory(api_key)
+            else:
+                self._counters["hits"] += 1
+                client = entry[0]
+            self._clients[api_key] = (client, now)
+            while len(self._clients) > self.max_entries:
+                self._clients.popitem(last=False)
+                self._counters["evictions"] += 1
+            return client
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            return {
+                "clients": len(self._clients),
+                # Short fingerprints only, never the keys themselves.
+                "keys": [hashlib.sha256(key.encode("utf-8")).hexdigest()[:12] for key in self._clients],
+                **self._counters,
+            }
+
+
+def _limits() -> httpx.Limits:
+    settings = get_settings()
+    return httpx.Limits(
+        max_connections=settings.openai_pool_maxsize,
+        max_keepalive_connections=settings.openai_pool_maxsize,
+        keepalive_expiry=settings.openai_keepalive_expiry,
+    )
+
+
+def _build_pool(factory: Callable[[str], C]) -> ClientPool[C]:
+    settings = get_settings()
+    return ClientPool(
+        factory,
+        max_entries=settings.openai_client_cache_size,
+        idle_seconds=settings.openai_client_idle_seconds,
+    )
+
+
+_http_client: httpx.Client | None = None
+_pool: ClientPool[OpenAI] | None = None
+_lock = threading.Lock()
+# loop -> (transport, client pool). Async transports are bound to the loop that
+# created them, so each loop gets its own.
+_async_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+
+def get_client(api_key: str) -> OpenAI:
+    """Return the cached sync client for ``api_key``."""
+
+    global _http_client, _pool
+    with _lock:
+        if _pool is None:
+            http_client = DefaultHttpxClient(limits=_limits())
+            _http_client = http_client
+            _pool = _build_pool(lambda key: OpenAI(api_key=key, http_client=http_client))
+        pool = _pool
+    return pool.get(api_key)
+
+
+def get_async_client(api_key: str) -> AsyncOpenAI:
+    """Return the cached async client for ``api_key`` on the running event loop."""
+
+    loop = asyncio.get_running_loop()
+    state = _async_state.get(loop)
+    if state is None or state[0].is_closed:
+        http_client = DefaultAsyncHttpxClient(limits=_limits())
+        state = (http_client, _build_pool(lambda key: AsyncOpenAI(api_key=key, http_client=http_client)))
+        _async_state[loop] = state
+    return state[1].get(api_key)
+
+
+def stats() -> dict:
+    """Client cache counters for the sync pool and the pools of every live event loop."""
+
+    with _lock:
+        pool = _pool
+    async_pools = [state[1] for state in list(_async_state.values())]
+    return {
+        "sync": pool.stats() if pool is not None else None,
+        "async": [async_pool.stats() for async_pool in async_pools],
+    }
+
+
+def close() -> None:
+    """Drop the sync clients and close their shared transport (used on application shutdown)."""
+
+    global _http_client, _pool
+    with _lock:
+        http_client, _http_client, _pool = _http_client, None, None
+    if http_client is not None:
+        http_client.close()
+
+
+async def aclose() -> None:
+    """Drop the running loop's async clients and close their shared transport."""
+
+    state = _async_state.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state[0].aclose()
@@ -0,0 +1,69 @@
+"""Token and latency accounting for LLM agent calls."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def usage_counts(response: Any) -> tuple[int, int, int]:
+    """Return ``(prompt_tokens, completion_tokens, cached_prompt_tokens)`` from a Chat or Responses reply."""
+
+    usage = _field(response, "usage")
+    prompt = _field(usage, "prompt_tokens")
+    if prompt is None:
+        prompt = _field(usage, "input_tokens")
+    completion = _field(usage, "completion_tokens")
+    if completion is None:
+        completion = _field(usage, "output_tokens")
+    details = _field(usage, "prompt_tokens_details") or _field(usage, "input_tokens_details")
+    return int(prompt or 0), int(completion or 0), int(_field(details, "cached_tokens") or 0)
+
+
+class UsageTracker:
+    """Running totals per agent, reported by ``GET /stats``."""
+
+    def __init__(self) -> None:
+        self._totals: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, response: Any, seconds: float) -> None:
+        prompt, completion, cached = usage_counts(response)
+        print(
+            f"🧮 {agent} agent: {prompt} prompt tokens ({cached} cached), "
+            f"{completion} completion tokens in {seconds:.1f}s"
+        )
+        with self._lock:
+            totals = self._totals.setdefault(
+                agent,
+                {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0},
+            )
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt
+            totals["cached_prompt_tokens"] += cached
+            totals["completion_tokens"] += completion
+            totals["seconds"] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                agent: {
+                    "calls": int(totals["calls"]),
+                    "prompt_tokens": int(totals["prompt_tokens"]),
+                    "cached_prompt_tokens": int(totals["cached_prompt_tokens"]),
+                    "completion_tokens": int(totals["completion_tokens"]),
+                    "avg_latency_ms": round(totals["seconds"] * 1000 / totals["calls"]),
+                }
+                for agent, totals in self._totals.items()
+            }
+
+
+llm_usage = UsageTracker()
@@ -2,17 +2,23 @@
 
 from __future__ import annotations
 
+from contextlib import contextmanager
+from typing import Iterator
+
 from fastapi import HTTPException, status
 
 from ..agent_structured_outputs import CharacterInfo, Scene, Shot
 from ..schemas import (
+    BatchUpdateRequest,
+    BatchUpdateResponse,
     CharacterUpdateRequest,
     CharacterUpdateResponse,
     ShotAsset,
+    ShotOperation,
     ShotUpdateRequest,
     ShotUpdateResponse,
 )
-from ..session_store import SessionStore, session_store
+from ..session_store import SessionData, SessionStore, session_store
 
 
 class SessionUpdateService:
@@ -22,30 +28,28 @@ class SessionUpdateService:
     def _infer_characters_in_text(self, text: str, session) -> list[str]:
         """Lightweight name matching to populate characters_in_shot for new shots."""
 
-        lowered = text.lower()
-        names: list[str] = []
-        for character in session.characters:
-            if character.name.lower() in lowered:
-                names.append(character.name)
-        return names
-
-    def _renumber_shots_with_mapping(self, shots_with_flags: list[dict]) -> tuple[list[Shot], dict[int, int]]:
-        """Renumber shots sequentially and return a mapping from old->new numbers for existing shots."""
-
-        mapping: dict[int, int] = {}
-        renumbered: list[Shot] = []
-        for idx, entry in enumerate(shots_with_flags, start=1):
-            shot = entry["shot"]
-            renumbered.append(
-                Shot(
-                    shot_number=idx,
-                    shot_description=shot.shot_description,
-                    characters_in_shot=shot.characters_in_shot,
-                )
-            )
-            if not entry.get("is_new"):
-                mapping[shot.shot_number] = idx
-        return renumbered, mapping
+        return session.character_matcher().find(text)
+
+    def _renumber_tail(self, session: SessionData, scene: Scene, start: int) -> None:
+        """Renumber ``scene.shots[start:]`` to match their positions, moving their assets along.
+
+        Shots and assets are updated in place; shots before ``start`` are not touched.
+        """
+
+        moved: list[ShotAsset] = []
+        for pos in range(start, len(scene.shots)):
+            shot = scene.shots[pos]
+            new_number = pos + 1
+            if shot.shot_number == new_number:
+                continue
+            asset = session.shot_assets.pop((scene.scene_number, shot.shot_number), None)
+            if asset is not None:
+                asset.shot_number = new_number
+                moved.append(asset)
+            shot.shot_number = new_number
+        for asset in moved:
+            session.shot_assets[(scene.scene_number, asset.shot_number)] = asset
+        session.reindex_scene(scene.scene_number)
 
     def _get_session(self, session_id: str):
         session = self.store.get_session(session_id)
@@ -53,108 +57,193 @@ class SessionUpdateService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
         return session
 
+    @contextmanager
+    def _edit(self, session_id: str, expected_version: int | None) -> Iterator[SessionData]:
+        """Hold the session's lock for a read-modify-write and commit on success."""
+
+        with self.store.session_lock(session_id):
+            session = self._get_session(session_id)
+            if expected_version is not None and session.version != expected_version:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Session changed (now at version {session.version}); reload and retry.",
+                )
+            yield session
+            self.store.update_session(session)
+
     def update_character(self, payload: CharacterUpdateRequest) -> CharacterUpdateResponse:
-        session = self._get_session(payload.session_id)
+        with self._edit(payload.session_id, payload.expected_version) as session:
+            self._apply_character_update(session, payload.name, payload.character_description)
+        return CharacterUpdateResponse(
+            session_id=session.session_id, characters=session.characters, version=session.version
+        )
 
-        idx = next((i for i, c in enumerate(session.characters) if c.name.lower() == payload.name.lower()), None)
+    def _character_index(self, session: SessionData, name: str) -> int:
+        idx = next((i for i, c in enumerate(session.characters) if c.name.lower() == name.lower()), None)
         if idx is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Character not found")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Character not found: {name}")
+        return idx
 
+    def _apply_character_update(self, session: SessionData, name: str, character_description: str) -> None:
+        idx = self._character_index(session, name)
         prev = session.characters[idx]
         session.characters[idx] = CharacterInfo(
             name=prev.name,
-            character_description=payload.character_description,
+            character_description=character_description,
         )
         # Drop asset only if description actually changed
-        if payload.character_description.strip() != (prev.character_description or "").strip():
+        if character_description.strip() != (prev.character_description or "").strip():
             session.character_assets.pop(prev.name, None)
-        self.store.update_session(session)
-        return CharacterUpdateResponse(session_id=session.session_id, characters=session.characters)
 
     def update_shot(self, payload: ShotUpdateRequest) -> ShotUpdateResponse:
-        session = self._get_session(payload.session_id)
+        with self._edit(payload.session_id, payload.expected_version) as session:
+            scene = self._apply_shot_update(session, payload)
+        return ShotUpdateResponse(
+            session_id=session.session_id,
+            scene=scene,
+            shot_assets=self._scene_assets(session, scene),
+            version=session.version,
+        )
 
-        scene_idx = next((i for i, s in enumerate(session.scenes) if s.scene_number == payload.scene_number), None)
-        if scene_idx is None:
+    def _apply_shot_update(self, session: SessionData, payload: ShotUpdateRequest) -> Scene:
+        scene = session.get_scene(payload.scene_number)
+        if scene is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scene not found")
 
-        scene = session.scenes[scene_idx]
-        shots_with_flags: list[dict] = [{"shot": s, "is_new": False} for s in scene.shots]
-        shot_idx = next((i for i, s in enumerate(scene.shots) if s.shot_number == payload.shot_number), None)
+        shot_idx = session.shot_position(payload.scene_number, payload.shot_number)
 
         if shot_idx is not None and not payload.insert_before:
             previous = scene.shots[shot_idx]
             inferred_characters = previous.characters_in_shot or self._infer_characters_in_text(
                 payload.shot_description, session
             )
-            shots_with_flags[shot_idx] = {
-                "shot": Shot(
-                    shot_number=previous.shot_number,
-                    shot_description=payload.shot_description,
-                    characters_in_shot=inferred_characters,
-                ),
-                "is_new": False,
-            }
+            scene.shots[shot_idx] = Shot(
+                shot_number=previous.shot_number,
+                shot_description=payload.shot_description,
+                characters_in_shot=inferred_characters,
+            )
             # Clear stale generated asset for this shot if prompt changed
             if payload.shot_description.strip() != previous.shot_description.strip():
-                key = f"{payload.scene_number}:{payload.shot_number}"
-                session.shot_assets.pop(key, None)
-        else:
-            insert_pos = max(0, min(len(shots_with_flags), payload.shot_number - 1))
-            inferred_characters = self._infer_characters_in_text(payload.shot_description, session)
-            shots_with_flags.insert(
-                insert_pos,
-                {
-                    "shot": Shot(
-                        shot_number=payload.shot_number,
-                        shot_description=payload.shot_description,
-                        characters_in_shot=inferred_characters,
-                    ),
-                    "is_new": True,
-                },
+                session.shot_assets.pop((payload.scene_number, payload.shot_number), None)
+            return scene
+
+        insert_pos = max(0, min(len(scene.shots), payload.shot_number - 1))
+        inferred_characters = self._infer_characters_in_text(payload.shot_description, session)
+        scene.shots.insert(
+            insert_pos,
+            Shot(
+                shot_number=insert_pos + 1,
+                shot_description=payload.shot_description,
+                characters_in_shot=inferred_characters,
+            ),
+        )
+        # Only the shots after the new one shift; their assets follow them.
+        self._renumber_tail(session, scene, insert_pos + 1)
+        return scene
+
+    def _scene_assets(self, session: SessionData, scene: Scene) -> list[ShotAsset]:
+        keys = ((scene.scene_number, shot.shot_number) for shot in scene.shots)
+        return [session.shot_assets[key] for key in keys if key in session.shot_assets]
+
+    def _validate_shot_ops(self, session: SessionData, ops: list[ShotOperation]) -> dict[int, list[ShotOperation]]:
+        """Check every shot operation against the current session and group them by scene."""
+
+        by_scene: dict[int, list[ShotOperation]] = {}
+        for op in ops:
+            if session.get_scene(op.scene_number) is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail=f"Scene not found: {op.scene_number}"
+                )
+            if op.op in {"update", "delete"} and session.shot_position(op.scene_number, op.shot_number) is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Shot not found: scene {op.scene_number} shot {op.shot_number}",
+                )
+            if op.op in {"update", "insert"} and not (op.shot_description or "").strip():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"shot_description is required to {op.op} scene {op.scene_number} shot {op.shot_number}",
+                )
+            by_scene.setdefault(op.scene_number, []).append(op)
+        return by_scene
+
+    def _apply_scene_ops(self, session: SessionData, scene: Scene, ops: list[ShotOperation]) -> None:
+        """Apply one scene's operations, then renumber the scene once from the first change."""
+
+        updates: dict[int, str] = {}
+        deletes: set[int] = set()
+        inserts: dict[int, list[str]] = {}
+        for op in ops:
+            if op.op == "update":
+                updates[op.shot_number] = op.shot_description
+            elif op.op == "delete":
+                deletes.add(op.shot_number)
+            else:
+                inserts.setdefault(op.shot_number, []).append(op.shot_description)
+
+        def _new_shot(description: str) -> Shot:
+            # Number 0 never has an asset; the renumbering pass assigns the real number.
+            return Shot(
+                shot_number=0,
+                shot_description=description,
+                characters_in_shot=self._infer_characters_in_text(description, session),
             )
 
-        renumbered_shots, mapping = self._renumber_shots_with_mapping(shots_with_flags)
-
-        # Re-key shot assets for this scene to follow any renumbering
-        new_shot_assets = {}
-        for key, asset in session.shot_assets.items():
-            try:
-                scene_str, shot_str = key.split(":", maxsplit=1)
-                scene_key = int(scene_str)
-                shot_key = int(shot_str)
-            except ValueError:
-                continue
-            if scene_key != payload.scene_number:
-                new_shot_assets[key] = asset
+        shots: list[Shot] = []
+        first_change: int | None = None
+        for shot in scene.shots:
+            number = shot.shot_number
+            if number in inserts:
+                first_change = len(shots) if first_change is None else first_change
+                shots.extend(_new_shot(description) for description in inserts.pop(number))
+            if number in deletes:
+                first_change = len(shots) if first_change is None else first_change
+                session.shot_assets.pop((scene.scene_number, number), None)
                 continue
-
-            new_shot_number = mapping.get(shot_key)
-            if new_shot_number is None:
-                # Asset removed because the shot was deleted or replaced
-                continue
-            updated_asset = ShotAsset(
-                scene_number=asset.scene_number,
-                shot_number=new_shot_number,
-                shot_description=asset.shot_description,
-                characters_in_shot=asset.characters_in_shot,
-                image_url=asset.image_url,
-                seed=asset.seed,
-                structured_prompt=asset.structured_prompt,
-                raw_structured_prompt=asset.raw_structured_prompt,
-            )
-            new_key = f"{scene_key}:{new_shot_number}"
-            new_shot_assets[new_key] = updated_asset
-
-        session.shot_assets = new_shot_assets
-        session.scenes[scene_idx] = Scene(
-            scene_number=scene.scene_number,
-            scene_title=scene.scene_title,
-            shots=renumbered_shots,
-        )
-        self.store.update_session(session)
-        return ShotUpdateResponse(
+            description = updates.get(number)
+            if description is not None:
+                if description.strip() != shot.shot_description.strip():
+                    session.shot_assets.pop((scene.scene_number, number), None)
+                shot = Shot(
+                    shot_number=number,
+                    shot_description=description,
+                    characters_in_shot=shot.characters_in_shot
+                    or self._infer_characters_in_text(description, session),
+                )
+            shots.append(shot)
+        # Inserts addressed past the last shot are appended in shot-number order.
+        for number in sorted(inserts):
+            first_change = len(shots) if first_change is None else first_change
+            shots.extend(_new_shot(description) for description in inserts[number])
+
+        scene.shots[:] = shots
+        if first_change is not None:
+            self._renumber_tail(session, scene, first_change)
+
+    def apply_batch(self, payload: BatchUpdateRequest) -> BatchUpdateResponse:
+        """Apply shot and character edits to one session atomically.
+
+        Shot numbers in the operations refer to the numbering before the batch, so
+        callers can send edits for everything they display without adjusting numbers.
+        Everything is validated before any change is made, and the session is committed
+        once.
+        """
+
+        with self._edit(payload.session_id, payload.expected_version) as session:
+            for change in payload.characters:
+                self._character_index(session, change.name)
+            ops_by_scene = self._validate_shot_ops(session, payload.shots)
+
+            for change in payload.characters:
+                self._apply_character_update(session, change.name, change.character_description)
+            scenes = [session.get_scene(scene_number) for scene_number in ops_by_scene]
+            for scene in scenes:
+                self._apply_scene_ops(session, scene, ops_by_scene[scene.scene_number])
+
+        return BatchUpdateResponse(
             session_id=session.session_id,
-            scenes=session.scenes,
-            shot_assets=list(session.shot_assets.values()) or None,
+            characters=session.characters,
+            scenes=scenes,
+            shot_assets=[asset for scene in scenes for asset in self._scene_assets(session, scene)],
+            version=session.version,
         )
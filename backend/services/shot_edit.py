@@ -5,36 +5,53 @@ from __future__ import annotations
 from fastapi import HTTPException, status
 import re
 
-from ..agent_structured_outputs import Scene, Shot, ShotAgentDecision
-from ..agent_tools import generate_shot_with_refs, refine_shot_with_refs
+from ..agent_structured_outputs import Shot, ShotAgentDecision
+from ..agent_tools import agenerate_shot_with_refs, arefine_shot_with_refs
 from ..schemas import ShotAsset, ShotEditRequest, ShotEditResponse
 from ..session_store import SessionStore, session_store
-from .llm_agents import run_shot_agent
+from ..settings import get_settings
+from .edit_planner import EditPlan, edit_planner
+from .llm_agents import arun_shot_agent
 
 
 class ShotEditService:
     def __init__(self, store: SessionStore | None = None) -> None:
         self.store = store or session_store
 
-    def _get_session_shot_data(self, session_id: str, scene_number: int, shot_number: int):
-        session = self.store.get_session(session_id)
+    async def _get_session_shot_data(self, session_id: str, scene_number: int, shot_number: int):
+        session = await self.store.aget_session(session_id)
         if not session:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
-        key = f"{scene_number}:{shot_number}"
-        shot_asset = session.shot_assets.get(key)
-        planned_shot = None
-        for scene in session.scenes:
-            if scene.scene_number != scene_number:
-                continue
-            planned_shot = next((s for s in scene.shots if s.shot_number == shot_number), None)
-            break
+        shot_asset = session.shot_assets.get((scene_number, shot_number))
+        planned_shot = session.get_shot(scene_number, shot_number)
 
         if not planned_shot:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shot not found")
 
         return session, shot_asset, planned_shot
 
+    def _set_planned_shot(
+        self, session, scene_number: int, shot_number: int, description: str, characters_in_shot: list[str]
+    ) -> None:
+        scene = session.get_scene(scene_number)
+        shot_pos = session.shot_position(scene_number, shot_number)
+        if shot_pos is None:
+            return
+        scene.shots[shot_pos] = Shot(
+            shot_number=shot_number,
+            shot_description=description,
+            characters_in_shot=characters_in_shot,
+        )
+
+    def _store_edit(self, session, payload: ShotEditRequest, asset: ShotAsset) -> None:
+        session.shot_assets[(payload.scene_number, payload.shot_number)] = asset
+        # Persist the updated description in the scene so the UI (and the prompt text
+        # area) reflects the agent change.
+        self._set_planned_shot(
+            session, payload.scene_number, payload.shot_number, asset.shot_description, asset.characters_in_shot
+        )
+
     def _infer_characters_in_text(self, description: str, session) -> list[str]:
         """Fuzzy match character names in free text.
 
@@ -42,24 +59,7 @@ class ShotEditService:
         to support prompts that only mention "Dorothy" instead of "Dorothy Gale".
         """
 
-        lowered = description.lower()
-        names: list[str] = []
-        for character in session.characters:
-            full = character.name.lower()
-            tokens = [t for t in re.split(r"[\s\-]+", full) if len(t) > 2]
-            match_full = full in lowered
-            match_token = any(token in lowered for token in tokens)
-            if match_full or match_token:
-                names.append(character.name)
-        # Preserve ordering but unique
-        seen = set()
-        ordered = []
-        for name in names:
-            if name in seen:
-                continue
-            seen.add(name)
-            ordered.append(name)
-        return ordered
+        return session.character_matcher().find(description, fuzzy=True)
 
     def _strip_reference_hint(self, text: str) -> str:
         """Remove LLM-side helper hints like '(use provided character reference)'."""
@@ -77,6 +77,16 @@ class ShotEditService:
             return [session.characters[0].name]
         return current
 
+    def _plan_locally(self, session, shot_asset: ShotAsset, user_request: str) -> EditPlan | None:
+        if not get_settings().shot_edit_fast_path:
+            return None
+        return edit_planner.plan(
+            user_request,
+            shot_asset.structured_prompt,
+            characters_in_shot=shot_asset.characters_in_shot,
+            mentioned_characters=self._infer_characters_in_text(user_request, session),
+        )
+
     def _collect_references(self, session, characters: list[str]) -> list[str]:
         refs: list[str] = []
         missing: list[str] = []
@@ -94,8 +104,8 @@ class ShotEditService:
             )
         return refs
 
-    def edit(self, payload: ShotEditRequest) -> ShotEditResponse:
-        session, shot_asset, planned_shot = self._get_session_shot_data(
+    async def edit(self, payload: ShotEditRequest) -> ShotEditResponse:
+        session, shot_asset, planned_shot = await self._get_session_shot_data(
             payload.session_id, payload.scene_number, payload.shot_number
         )
 
@@ -107,7 +117,7 @@ class ShotEditService:
             combined_description = "\n".join(filter(None, [base_description, payload.user_request])).strip()
 
             try:
-                decision = run_shot_agent(
+                decision = await arun_shot_agent(
                     shot_description=base_description or "Placeholder shot",
                     user_request=payload.user_request,
                     previous_structured_prompt={},
@@ -140,11 +150,12 @@ class ShotEditService:
                 references = []
 
             try:
-                result = generate_shot_with_refs(
+                result = await agenerate_shot_with_refs(
                     shot_description=new_description,
                     style=session.style,
                     reference_image_urls=references,
                     bria_api_token=payload.bria_api_token,
+                    bypass_cache=payload.bypass_cache,
                 )
             except RuntimeError as exc:
                 raise HTTPException(
@@ -164,53 +175,37 @@ class ShotEditService:
                 seed=result["seed"],
                 structured_prompt=result["structured_prompt"],
                 raw_structured_prompt=result["raw_structured_prompt"],
+                local_url=result.get("local_url"),
+                thumbnails=result.get("thumbnails") or {},
+            )
+            await self.store.aedit_session(
+                session.session_id, lambda current: self._store_edit(current, payload, generated)
             )
-            key = f"{payload.scene_number}:{payload.shot_number}"
-            session.shot_assets[key] = generated
-
-            # Persist updated description in the scene so the UI reflects the agent change.
-            for scene_idx, scene in enumerate(session.scenes):
-                if scene.scene_number != payload.scene_number:
-                    continue
-                updated_shots: list[Shot] = []
-                for shot in scene.shots:
-                    if shot.shot_number == payload.shot_number:
-                        updated_shots.append(
-                            Shot(
-                                shot_number=shot.shot_number,
-                                shot_description=new_description,
-                                characters_in_shot=characters_in_shot,
-                            )
-                        )
-                    else:
-                        updated_shots.append(shot)
-                session.scenes[scene_idx] = Scene(
-                    scene_number=scene.scene_number,
-                    scene_title=scene.scene_title,
-                    shots=updated_shots,
-                )
-                break
-
-            self.store.update_session(session)
             return ShotEditResponse(session_id=session.session_id, decision=decision.action, shot=generated)
 
-        try:
-            decision = run_shot_agent(
-                shot_description=shot_asset.shot_description,
-                user_request=payload.user_request,
-                previous_structured_prompt=shot_asset.structured_prompt,
-                seed=shot_asset.seed,
-                characters_in_shot=shot_asset.characters_in_shot,
-                style=session.style,
-                characters_catalog=[c.name for c in session.characters],
-                has_asset=True,
-                openai_api_key=payload.openai_api_key,
-            )
-        except RuntimeError as exc:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Shot agent failed: {exc}",
-            ) from exc
+        # Simple edits ("make it night", "change her jacket to red") are planned locally;
+        # everything else goes through the shot agent.
+        plan = self._plan_locally(session, shot_asset, payload.user_request)
+        if plan is not None:
+            decision = plan.decision
+        else:
+            try:
+                decision = await arun_shot_agent(
+                    shot_description=shot_asset.shot_description,
+                    user_request=payload.user_request,
+                    previous_structured_prompt=shot_asset.structured_prompt,
+                    seed=shot_asset.seed,
+                    characters_in_shot=shot_asset.characters_in_shot,
+                    style=session.style,
+                    characters_catalog=[c.name for c in session.characters],
+                    has_asset=True,
+                    openai_api_key=payload.openai_api_key,
+                )
+            except RuntimeError as exc:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Shot agent failed: {exc}",
+                ) from exc
 
         action = decision.action.lower().strip()
         use_refs_flag = decision.use_reference_images
@@ -236,12 +231,13 @@ class ShotEditService:
                 references = self._collect_references(session, shot_asset.characters_in_shot)
 
             try:
-                result = refine_shot_with_refs(
+                result = await arefine_shot_with_refs(
                     edit_prompt=edit_prompt,
-                    previous_structured_prompt=shot_asset.structured_prompt,
+                    previous_structured_prompt=plan.structured_prompt if plan else shot_asset.structured_prompt,
                     seed=shot_asset.seed,
                     reference_image_urls=references or None,
                     bria_api_token=payload.bria_api_token,
+                    bypass_cache=payload.bypass_cache,
                 )
             except RuntimeError as exc:
                 raise HTTPException(
@@ -258,11 +254,12 @@ class ShotEditService:
                 references = self._collect_references(session, new_characters_in_shot)
 
             try:
-                result = generate_shot_with_refs(
+                result = await agenerate_shot_with_refs(
                     shot_description=description,
                     style=session.style,
                     reference_image_urls=references,
                     bria_api_token=payload.bria_api_token,
+                    bypass_cache=payload.bypass_cache,
                 )
             except RuntimeError as exc:
                 raise HTTPException(
@@ -298,35 +295,12 @@ class ShotEditService:
             seed=result["seed"],
             structured_prompt=result["structured_prompt"],
             raw_structured_prompt=result["raw_structured_prompt"],
+            local_url=result.get("local_url"),
+            thumbnails=result.get("thumbnails") or {},
         )
 
-        key = f"{payload.scene_number}:{payload.shot_number}"
-        session.shot_assets[key] = updated
-
-        # Also persist the updated description in the structured scenes so the prompt
-        # text area shows the agent's change.
-        for scene_idx, scene in enumerate(session.scenes):
-            if scene.scene_number != payload.scene_number:
-                continue
-            updated_shots: list[Shot] = []
-            for shot in scene.shots:
-                if shot.shot_number == payload.shot_number:
-                    updated_shots.append(
-                        Shot(
-                            shot_number=shot.shot_number,
-                            shot_description=new_shot_description,
-                            characters_in_shot=characters_in_shot_final,
-                        )
-                    )
-                else:
-                    updated_shots.append(shot)
-            session.scenes[scene_idx] = Scene(
-                scene_number=scene.scene_number,
-                scene_title=scene.scene_title,
-                shots=updated_shots,
-            )
-            break
-
-        self.store.update_session(session)
+        await self.store.aedit_session(
+            session.session_id, lambda current: self._store_edit(current, payload, updated)
+        )
 
         return ShotEditResponse(session_id=session.session_id, decision=action, shot=updated)
@@ -2,20 +2,26 @@
 
 from __future__ import annotations
 
-from typing import Iterable
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterable, Iterator
 
 from fastapi import HTTPException, status
 
 from ..agent_structured_outputs import Scene, Shot
-from ..agent_tools import generate_shot_with_refs
+from ..agent_tools import agenerate_shot_with_refs, generate_shot_with_refs
 from ..schemas import (
+    GenerationPlan,
     ShotAsset,
+    ShotGenerationFailure,
     ShotGenerationRequest,
     ShotGenerationResponse,
+    ShotGenerationSummary,
     SingleShotGenerationRequest,
     SingleShotGenerationResponse,
 )
 from ..session_store import SessionStore, session_store
+from ..settings import get_settings
 
 
 class ShotGenerationService:
@@ -45,14 +51,13 @@ class ShotGenerationService:
         references: list[str] = []
         missing: list[str] = []
 
+        matcher = session.character_matcher()
         for name in shot.characters_in_shot:
             asset = session.character_assets.get(name)
             if not asset:
-                # fallback to case-insensitive match
-                for key, val in session.character_assets.items():
-                    if key.lower() == name.lower():
-                        asset = val
-                        break
+                # fallback to case-insensitive match against the cast spelling
+                canonical = matcher.canonical(name)
+                asset = session.character_assets.get(canonical) if canonical else None
             if asset:
                 references.append(asset.image_url)
             else:
@@ -70,63 +75,257 @@ class ShotGenerationService:
 
         return references
 
-    def generate(self, payload: ShotGenerationRequest) -> ShotGenerationResponse:
-        session = self.store.get_session(payload.session_id)
-        if not session:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    def _build_asset(self, scene: Scene, shot: Shot, result: dict) -> ShotAsset:
+        return ShotAsset(
+            scene_number=scene.scene_number,
+            shot_number=shot.shot_number,
+            shot_description=shot.shot_description,
+            characters_in_shot=shot.characters_in_shot,
+            image_url=result["image_url"],
+            seed=result["seed"],
+            structured_prompt=result["structured_prompt"],
+            raw_structured_prompt=result["raw_structured_prompt"],
+            local_url=result.get("local_url"),
+            thumbnails=result.get("thumbnails") or {},
+        )
+
+    def _apply_asset(self, current, asset: ShotAsset) -> bool:
+        shot = current.get_shot(asset.scene_number, asset.shot_number)
+        if shot is None or shot.shot_description != asset.shot_description:
+            return False
+        current.shot_assets[(asset.scene_number, asset.shot_number)] = asset
+        return True
+
+    def _commit_asset(self, session_id: str, asset: ShotAsset) -> bool:
+        """Store a rendered shot on the latest session state.
+
+        Returns False (and drops the render) if the shot was edited or removed while it
+        was being generated.
+        """
+
+        with self.store.edit_session(session_id) as current:
+            return self._apply_asset(current, asset)
+
+    async def _acommit_asset(self, session_id: str, asset: ShotAsset) -> bool:
+        return await self.store.aedit_session(session_id, lambda current: self._apply_asset(current, asset))
+
+    def _render_failed(self, scene: Scene, shot: Shot, exc: RuntimeError) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Shot generation failed for scene {scene.scene_number} shot {shot.shot_number}: {exc}",
+        )
 
-        scenes_to_process = self._filter_scenes(session.scenes, payload.scene_numbers)
-        generated_shots: list[ShotAsset] = []
+    def _failure_record(self, job: tuple[Scene, Shot, list[str], str], exc: RuntimeError) -> ShotGenerationFailure:
+        scene, shot, _, _ = job
+        return ShotGenerationFailure(scene_number=scene.scene_number, shot_number=shot.shot_number, detail=str(exc))
 
-        for scene in scenes_to_process:
+    def _resolve_max_workers(self, requested: int | None, total: int) -> int:
+        limit = max(1, get_settings().shot_generation_max_workers)
+        if requested:
+            limit = min(limit, requested)
+        return max(1, min(limit, total))
+
+    def _plan_jobs(self, session, scene_numbers: Iterable[int] | None) -> list[tuple[Scene, Shot, list[str], str]]:
+        """Resolve every shot to render, validating references before any Bria call is made."""
+
+        jobs: list[tuple[Scene, Shot, list[str], str]] = []
+        for scene in self._filter_scenes(session.scenes, scene_numbers):
             for shot in scene.shots:
                 references = self._collect_references(shot, session)
-                shot_description = self._compose_shot_description(scene, shot)
+                jobs.append((scene, shot, references, self._compose_shot_description(scene, shot)))
+        return jobs
+
+    def _iter_renders(
+        self, session, jobs: list[tuple[Scene, Shot, list[str], str]], payload: ShotGenerationRequest
+    ) -> Iterator[tuple[int, ShotAsset | None, RuntimeError | None]]:
+        """Render jobs concurrently and yield ``(index, asset, error)`` as each shot finishes.
+
+        Each successful shot is committed to the session as soon as it finishes.
+        Closing the iterator early cancels shots that have not started yet.
+        """
+
+        def _generate(job):
+            _, _, references, shot_description = job
+            return generate_shot_with_refs(
+                shot_description=shot_description,
+                style=session.style,
+                reference_image_urls=references,
+                bria_api_token=payload.bria_api_token,
+                bypass_cache=payload.bypass_cache,
+            )
 
+        executor = ThreadPoolExecutor(max_workers=self._resolve_max_workers(payload.max_concurrency, len(jobs)))
+        try:
+            future_map = {executor.submit(_generate, job): idx for idx, job in enumerate(jobs)}
+            for future in as_completed(future_map):
+                idx = future_map[future]
+                scene, shot, _, _ = jobs[idx]
                 try:
-                    result = generate_shot_with_refs(
-                        shot_description=shot_description,
-                        style=session.style,
-                        reference_image_urls=references,
-                        bria_api_token=payload.bria_api_token,
-                    )
+                    result = future.result()
                 except RuntimeError as exc:
-                    raise HTTPException(
-                        status_code=status.HTTP_502_BAD_GATEWAY,
-                        detail=(
-                            f"Shot generation failed for scene {scene.scene_number} "
-                            f"shot {shot.shot_number}: {exc}"
-                        ),
-                    ) from exc
-
-                asset = ShotAsset(
-                    scene_number=scene.scene_number,
-                    shot_number=shot.shot_number,
-                    shot_description=shot.shot_description,
-                    characters_in_shot=shot.characters_in_shot,
-                    image_url=result["image_url"],
-                    seed=result["seed"],
-                    structured_prompt=result["structured_prompt"],
-                    raw_structured_prompt=result["raw_structured_prompt"],
+                    yield idx, None, exc
+                    continue
+
+                asset = self._build_asset(scene, shot, result)
+                if not self._commit_asset(session.session_id, asset):
+                    yield idx, None, RuntimeError("shot was edited while rendering; result discarded")
+                    continue
+                yield idx, asset, None
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _aiter_renders(
+        self, session, jobs: list[tuple[Scene, Shot, list[str], str]], payload: ShotGenerationRequest
+    ) -> AsyncIterator[tuple[int, ShotAsset | None, RuntimeError | None]]:
+        """Async counterpart of :meth:`_iter_renders`; renders are tasks rather than threads.
+
+        ``max_concurrency`` still caps how many of this batch's shots render at once.
+        Closing the iterator early cancels the shots still in flight.
+        """
+
+        semaphore = asyncio.Semaphore(self._resolve_max_workers(payload.max_concurrency, len(jobs)))
+
+        async def _generate(job):
+            _, _, references, shot_description = job
+            async with semaphore:
+                return await agenerate_shot_with_refs(
+                    shot_description=shot_description,
+                    style=session.style,
+                    reference_image_urls=references,
+                    bria_api_token=payload.bria_api_token,
+                    bypass_cache=payload.bypass_cache,
                 )
 
-                key = f"{scene.scene_number}:{shot.shot_number}"
-                session.shot_assets[key] = asset
-                generated_shots.append(asset)
+        task_map = {asyncio.ensure_future(_generate(job)): idx for idx, job in enumerate(jobs)}
+        pending = set(task_map)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    idx = task_map[task]
+                    scene, shot, _, _ = jobs[idx]
+                    try:
+                        result = task.result()
+                    except RuntimeError as exc:
+                        yield idx, None, exc
+                        continue
 
-        self.store.update_session(session)
-        return ShotGenerationResponse(session_id=session.session_id, shots=generated_shots)
+                    asset = self._build_asset(scene, shot, result)
+                    if not await self._acommit_asset(session.session_id, asset):
+                        yield idx, None, RuntimeError("shot was edited while rendering; result discarded")
+                        continue
+                    yield idx, asset, None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(self, payload: ShotGenerationRequest) -> ShotGenerationResponse:
+        session = await self.store.aget_session(payload.session_id)
+        if not session:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+
+        jobs = self._plan_jobs(session, payload.scene_numbers)
+        if not jobs:
+            return ShotGenerationResponse(session_id=session.session_id, shots=[])
+
+        generated: list[ShotAsset | None] = [None] * len(jobs)
+        renders = self._aiter_renders(session, jobs, payload)
+        try:
+            async for idx, asset, exc in renders:
+                if exc is not None:
+                    scene, shot, _, _ = jobs[idx]
+                    raise self._render_failed(scene, shot, exc) from exc
+                generated[idx] = asset
+        finally:
+            await renders.aclose()
+
+        return ShotGenerationResponse(session_id=session.session_id, shots=generated)
+
+    def stream(
+        self, payload: ShotGenerationRequest
+    ) -> Iterator[tuple[str, GenerationPlan | ShotAsset | ShotGenerationFailure | ShotGenerationSummary]]:
+        """Validate the request eagerly, then return an iterator of ``(event, record)`` pairs.
+
+        The stream opens with a ``"plan"`` record giving the number of shots, then emits a
+        ``"shot"`` record as soon as each shot finishes and a ``"failure"`` record for each
+        shot that could not be rendered; it always ends with a single ``"summary"`` record.
+        """
 
-    def generate_single(self, payload: SingleShotGenerationRequest) -> SingleShotGenerationResponse:
         session = self.store.get_session(payload.session_id)
         if not session:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
-        scene = next((s for s in session.scenes if s.scene_number == payload.scene_number), None)
+        jobs = self._plan_jobs(session, payload.scene_numbers)
+
+        def _events():
+            yield "plan", GenerationPlan(session_id=session.session_id, total=len(jobs))
+            failures: list[ShotGenerationFailure] = []
+            generated = 0
+            if jobs:
+                for idx, asset, exc in self._iter_renders(session, jobs, payload):
+                    if exc is None:
+                        generated += 1
+                        yield "shot", asset
+                        continue
+                    failure = self._failure_record(jobs[idx], exc)
+                    failures.append(failure)
+                    yield "failure", failure
+            yield "summary", ShotGenerationSummary(
+                session_id=session.session_id,
+                total=len(jobs),
+                generated=generated,
+                failures=failures,
+            )
+
+        return _events()
+
+    async def astream(
+        self, payload: ShotGenerationRequest
+    ) -> AsyncIterator[tuple[str, GenerationPlan | ShotAsset | ShotGenerationFailure | ShotGenerationSummary]]:
+        """Async counterpart of :meth:`stream`, emitting the same records."""
+
+        session = await self.store.aget_session(payload.session_id)
+        if not session:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+
+        jobs = self._plan_jobs(session, payload.scene_numbers)
+
+        async def _events():
+            yield "plan", GenerationPlan(session_id=session.session_id, total=len(jobs))
+            failures: list[ShotGenerationFailure] = []
+            generated = 0
+            if jobs:
+                renders = self._aiter_renders(session, jobs, payload)
+                try:
+                    async for idx, asset, exc in renders:
+                        if exc is None:
+                            generated += 1
+                            yield "shot", asset
+                            continue
+                        failure = self._failure_record(jobs[idx], exc)
+                        failures.append(failure)
+                        yield "failure", failure
+                finally:
+                    await renders.aclose()
+            yield "summary", ShotGenerationSummary(
+                session_id=session.session_id,
+                total=len(jobs),
+                generated=generated,
+                failures=failures,
+            )
+
+        return _events()
+
+    async def generate_single(self, payload: SingleShotGenerationRequest) -> SingleShotGenerationResponse:
+        session = await self.store.aget_session(payload.session_id)
+        if not session:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+
+        scene = session.get_scene(payload.scene_number)
         if not scene:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scene not found")
 
-        shot = next((s for s in scene.shots if s.shot_number == payload.shot_number), None)
+        shot = session.get_shot(payload.scene_number, payload.shot_number)
         if not shot:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shot not found")
 
@@ -134,32 +333,20 @@ class ShotGenerationService:
         shot_description = self._compose_shot_description(scene, shot)
 
         try:
-            result = generate_shot_with_refs(
+            result = await agenerate_shot_with_refs(
                 shot_description=shot_description,
                 style=session.style,
                 reference_image_urls=references,
                 bria_api_token=payload.bria_api_token,
+                bypass_cache=payload.bypass_cache,
             )
         except RuntimeError as exc:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=(
-                    f"Shot generation failed for scene {scene.scene_number} "
-                    f"shot {shot.shot_number}: {exc}"
-                ),
-            ) from exc
+            raise self._render_failed(scene, shot, exc) from exc
 
-        asset = ShotAsset(
-            scene_number=scene.scene_number,
-            shot_number=shot.shot_number,
-            shot_description=shot.shot_description,
-            characters_in_shot=shot.characters_in_shot,
-            image_url=result["image_url"],
-            seed=result["seed"],
-            structured_prompt=result["structured_prompt"],
-            raw_structured_prompt=result["raw_structured_prompt"],
-        )
-        key = f"{scene.scene_number}:{shot.shot_number}"
-        session.shot_assets[key] = asset
-        self.store.update_session(session)
+        asset = self._build_asset(scene, shot, result)
+        if not await self._acommit_asset(session.session_id, asset):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Scene {scene.scene_number} shot {shot.shot_number} was edited while rendering; retry.",
+            )
         return SingleShotGenerationResponse(session_id=session.session_id, shot=asset)
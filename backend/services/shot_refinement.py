@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from fastapi import HTTPException, status
 
-from ..agent_tools import refine_shot_with_refs
+from ..agent_tools import arefine_shot_with_refs
 from ..schemas import ShotAsset, ShotRefineRequest, ShotRefineResponse
 from ..session_store import SessionStore, session_store
 
@@ -14,8 +14,7 @@ class ShotRefinementService:
         self.store = store or session_store
 
     def _get_shot_asset(self, session, scene_number: int, shot_number: int) -> ShotAsset:
-        key = f"{scene_number}:{shot_number}"
-        asset = session.shot_assets.get(key)
+        asset = session.shot_assets.get((scene_number, shot_number))
         if not asset:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -42,8 +41,8 @@ class ShotRefinementService:
             )
         return refs
 
-    def refine(self, payload: ShotRefineRequest) -> ShotRefineResponse:
-        session = self.store.get_session(payload.session_id)
+    async def refine(self, payload: ShotRefineRequest) -> ShotRefineResponse:
+        session = await self.store.aget_session(payload.session_id)
         if not session:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
 
@@ -51,12 +50,13 @@ class ShotRefinementService:
         references = self._collect_references(shot_asset, session) if payload.use_reference_images else []
 
         try:
-            result = refine_shot_with_refs(
+            result = await arefine_shot_with_refs(
                 edit_prompt=payload.edit_prompt,
                 previous_structured_prompt=shot_asset.structured_prompt,
                 seed=shot_asset.seed,
                 reference_image_urls=references or None,
                 bria_api_token=payload.bria_api_token,
+                bypass_cache=payload.bypass_cache,
             )
         except RuntimeError as exc:
             raise HTTPException(
@@ -76,10 +76,13 @@ class ShotRefinementService:
             seed=result["seed"],
             structured_prompt=result["structured_prompt"],
             raw_structured_prompt=result["raw_structured_prompt"],
+            local_url=result.get("local_url"),
+            thumbnails=result.get("thumbnails") or {},
         )
 
-        key = f"{payload.scene_number}:{payload.shot_number}"
-        session.shot_assets[key] = updated
-        self.store.update_session(session)
+        def _store(current) -> None:
+            current.shot_assets[(payload.scene_number, payload.shot_number)] = updated
+
+        await self.store.aedit_session(session.session_id, _store)
 
         return ShotRefineResponse(session_id=session.session_id, shot=updated)
@@ -0,0 +1,136 @@
+"""Service layer that saves a description edit and renders it in a single request."""
+
+from __future__ import annotations
+
+import asyncio
+
+from fastapi import HTTPException, status
+
+from ..schemas import (
+    CharacterGenerationRequest,
+    CharacterUpdateAndGenerateRequest,
+    CharacterUpdateAndGenerateResponse,
+    CharacterUpdateRequest,
+    ShotUpdateAndGenerateRequest,
+    ShotUpdateAndGenerateResponse,
+    ShotUpdateRequest,
+    SingleShotGenerationRequest,
+)
+from ..session_store import SessionStore, session_store
+from .character_generation import CharacterGenerationService
+from .session_updates import SessionUpdateService
+from .shot_generation import ShotGenerationService
+
+
+class UpdateAndRenderService:
+    """Fuse ``/…/update`` with the matching render call.
+
+    Saving an unchanged description keeps the existing asset, so the render is skipped
+    unless there is no image yet (or, for shots, ``force`` is set).
+    """
+
+    def __init__(self, store: SessionStore | None = None) -> None:
+        self.store = store or session_store
+        self.updates = SessionUpdateService(self.store)
+        self.shots = ShotGenerationService(self.store)
+        self.characters = CharacterGenerationService(self.store)
+
+    async def _get_session(self, session_id: str):
+        session = await self.store.aget_session(session_id)
+        if not session:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+        return session
+
+    async def update_and_generate_shot(self, payload: ShotUpdateAndGenerateRequest) -> ShotUpdateAndGenerateResponse:
+        session = await self._get_session(payload.session_id)
+        if session.get_shot(payload.scene_number, payload.shot_number) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shot not found")
+
+        # update_shot drops the asset when the description changed, so a surviving
+        # asset means there is nothing new to render.
+        # Session updates lock and write the store synchronously; keep them off the event loop.
+        updated = await asyncio.to_thread(
+            self.updates.update_shot,
+            ShotUpdateRequest(
+                session_id=payload.session_id,
+                scene_number=payload.scene_number,
+                shot_number=payload.shot_number,
+                shot_description=payload.shot_description,
+                expected_version=payload.expected_version,
+            )
+        )
+        session = await self._get_session(payload.session_id)
+        existing = session.shot_assets.get((payload.scene_number, payload.shot_number))
+        if existing is not None and not payload.force:
+            return ShotUpdateAndGenerateResponse(
+                session_id=session.session_id,
+                scene=updated.scene,
+                shot=existing,
+                rendered=False,
+                version=updated.version,
+            )
+
+        generated = await self.shots.generate_single(
+            SingleShotGenerationRequest(
+                session_id=payload.session_id,
+                scene_number=payload.scene_number,
+                shot_number=payload.shot_number,
+                bria_api_token=payload.bria_api_token,
+                bypass_cache=payload.bypass_cache,
+            )
+        )
+        current = await self._get_session(payload.session_id)
+        return ShotUpdateAndGenerateResponse(
+            session_id=current.session_id,
+            scene=current.get_scene(payload.scene_number),
+            shot=generated.shot,
+            rendered=True,
+            version=current.version,
+        )
+
+    async def update_and_generate_character(
+        self, payload: CharacterUpdateAndGenerateRequest
+    ) -> CharacterUpdateAndGenerateResponse:
+        updated = await asyncio.to_thread(
+            self.updates.update_character,
+            CharacterUpdateRequest(
+                session_id=payload.session_id,
+                name=payload.name,
+                character_description=payload.character_description,
+                expected_version=payload.expected_version,
+            )
+        )
+        name = next(c.name for c in updated.characters if c.name.lower() == payload.name.lower())
+        session = await self._get_session(payload.session_id)
+        existing = session.character_assets.get(name)
+        if existing is not None:
+            return CharacterUpdateAndGenerateResponse(
+                session_id=session.session_id,
+                characters=updated.characters,
+                character=existing,
+                rendered=False,
+                version=updated.version,
+            )
+
+        generated = await self.characters.generate(
+            CharacterGenerationRequest(
+                session_id=payload.session_id,
+                bria_api_token=payload.bria_api_token,
+                character_names=[name],
+                bypass_cache=payload.bypass_cache,
+            )
+        )
+        current = await self._get_session(payload.session_id)
+        character = generated.characters[0] if generated.characters else current.character_assets.get(name)
+        if character is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Character {name} was edited while rendering; retry.",
+            )
+        return CharacterUpdateAndGenerateResponse(
+            session_id=current.session_id,
+            characters=current.characters,
+            character=character,
+            rendered=bool(generated.characters),
+            version=current.version,
+        )
@@ -1,14 +1,35 @@
-"""Simple in-memory session storage for the storyboard pipeline."""
+"""Session storage for the storyboard pipeline.
+
+``SessionStore`` keeps sessions in a plain dict. ``SqliteSessionStore`` persists them
+to SQLite (WAL mode) behind a write-through LRU of hot sessions, so storyboards
+survive restarts and memory stays bounded.
+"""
 
 from __future__ import annotations
 
-from typing import Dict
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Tuple, TypeVar
 from uuid import uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
-from .agent_structured_outputs import CharacterInfo, Scene
+from .agent_structured_outputs import CharacterInfo, Scene, Shot
+from .character_matcher import CharacterMatcher, matcher_for
 from .schemas import CharacterAsset, ShotAsset
+from .settings import get_settings
+
+
+# (scene_number, shot_number)
+ShotKey = Tuple[int, int]
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
 
 
 class SessionData(BaseModel):
@@ -18,12 +39,187 @@ class SessionData(BaseModel):
     characters: list[CharacterInfo]
     scenes: list[Scene]
     character_assets: Dict[str, CharacterAsset] = Field(default_factory=dict)
-    shot_assets: Dict[str, ShotAsset] = Field(default_factory=dict)
+    shot_assets: Dict[ShotKey, ShotAsset] = Field(default_factory=dict)
+    version: int = Field(default=0, description="Incremented on every committed update.")
+
+    # scene_number -> position in ``scenes``; scene_number -> {shot_number -> position in scene.shots}
+    _scene_positions: Dict[int, int] | None = PrivateAttr(default=None)
+    _shot_positions: Dict[int, Dict[int, int]] = PrivateAttr(default_factory=dict)
+    _character_matcher: CharacterMatcher | None = PrivateAttr(default=None)
+
+    def character_matcher(self) -> CharacterMatcher:
+        """Return the name matcher for the current cast.
+
+        The matcher is rebuilt (or fetched from the shared cache) only when the cast's
+        names change; description edits keep it.
+        """
+
+        names = tuple(c.name for c in self.characters)
+        matcher = self._character_matcher
+        if matcher is None or matcher.key != names:
+            matcher = matcher_for(names)
+            self._character_matcher = matcher
+        return matcher
+
+    def clone(self) -> "SessionData":
+        """Copy for one reader or editor.
+
+        Every model and container is copied, so the copy can be edited freely. Leaf
+        payloads that are only ever replaced, never edited in place (structured
+        prompts, name lists, thumbnails), stay shared; that makes a copy about four
+        times cheaper than a deep copy. The copy gets its own position index, and the
+        character matcher is immutable and also stays shared.
+        """
+
+        clone = self.model_copy(
+            update={
+                "characters": [character.model_copy() for character in self.characters],
+                "scenes": [
+                    scene.model_copy(update={"shots": [shot.model_copy() for shot in scene.shots]})
+                    for scene in self.scenes
+                ],
+                "character_assets": {name: asset.model_copy() for name, asset in self.character_assets.items()},
+                "shot_assets": {key: asset.model_copy() for key, asset in self.shot_assets.items()},
+            }
+        )
+        # ``reindex`` replaces both indexes wholesale; only the outer shot map is updated in place.
+        clone._shot_positions = dict(self._shot_positions)
+        return clone
+
+    def reindex(self) -> None:
+        """Rebuild the scene/shot position index from ``scenes``."""
+
+        self._scene_positions = {}
+        self._shot_positions = {}
+        for pos, scene in enumerate(self.scenes):
+            self._scene_positions.setdefault(scene.scene_number, pos)
+            self.reindex_scene(scene.scene_number)
+
+    def reindex_scene(self, scene_number: int) -> None:
+        """Refresh the shot positions of one scene after its shots were inserted or renumbered."""
+
+        scene = self.get_scene(scene_number)
+        positions: Dict[int, int] = {}
+        if scene is not None:
+            for pos, shot in enumerate(scene.shots):
+                positions.setdefault(shot.shot_number, pos)
+        self._shot_positions[scene_number] = positions
+
+    def scene_position(self, scene_number: int) -> int | None:
+        scene_positions = self._scene_positions
+        if scene_positions is None:
+            self.reindex()
+            scene_positions = self._scene_positions
+        pos = scene_positions.get(scene_number)
+        scenes = self.scenes
+        if pos is not None and (pos >= len(scenes) or scenes[pos].scene_number != scene_number):
+            # ``scenes`` was reordered behind the index's back; rebuild once.
+            self.reindex()
+            pos = self._scene_positions.get(scene_number)
+        return pos
+
+    def get_scene(self, scene_number: int) -> Scene | None:
+        pos = self.scene_position(scene_number)
+        return self.scenes[pos] if pos is not None else None
+
+    def _locate(self, scene_number: int, shot_number: int) -> tuple[Scene | None, int | None]:
+        scene = self.get_scene(scene_number)
+        if scene is None:
+            return None, None
+        shot_positions = self._shot_positions
+        positions = shot_positions.get(scene_number)
+        pos = positions.get(shot_number) if positions is not None else None
+        stale = (
+            positions is None
+            or len(positions) != len(scene.shots)
+            or (pos is not None and (pos >= len(scene.shots) or scene.shots[pos].shot_number != shot_number))
+        )
+        if stale:
+            self.reindex_scene(scene_number)
+            pos = shot_positions[scene_number].get(shot_number)
+        return scene, pos
+
+    def shot_position(self, scene_number: int, shot_number: int) -> int | None:
+        return self._locate(scene_number, shot_number)[1]
+
+    def get_shot(self, scene_number: int, shot_number: int) -> Shot | None:
+        scene, pos = self._locate(scene_number, shot_number)
+        return scene.shots[pos] if pos is not None else None
+
+
+class SessionVersionConflict(RuntimeError):
+    """Raised when an update is based on an older version than the one committed."""
 
 
 class SessionStore:
-    def __init__(self) -> None:
+    """In-memory sessions, published copy-on-write.
+
+    A committed :class:`SessionData` is never mutated again. ``get_session`` hands out
+    private copies and ``edit_session`` edits a copy that replaces the stored session
+    only when the block succeeds, so readers never see a half-applied edit and a
+    failed edit leaves nothing behind.
+    """
+
+    def __init__(self, lock_stripes: int = 64) -> None:
         self._sessions: Dict[str, SessionData] = {}
+        self._versions: Dict[str, int] = {}
+        self._stripes = [threading.RLock() for _ in range(max(1, lock_stripes))]
+
+    def session_lock(self, session_id: str) -> threading.RLock:
+        """Return the striped lock guarding mutations of ``session_id``.
+
+        Different sessions almost always map to different stripes, so they never
+        wait on each other; writers of the same session are serialized.
+        """
+
+        return self._stripes[hash(session_id) % len(self._stripes)]
+
+    @staticmethod
+    def _raise_if_stale(session_id: str, committed: int | None, expected: int) -> None:
+        if committed is not None and committed != expected:
+            raise SessionVersionConflict(
+                f"Session {session_id} is at version {committed}, update was based on version {expected}"
+            )
+
+    @contextmanager
+    def edit_session(self, session_id: str) -> Iterator[SessionData]:
+        """Lock a session, yield a copy of its current state and commit the copy if the block succeeds.
+
+        Use this to apply results of slow work (e.g. a Bria render) to the latest
+        session instead of holding the lock for the whole call.
+        """
+
+        with self.session_lock(session_id):
+            session = self._stored(session_id)
+            if session is None:
+                raise LookupError(f"Session {session_id} not found")
+            working = session.clone()
+            yield working
+            self.update_session(working)
+
+    def _apply_edit(self, session_id: str, edit: Callable[[SessionData], T]) -> T:
+        with self.edit_session(session_id) as session:
+            return edit(session)
+
+    async def aedit_session(self, session_id: str, edit: Callable[[SessionData], T]) -> T:
+        """Async counterpart of :meth:`edit_session`: apply ``edit`` to the latest state and commit.
+
+        The edit runs on a worker thread. Stripe locks are thread locks, so taking one
+        on the event loop would stall every request while a job thread holds it. It
+        would also not exclude other coroutines, because the loop thread re-enters
+        its own RLock. ``edit`` is a plain function and cannot await while holding the lock.
+        """
+
+        return await asyncio.to_thread(self._apply_edit, session_id, edit)
+
+    # The in-memory store never blocks on reads or inserts, so these run inline.
+    async def acreate_session(
+        self, *, script: str, style: str, characters: list[CharacterInfo], scenes: list[Scene]
+    ) -> SessionData:
+        return self.create_session(script=script, style=style, characters=characters, scenes=scenes)
+
+    async def aget_session(self, session_id: str) -> SessionData | None:
+        return self.get_session(session_id)
 
     def create_session(
         self, *, script: str, style: str, characters: list[CharacterInfo], scenes: list[Scene]
@@ -37,13 +233,347 @@ class SessionStore:
             scenes=scenes,
         )
         self._sessions[session_id] = data
-        return data
+        self._versions[session_id] = data.version
+        return data.clone()
+
+    def _stored(self, session_id: str) -> SessionData | None:
+        """The committed session itself; never mutate it or hand it out."""
 
-    def get_session(self, session_id: str) -> SessionData | None:
         return self._sessions.get(session_id)
 
-    def update_session(self, session: SessionData) -> None:
-        self._sessions[session.session_id] = session
+    def get_session(self, session_id: str) -> SessionData | None:
+        """Return a private copy of the committed session."""
+
+        session = self._stored(session_id)
+        return session.clone() if session is not None else None
+
+    def update_session(self, session: SessionData, *, expected_version: int | None = None) -> None:
+        """Commit ``session`` if the stored version still matches (compare-and-swap).
+
+        ``expected_version`` defaults to ``session.version``, i.e. the version the
+        copy was read at. Raises :class:`SessionVersionConflict` otherwise. The store
+        keeps ``session`` itself, so do not mutate it after committing.
+        """
+
+        with self.session_lock(session.session_id):
+            expected = session.version if expected_version is None else expected_version
+            self._raise_if_stale(session.session_id, self._versions.get(session.session_id), expected)
+            session.version = expected + 1
+            self._sessions[session.session_id] = session
+            self._versions[session.session_id] = session.version
+
+
+class _Snapshot:
+    """A session as last written, used to diff the next write.
+
+    Rows are kept as the committed models, which are never mutated, so an unchanged
+    row compares equal without being serialized again.
+    """
+
+    def __init__(self) -> None:
+        self.version: int | None = None
+        self.header: tuple[str, str, str, str] | None = None
+        self.characters: Dict[str, CharacterAsset] = {}
+        self.shots: Dict[str, ShotAsset] = {}
+        self.planned: Dict[str, Shot] = {}
+
+
+class SqliteSessionStore(SessionStore):
+    """Durable session store: SQLite in WAL mode plus an in-process LRU of hot sessions.
+
+    ``update_session`` only rewrites the rows whose content changed: the session header
+    (script, style, characters, scene titles), individual planned shots and individual
+    character/shot asset rows. The version check runs in the ``UPDATE`` itself, so a
+    write from another process sharing the database raises :class:`SessionVersionConflict`
+    instead of being overwritten.
+    """
+
+    def __init__(self, path: str, cache_size: int = 256, lock_stripes: int = 64) -> None:
+        super().__init__(lock_stripes=lock_stripes)
+        self.path = path
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, SessionData]" = OrderedDict()
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._lock = threading.RLock()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                script TEXT NOT NULL,
+                style TEXT NOT NULL,
+                characters TEXT NOT NULL,
+                scenes TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS character_assets (
+                session_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (session_id, name)
+            );
+            CREATE TABLE IF NOT EXISTS shot_assets (
+                session_id TEXT NOT NULL,
+                asset_key TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (session_id, asset_key)
+            );
+            CREATE TABLE IF NOT EXISTS planned_shots (
+                session_id TEXT NOT NULL,
+                shot_key TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (session_id, shot_key)
+            );
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    # ---- LRU ----
+
+    def _remember(self, session: SessionData) -> None:
+        self._cache[session.session_id] = session
+        self._cache.move_to_end(session.session_id)
+        while len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._snapshots.pop(evicted, None)
+
+    # ---- persistence ----
+
+    @staticmethod
+    def _header(session: SessionData) -> tuple[str, str, str, str]:
+        return (
+            session.script,
+            session.style,
+            json.dumps([c.model_dump() for c in session.characters]),
+            # Planned shots live in their own rows; the header keeps scene numbers and titles.
+            json.dumps([s.model_dump(exclude={"shots"}) for s in session.scenes]),
+        )
+
+    @staticmethod
+    def _planned_shots(session: SessionData) -> Dict[str, Shot]:
+        # Keyed by position rather than number, so duplicate numbers from the script agent
+        # cannot collide. An insert renumbers the shots after it, so those rows change anyway.
+        return {
+            f"{scene_pos}:{shot_pos}": shot
+            for scene_pos, scene in enumerate(session.scenes)
+            for shot_pos, shot in enumerate(scene.shots)
+        }
+
+    def _load_snapshot(self, session_id: str) -> _Snapshot:
+        snapshot = _Snapshot()
+        row = self._conn.execute(
+            "SELECT script, style, characters, scenes, version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is not None:
+            snapshot.header = tuple(row[:4])
+            snapshot.version = row[4]
+        snapshot.characters = {
+            name: CharacterAsset.model_validate_json(data)
+            for name, data in self._conn.execute(
+                "SELECT name, data FROM character_assets WHERE session_id = ?", (session_id,)
+            )
+        }
+        snapshot.shots = {
+            key: ShotAsset.model_validate_json(data)
+            for key, data in self._conn.execute(
+                "SELECT asset_key, data FROM shot_assets WHERE session_id = ?", (session_id,)
+            )
+        }
+        snapshot.planned = {
+            key: Shot.model_validate_json(data)
+            for key, data in self._conn.execute(
+                "SELECT shot_key, data FROM planned_shots WHERE session_id = ?", (session_id,)
+            )
+        }
+        return snapshot
+
+    @staticmethod
+    def _shot_row_key(key: ShotKey) -> str:
+        return f"{key[0]}:{key[1]}"
+
+    @staticmethod
+    def _parse_shot_row_key(asset_key: str) -> ShotKey:
+        scene_number, shot_number = asset_key.split(":", maxsplit=1)
+        return int(scene_number), int(shot_number)
+
+    @staticmethod
+    def _diff(previous: Dict[str, M], current: Dict[str, M]) -> tuple[Dict[str, M], list[str]]:
+        # Model equality short-circuits on shared payloads, so unchanged rows are cheap to skip.
+        upserts = {key: model for key, model in current.items() if previous.get(key) != model}
+        removed = [key for key in previous if key not in current]
+        return upserts, removed
+
+    def _write_rows(
+        self, table: str, key_column: str, session_id: str, upserts: Dict[str, BaseModel], removed: list[str]
+    ) -> None:
+        if upserts:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (session_id, {key_column}, data) VALUES (?, ?, ?)",
+                [(session_id, key, model.model_dump_json()) for key, model in upserts.items()],
+            )
+        if removed:
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE session_id = ? AND {key_column} = ?",
+                [(session_id, key) for key in removed],
+            )
+
+    def _write(self, session: SessionData, expected_version: int | None) -> None:
+        """Diff ``session`` against the last committed snapshot and persist only what changed.
+
+        Called with the session's stripe lock held; ``self._lock`` only guards the
+        shared connection and LRU, so sessions on other stripes can diff in parallel.
+        """
+
+        session_id = session.session_id
+        with self._lock:
+            snapshot = self._snapshots.get(session_id) or self._load_snapshot(session_id)
+        expected = session.version if expected_version is None else expected_version
+        self._raise_if_stale(session_id, snapshot.version, expected)
+
+        header = self._header(session)
+        character_upserts, character_removed = self._diff(snapshot.characters, session.character_assets)
+        shot_upserts, shot_removed = self._diff(
+            snapshot.shots, {self._shot_row_key(key): asset for key, asset in session.shot_assets.items()}
+        )
+        planned_upserts, planned_removed = self._diff(snapshot.planned, self._planned_shots(session))
+        version = expected + 1
+        now = time.time()
+
+        with self._lock, self._conn:
+            if snapshot.header is None:
+                self._conn.execute(
+                    "INSERT INTO sessions "
+                    "(session_id, script, style, characters, scenes, version, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, *header, version, now),
+                )
+            else:
+                # The version check in SQL, not just the snapshot's, also catches writes
+                # committed by another process on the same database.
+                if header != snapshot.header:
+                    cursor = self._conn.execute(
+                        "UPDATE sessions SET script = ?, style = ?, characters = ?, scenes = ?, version = ?, "
+                        "updated_at = ? WHERE session_id = ? AND version = ?",
+                        (*header, version, now, session_id, expected),
+                    )
+                else:
+                    cursor = self._conn.execute(
+                        "UPDATE sessions SET version = ?, updated_at = ? WHERE session_id = ? AND version = ?",
+                        (version, now, session_id, expected),
+                    )
+                if cursor.rowcount == 0:
+                    # Our snapshot is stale: drop it so the next read reloads the committed session.
+                    self._snapshots.pop(session_id, None)
+                    self._cache.pop(session_id, None)
+                    raise SessionVersionConflict(
+                        f"Session {session_id} was updated elsewhere, update was based on version {expected}"
+                    )
+            self._write_rows("character_assets", "name", session_id, character_upserts, character_removed)
+            self._write_rows("shot_assets", "asset_key", session_id, shot_upserts, shot_removed)
+            self._write_rows("planned_shots", "shot_key", session_id, planned_upserts, planned_removed)
+
+        session.version = version
+        snapshot.version = version
+        snapshot.header = header
+        for rows, upserts, removed in (
+            (snapshot.characters, character_upserts, character_removed),
+            (snapshot.shots, shot_upserts, shot_removed),
+            (snapshot.planned, planned_upserts, planned_removed),
+        ):
+            rows.update(upserts)
+            for key in removed:
+                del rows[key]
+        with self._lock:
+            self._snapshots[session_id] = snapshot
+            self._remember(session)
+
+    def _read(self, session_id: str) -> SessionData | None:
+        snapshot = self._load_snapshot(session_id)
+        if snapshot.header is None:
+            return None
+        script, style, characters, scenes_json = snapshot.header
+        scenes = json.loads(scenes_json)
+        for scene in scenes:
+            # Sessions written before planned shots had their own rows still carry them
+            # here; their first write moves them into ``planned_shots``.
+            scene.setdefault("shots", [])
+        for key in sorted(snapshot.planned, key=self._parse_shot_row_key):
+            scenes[self._parse_shot_row_key(key)[0]]["shots"].append(snapshot.planned[key])
+        session = SessionData(
+            session_id=session_id,
+            script=script,
+            style=style,
+            characters=json.loads(characters),
+            scenes=scenes,
+            character_assets=dict(snapshot.characters),
+            shot_assets={self._parse_shot_row_key(key): asset for key, asset in snapshot.shots.items()},
+            version=snapshot.version,
+        )
+        self._snapshots[session_id] = snapshot
+        return session
+
+    # ---- SessionStore contract ----
+
+    def create_session(
+        self, *, script: str, style: str, characters: list[CharacterInfo], scenes: list[Scene]
+    ) -> SessionData:
+        data = SessionData(
+            session_id=uuid4().hex,
+            script=script,
+            style=style,
+            characters=characters,
+            scenes=scenes,
+        )
+        with self.session_lock(data.session_id):
+            with self._lock:
+                self._snapshots[data.session_id] = _Snapshot()
+            # ``_write`` commits ``expected_version + 1``, so the first write lands on version 0.
+            self._write(data, expected_version=-1)
+        return data.clone()
+
+    def _stored(self, session_id: str) -> SessionData | None:
+        with self._lock:
+            session = self._cache.get(session_id)
+            if session is None:
+                session = self._read(session_id)
+                if session is None:
+                    return None
+            self._remember(session)
+            return session
+
+    def update_session(self, session: SessionData, *, expected_version: int | None = None) -> None:
+        with self.session_lock(session.session_id):
+            self._write(session, expected_version)
+
+    # Reads and writes may touch disk; keep them off the event loop.
+    async def acreate_session(
+        self, *, script: str, style: str, characters: list[CharacterInfo], scenes: list[Scene]
+    ) -> SessionData:
+        return await asyncio.to_thread(
+            self.create_session, script=script, style=style, characters=characters, scenes=scenes
+        )
+
+    async def aget_session(self, session_id: str) -> SessionData | None:
+        return await asyncio.to_thread(self.get_session, session_id)
+
+
+def _build_session_store() -> SessionStore:
+    settings = get_settings()
+    if settings.session_store_backend == "sqlite":
+        return SqliteSessionStore(
+            settings.session_db_path,
+            cache_size=settings.session_cache_size,
+            lock_stripes=settings.session_lock_stripes,
+        )
+    return SessionStore(lock_stripes=settings.session_lock_stripes)
 
 
-session_store = SessionStore()
+session_store = _build_session_store()
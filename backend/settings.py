@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
+import json
 import os
 from functools import lru_cache
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # Ensure local environment variables are loaded when running locally
 load_dotenv()
 
+DEFAULT_BRIA_API_URL = "https://engine.prod.bria-api.com/v2/image/generate"
+
 
 class Settings(BaseModel):
     """Centralized runtime configuration for the backend."""
@@ -18,7 +21,65 @@ class Settings(BaseModel):
     bria_api_token: str | None
     openai_api_key: str | None
     openai_model: str
+    openai_client_cache_size: int = 32
+    openai_client_idle_seconds: float = 900.0
+    openai_pool_maxsize: int = 32
+    openai_keepalive_expiry: float = 60.0
     demo_opt_in_value: str = "1"
+    shot_generation_max_workers: int = 8
+    shot_edit_fast_path: bool = True
+    bria_api_urls: tuple[str, ...] = (DEFAULT_BRIA_API_URL,)
+    bria_circuit_failure_threshold: int = 5
+    bria_circuit_reset_seconds: float = 30.0
+    bria_max_concurrency_per_token: int = 8
+    bria_min_concurrency_per_token: int = 1
+    bria_initial_concurrency_per_token: int = 4
+    bria_rate_per_second: float = 2.0
+    bria_rate_burst: int = 8
+    bria_latency_tolerance: float = 2.0
+    bria_limiter_wait_seconds: float = 300.0
+    bria_retry_max_attempts: int = 3
+    bria_retry_base_delay: float = 0.5
+    bria_retry_max_delay: float = 20.0
+    bria_retry_budget_ratio: float = 0.2
+    bria_retry_budget_min_per_second: float = 1.0
+    bria_hedge_enabled: bool = False
+    bria_hedge_min_delay: float = 5.0
+    bria_retry_overrides: dict[str, dict] = Field(default_factory=dict)
+    bria_poll_initial_delay: float = 1.0
+    bria_poll_max_interval: float = 5.0
+    bria_async_render_timeout: float = 300.0
+    bria_status_timeout: float = 10.0
+    bria_pool_maxsize: int = 32
+    bria_connect_timeout: float = 10.0
+    bria_read_timeout: float = 120.0
+    bria_keepalive_expiry: float = 60.0
+    job_workers: int = 16
+    job_ttl_seconds: int = 3600
+    render_cache_enabled: bool = True
+    render_cache_max_entries: int = 1024
+    render_cache_max_bytes: int = 64 * 1024 * 1024
+    render_cache_ttl_seconds: float = 6 * 3600
+    render_cache_dir: str | None = None
+    render_cache_disk_max_bytes: int = 512 * 1024 * 1024
+    render_cache_share_across_tokens: bool = False
+    llm_cache_path: str | None = ".cache/llm_agents.sqlite3"
+    llm_cache_ttl_seconds: float = 7 * 24 * 3600
+    script_chunk_chars: int = 12000
+    script_chunk_max_workers: int = 4
+    session_store_backend: str = "sqlite"
+    session_db_path: str = ".cache/sessions.sqlite3"
+    session_cache_size: int = 256
+    session_lock_stripes: int = 64
+    image_mirror_dir: str | None = ".cache/images"
+    image_mirror_workers: int = 4
+    image_thumbnail_widths: tuple[int, ...] = (320, 640)
+    image_thumbnail_format: str = "webp"
+    image_thumbnail_quality: int = 80
+    image_thumbnail_workers: int = 2
+    export_fetch_workers: int = 4
+    export_contact_sheet_columns: int = 4
+    export_contact_sheet_rows: int = 3
 
     @property
     def bria_configured(self) -> bool:
@@ -38,4 +99,67 @@ def get_settings() -> Settings:
         bria_api_token=os.getenv("BRIA_API_TOKEN"),
         openai_api_key=os.getenv("OPENAI_API_KEY"),
         openai_model=os.getenv("OPENAI_MODEL", "gpt-5-mini-2025-08-07"), #gpt-5-mini-2025-08-07, gpt-5-nano-2025-08-07
+        openai_client_cache_size=int(os.getenv("OPENAI_CLIENT_CACHE_SIZE", "32")),
+        openai_client_idle_seconds=float(os.getenv("OPENAI_CLIENT_IDLE_SECONDS", "900")),
+        openai_pool_maxsize=int(os.getenv("OPENAI_POOL_MAXSIZE", "32")),
+        openai_keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60")),
+        shot_generation_max_workers=int(os.getenv("SHOT_GENERATION_MAX_WORKERS", "8")),
+        shot_edit_fast_path=os.getenv("SHOT_EDIT_FAST_PATH", "1") not in {"0", "false", "False"},
+        bria_api_urls=tuple(
+            url.strip() for url in os.getenv("BRIA_API_URLS", DEFAULT_BRIA_API_URL).split(",") if url.strip()
+        )
+        or (DEFAULT_BRIA_API_URL,),
+        bria_circuit_failure_threshold=int(os.getenv("BRIA_CIRCUIT_FAILURE_THRESHOLD", "5")),
+        bria_circuit_reset_seconds=float(os.getenv("BRIA_CIRCUIT_RESET_SECONDS", "30")),
+        bria_max_concurrency_per_token=int(os.getenv("BRIA_MAX_CONCURRENCY_PER_TOKEN", "8")),
+        bria_min_concurrency_per_token=int(os.getenv("BRIA_MIN_CONCURRENCY_PER_TOKEN", "1")),
+        bria_initial_concurrency_per_token=int(os.getenv("BRIA_INITIAL_CONCURRENCY_PER_TOKEN", "4")),
+        bria_rate_per_second=float(os.getenv("BRIA_RATE_PER_SECOND", "2")),
+        bria_rate_burst=int(os.getenv("BRIA_RATE_BURST", "8")),
+        bria_latency_tolerance=float(os.getenv("BRIA_LATENCY_TOLERANCE", "2")),
+        bria_limiter_wait_seconds=float(os.getenv("BRIA_LIMITER_WAIT_SECONDS", "300")),
+        bria_retry_max_attempts=int(os.getenv("BRIA_RETRY_MAX_ATTEMPTS", "3")),
+        bria_retry_base_delay=float(os.getenv("BRIA_RETRY_BASE_DELAY", "0.5")),
+        bria_retry_max_delay=float(os.getenv("BRIA_RETRY_MAX_DELAY", "20")),
+        bria_retry_budget_ratio=float(os.getenv("BRIA_RETRY_BUDGET_RATIO", "0.2")),
+        bria_retry_budget_min_per_second=float(os.getenv("BRIA_RETRY_BUDGET_MIN_PER_SECOND", "1")),
+        bria_hedge_enabled=os.getenv("BRIA_HEDGE_ENABLED", "0") not in {"0", "false", "False"},
+        bria_hedge_min_delay=float(os.getenv("BRIA_HEDGE_MIN_DELAY", "5")),
+        bria_retry_overrides=json.loads(os.getenv("BRIA_RETRY_OVERRIDES") or "{}"),
+        bria_poll_initial_delay=float(os.getenv("BRIA_POLL_INITIAL_DELAY", "1")),
+        bria_poll_max_interval=float(os.getenv("BRIA_POLL_MAX_INTERVAL", "5")),
+        bria_async_render_timeout=float(os.getenv("BRIA_ASYNC_RENDER_TIMEOUT", "300")),
+        bria_status_timeout=float(os.getenv("BRIA_STATUS_TIMEOUT", "10")),
+        bria_pool_maxsize=int(os.getenv("BRIA_POOL_MAXSIZE", "32")),
+        bria_connect_timeout=float(os.getenv("BRIA_CONNECT_TIMEOUT", "10")),
+        bria_read_timeout=float(os.getenv("BRIA_READ_TIMEOUT", "120")),
+        bria_keepalive_expiry=float(os.getenv("BRIA_KEEPALIVE_EXPIRY", "60")),
+        job_workers=int(os.getenv("JOB_WORKERS", "16")),
+        job_ttl_seconds=int(os.getenv("JOB_TTL_SECONDS", "3600")),
+        render_cache_enabled=os.getenv("RENDER_CACHE_ENABLED", "1") not in {"0", "false", "False"},
+        render_cache_max_entries=int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "1024")),
+        render_cache_max_bytes=int(os.getenv("RENDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        render_cache_ttl_seconds=float(os.getenv("RENDER_CACHE_TTL_SECONDS", str(6 * 3600))),
+        render_cache_dir=os.getenv("RENDER_CACHE_DIR") or None,
+        render_cache_disk_max_bytes=int(os.getenv("RENDER_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))),
+        render_cache_share_across_tokens=os.getenv("RENDER_CACHE_SHARE_ACROSS_TOKENS", "0") not in {"0", "false", "False"},
+        llm_cache_path=os.getenv("LLM_CACHE_PATH", ".cache/llm_agents.sqlite3") or None,
+        llm_cache_ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        script_chunk_chars=int(os.getenv("SCRIPT_CHUNK_CHARS", "12000")),
+        script_chunk_max_workers=int(os.getenv("SCRIPT_CHUNK_MAX_WORKERS", "4")),
+        session_store_backend=os.getenv("SESSION_STORE", "sqlite"),
+        session_db_path=os.getenv("SESSION_DB_PATH", ".cache/sessions.sqlite3"),
+        session_cache_size=int(os.getenv("SESSION_CACHE_SIZE", "256")),
+        session_lock_stripes=int(os.getenv("SESSION_LOCK_STRIPES", "64")),
+        image_mirror_dir=os.getenv("IMAGE_MIRROR_DIR", ".cache/images") or None,
+        image_mirror_workers=int(os.getenv("IMAGE_MIRROR_WORKERS", "4")),
+        image_thumbnail_widths=tuple(
+            int(width) for width in os.getenv("IMAGE_THUMBNAIL_WIDTHS", "320,640").split(",") if width.strip()
+        ),
+        image_thumbnail_format=os.getenv("IMAGE_THUMBNAIL_FORMAT", "webp").lower(),
+        image_thumbnail_quality=int(os.getenv("IMAGE_THUMBNAIL_QUALITY", "80")),
+        image_thumbnail_workers=int(os.getenv("IMAGE_THUMBNAIL_WORKERS", "2")),
+        export_fetch_workers=int(os.getenv("EXPORT_FETCH_WORKERS", "4")),
+        export_contact_sheet_columns=int(os.getenv("EXPORT_CONTACT_SHEET_COLUMNS", "4")),
+        export_contact_sheet_rows=int(os.getenv("EXPORT_CONTACT_SHEET_ROWS", "3")),
     )
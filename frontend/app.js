@@ -55,6 +55,7 @@ const els = {
   generateCharacters: document.getElementById("generate-characters"),
   sceneList: document.getElementById("scene-list"),
   generateShotsAll: document.getElementById("generate-shots-all"),
+  exportStoryboard: document.getElementById("export-storyboard"),
   shotGrid: document.getElementById("shot-grid"),
   toast: document.getElementById("toast"),
   editModal: document.getElementById("edit-modal-backdrop"),
@@ -86,6 +87,18 @@ const setToast = (message, tone = "info") => {
 };
 
 const backendBase = () => state.backendUrl.replace(/\/$/, "");
+// Prefer the backend's mirrored copy; fall back to the remote Bria URL.
+const imageSrc = (asset) => (asset?.local_url ? `${backendBase()}${asset.local_url}` : asset?.image_url);
+// Card previews use the largest server-side thumbnail up to 640px; full images stay for lightbox/download.
+const thumbAttrs = (asset) => {
+  const widths = Object.keys(asset?.thumbnails || {})
+    .map(Number)
+    .sort((a, b) => a - b);
+  if (!widths.length) return `src="${imageSrc(asset)}"`;
+  const preview = widths.filter((w) => w <= 640).pop() || widths[0];
+  const srcset = widths.map((w) => `${backendBase()}${asset.thumbnails[w]} ${w}w`).join(", ");
+  return `src="${backendBase()}${asset.thumbnails[preview]}" srcset="${srcset}" sizes="(max-width: 640px) 100vw, 320px" loading="lazy"`;
+};
 
 const setStyle = (style) => {
   state.style = style;
@@ -112,6 +125,34 @@ const postJson = (path, body) =>
     body: JSON.stringify(body),
   }).then(asJson);
 
+const postNdjson = async (path, body, onRecord) => {
+  const res = await fetch(`${backendBase()}${path}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "application/x-ndjson" },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok || !res.body) {
+    const text = await res.text();
+    throw new Error(text || `Request failed with status ${res.status}`);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    let newline = buffer.indexOf("\n");
+    while (newline >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) onRecord(JSON.parse(line));
+      newline = buffer.indexOf("\n");
+    }
+    if (done) break;
+  }
+  if (buffer.trim()) onRecord(JSON.parse(buffer));
+};
+
 const saveCache = () => {
   if (isHydrating) return;
   try {
@@ -197,6 +238,7 @@ const setSession = (sessionId) => {
   }
   if (els.generateCharacters) els.generateCharacters.disabled = !sessionId;
   if (els.generateShotsAll) els.generateShotsAll.disabled = !sessionId || !allCharactersReady() || state.shotBulkGenerating;
+  if (els.exportStoryboard) els.exportStoryboard.disabled = !sessionId || !state.shots.length;
   if (!sessionId && els.ingestStatus) els.ingestStatus.textContent = "";
   saveCache();
   updateIngestLock();
@@ -240,9 +282,21 @@ const syncScenesState = (scenes, shotAssets, { forceEditingAll = false } = {}) =
   saveCache();
 };
 
+// Update responses only carry the scenes they touched; splice those into local state.
+const mergeScenes = (updatedScenes, sceneAssets, options) => {
+  const byNumber = new Map(updatedScenes.map((scene) => [scene.scene_number, scene]));
+  const scenes = state.scenes.map((scene) => byNumber.get(scene.scene_number) || scene);
+  const shots = Array.isArray(sceneAssets)
+    ? (state.shots || []).filter((s) => !byNumber.has(s.scene_number)).concat(sceneAssets)
+    : state.shots;
+  syncScenesState(scenes, shots, options);
+};
+
 const applyShotUpdateResponse = (data, options) => {
   if (!data) return;
-  if (data.scenes) {
+  if (data.scene) {
+    mergeScenes([data.scene], data.shot_assets, options);
+  } else if (data.scenes) {
     syncScenesState(data.scenes, data.shot_assets, options);
   } else if (Array.isArray(data.shot_assets)) {
     state.shots = data.shot_assets;
@@ -269,10 +323,10 @@ const renderCharacters = () => {
         : asset
           ? `<div class="image-wrapper">
                <div class="image-frame portrait">
-                 <img src="${asset.image_url}" alt="${c.name}" />
+                 <img ${thumbAttrs(asset)} alt="${c.name}" />
                </div>
                <div class="image-actions">
-                 <a class="icon-btn download-btn" title="Download" href="${asset.image_url}" data-filename="${encodeURIComponent(
+                 <a class="icon-btn download-btn" title="Download" href="${imageSrc(asset)}" data-filename="${encodeURIComponent(
                    `${c.name}.png`
                  )}"><span class="glyph">⤓</span></a>
                  <button class="icon-btn maximize-char" title="View larger" data-name="${c.name}"><span class="glyph">⤢</span></button>
@@ -329,6 +383,7 @@ const renderShots = () => {
     els.generateShotsAll.disabled =
       !state.sessionId || !allCharactersReady() || state.shotBulkGenerating || hasEmptyShot;
   }
+  if (els.exportStoryboard) els.exportStoryboard.disabled = !state.sessionId || !state.shots.length;
   const shotMap = new Map(state.shots.map((s) => [`${s.scene_number}-${s.shot_number}`, s]));
   const charactersReady = allCharactersReady();
 
@@ -345,9 +400,9 @@ const renderShots = () => {
           showPlaceholder
             ? ""
             : asset
-              ? `<img src="${asset.image_url}" alt="Scene ${scene.scene_number} shot ${shot.shot_number}"/>
+              ? `<img ${thumbAttrs(asset)} alt="Scene ${scene.scene_number} shot ${shot.shot_number}"/>
                  <div class="image-actions">
-                   <a class="icon-btn download-btn" title="Download" href="${asset.image_url}" data-filename="${encodeURIComponent(
+                   <a class="icon-btn download-btn" title="Download" href="${imageSrc(asset)}" data-filename="${encodeURIComponent(
                      `scene-${scene.scene_number}-shot-${shot.shot_number}.png`
                    )}"><span class="glyph">⤓</span></a>
                    <button class="icon-btn maximize" title="View larger" data-scene="${scene.scene_number}" data-shot="${shot.shot_number}"><span class="glyph">⤢</span></button>
@@ -651,15 +706,13 @@ els.generateCharacters.addEventListener("click", async () => {
   }
   const textareas = Array.from(document.querySelectorAll(".char-edit"));
   try {
-    await Promise.all(
-      textareas.map((el) =>
-        postJson("/characters/update", {
-          session_id: state.sessionId,
-          name: el.dataset.name,
-          character_description: el.value.trim(),
-        })
-      )
-    );
+    await postJson("/session/batch_update", {
+      session_id: state.sessionId,
+      characters: textareas.map((el) => ({
+        name: el.dataset.name,
+        character_description: el.value.trim(),
+      })),
+    });
     textareas.forEach((el) => {
       state.characterBaseline[el.dataset.name] = el.value.trim();
     });
@@ -724,6 +777,12 @@ els.generateCharacters.addEventListener("click", async () => {
   }
 });
 
+// The backend streams the archive; letting the browser download it keeps it out of page memory.
+els.exportStoryboard?.addEventListener("click", () => {
+  if (!state.sessionId) return;
+  window.location.href = `${backendBase()}/session/${encodeURIComponent(state.sessionId)}/export`;
+});
+
 els.generateShotsAll?.addEventListener("click", async () => {
   if (!state.openaiToken || !state.briaToken) {
     setToast("Enter API keys first.", "error");
@@ -744,17 +803,16 @@ els.generateShotsAll?.addEventListener("click", async () => {
     return;
   }
   try {
-    await Promise.all(
-      shotAreas.map(async (el) => {
-        const data = await postJson("/shots/update", {
-          session_id: state.sessionId,
-          scene_number: Number(el.dataset.scene),
-          shot_number: Number(el.dataset.shot),
-          shot_description: el.value.trim(),
-        });
-        applyShotUpdateResponse(data);
-      })
-    );
+    const data = await postJson("/session/batch_update", {
+      session_id: state.sessionId,
+      shots: shotAreas.map((el) => ({
+        op: "update",
+        scene_number: Number(el.dataset.scene),
+        shot_number: Number(el.dataset.shot),
+        shot_description: el.value.trim(),
+      })),
+    });
+    mergeScenes(data.scenes || [], data.shot_assets);
     shotAreas.forEach((el) => {
       const key = `${el.dataset.scene}:${el.dataset.shot}`;
       state.shotBaseline[key] = el.value.trim();
@@ -766,31 +824,44 @@ els.generateShotsAll?.addEventListener("click", async () => {
   setLoading(els.generateShotsAll, true, "Generating...");
   els.generateShotsAll.disabled = true;
   state.shotBulkGenerating = true;
-  renderShots();
-  const allShots = state.scenes.flatMap((scene) =>
-    scene.shots.map((shot) => ({ scene: scene.scene_number, shot: shot.shot_number }))
+  state.scenes.forEach((scene) =>
+    scene.shots.forEach((shot) => state.shotLoading.add(`${scene.scene_number}:${shot.shot_number}`))
   );
+  renderShots();
   try {
-    for (const item of allShots) {
-      const key = `${item.scene}:${item.shot}`;
-      state.shotLoading.add(key);
-      renderShots();
-      const data = await postJson("/shots/generate_one", {
-        session_id: state.sessionId,
-        scene_number: item.scene,
-        shot_number: item.shot,
-        bria_api_token: state.briaToken || undefined,
-      });
-      state.shots = state.shots.filter(
-        (s) => !(s.scene_number === data.shot.scene_number && s.shot_number === data.shot.shot_number)
+    let summary = null;
+    await postNdjson(
+      "/shots/generate/stream",
+      { session_id: state.sessionId, bria_api_token: state.briaToken || undefined },
+      ({ event, data }) => {
+        if (event === "plan") return;
+        if (event === "summary") {
+          summary = data;
+          return;
+        }
+        const key = `${data.scene_number}:${data.shot_number}`;
+        state.shotLoading.delete(key);
+        if (event === "shot") {
+          state.shots = state.shots.filter(
+            (s) => !(s.scene_number === data.scene_number && s.shot_number === data.shot_number)
+          );
+          state.shots.push(data);
+          // lock prompt once generated
+          state.shotEditing.delete(key);
+          saveCache();
+        }
+        renderShots();
+      }
+    );
+    const failures = summary?.failures || [];
+    if (failures.length) {
+      setToast(
+        `Some shots failed: ${failures.map((f) => `${f.scene_number}:${f.shot_number}`).join(", ")}`,
+        "error"
       );
-      state.shots.push(data.shot);
-      // lock prompt once generated
-      state.shotEditing.delete(`${item.scene}:${item.shot}`);
-      state.shotLoading.delete(key);
-      renderShots();
+    } else {
+      setToast("Shots generated.");
     }
-    setToast("Shots generated.");
   } catch (err) {
     setToast(err.message || "Failed to generate shots", "error");
   } finally {
@@ -818,7 +889,7 @@ els.characterList.addEventListener("click", async (e) => {
   if (maxBtn) {
     const name = maxBtn.dataset.name;
     const asset = state.characterAssets.find((c) => c.name === name);
-    if (asset?.image_url) openLightbox(asset.image_url, name);
+    if (asset?.image_url) openLightbox(imageSrc(asset), name);
     return;
   }
   const downloadBtn = e.target.closest(".download-btn");
@@ -869,20 +940,16 @@ els.characterList.addEventListener("click", async (e) => {
     state.charLoading.add(name);
     renderCharacters();
     try {
-      const updateData = await postJson("/characters/update", {
+      const data = await postJson("/characters/update_and_generate", {
         session_id: state.sessionId,
         name,
         character_description,
-      });
-      state.characters = updateData.characters || state.characters;
-      state.characterBaseline[name] = character_description;
-      const data = await postJson("/characters/generate", {
-        session_id: state.sessionId,
-        character_names: [name],
         bria_api_token: state.briaToken || undefined,
       });
+      state.characters = data.characters || state.characters;
+      state.characterBaseline[name] = character_description;
       const others = state.characterAssets.filter((c) => c.name !== name);
-      state.characterAssets = [...others, ...(data.characters || [])];
+      state.characterAssets = [...others, data.character];
       state.charErrors[name] = undefined;
       state.charEditing.delete(name);
       saveCache();
@@ -1055,7 +1122,7 @@ els.shotGrid.addEventListener("click", async (e) => {
     const asset = state.shots.find(
       (s) => s.scene_number === sceneNum && s.shot_number === shotNum
     );
-    if (asset?.image_url) openLightbox(asset.image_url, `Scene ${sceneNum} Shot ${shotNum}`);
+    if (asset?.image_url) openLightbox(imageSrc(asset), `Scene ${sceneNum} Shot ${shotNum}`);
     return;
   }
 
@@ -1150,20 +1217,19 @@ els.shotGrid.addEventListener("click", async (e) => {
     state.shotLoading.add(key);
     renderShots();
     try {
-      const updateResp = await postJson("/shots/update", {
+      const hadImage = state.shots.some((s) => s.scene_number === sceneNum && s.shot_number === shotNum);
+      const data = await postJson("/shots/update_and_generate", {
         session_id: state.sessionId,
         scene_number: sceneNum,
         shot_number: shotNum,
         shot_description,
-      });
-      applyShotUpdateResponse(updateResp);
-      state.shotBaseline[key] = shot_description;
-      const data = await postJson("/shots/generate_one", {
-        session_id: state.sessionId,
-        scene_number: sceneNum,
-        shot_number: shotNum,
         bria_api_token: state.briaToken || undefined,
+        // An explicit regenerate of an existing frame should produce a new variant.
+        force: hadImage,
+        bypass_cache: hadImage,
       });
+      applyShotUpdateResponse({ scene: data.scene });
+      state.shotBaseline[key] = shot_description;
       state.shots = state.shots.filter(
         (s) => !(s.scene_number === data.shot.scene_number && s.shot_number === data.shot.shot_number)
       );
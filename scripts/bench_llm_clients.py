@@ -0,0 +1,79 @@
+"""Compare cached OpenAI clients with a fresh client per call, against the local stub.
+
+Start the stub without model latency, then run the benchmark from the repo root::
+
+    python -m backend.fixtures.openai_stub --port 8766
+    python -m scripts.bench_llm_clients --calls 300
+
+It reports client setup cost, sync and sequential async per-call latency, and the
+wall time of all calls fired concurrently. The stub answers at once, so the
+numbers are client and connection overhead only. "fresh" swaps in the old
+behaviour: a new client, and so a new connection pool, for every call.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8766/v1")
+    parser.add_argument("--calls", type=int, default=300)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    os.environ.update(OPENAI_API_KEY="sk-bench", OPENAI_BASE_URL=args.base_url, LLM_CACHE_PATH="")
+    # Imported here: settings are read from the environment at import time.
+    from openai import AsyncOpenAI, OpenAI
+
+    from backend.services import llm_agents, llm_clients
+    from backend.services.prompt_compiler import SHOT
+
+    calls = args.calls
+    started = time.perf_counter()
+    for _ in range(calls):
+        OpenAI(api_key="sk-bench")
+    fresh_ms = (time.perf_counter() - started) / calls * 1e3
+    llm_clients.get_client("sk-bench")
+    started = time.perf_counter()
+    for _ in range(calls):
+        llm_clients.get_client("sk-bench")
+    cached_us = (time.perf_counter() - started) / calls * 1e6
+    print(f"client setup: new OpenAI() {fresh_ms:.1f} ms, cached get_client {cached_us:.1f} us")
+
+    def run_sync(label: str) -> None:
+        llm_agents._call_llm(SHOT, "warm-up")
+        started = time.perf_counter()
+        for index in range(calls):
+            llm_agents._call_llm(SHOT, f"sync {index}")
+        print(f"{label} sync _call_llm: {(time.perf_counter() - started) / calls * 1e3:.1f} ms/call")
+
+    async def run_async(label: str) -> None:
+        await llm_agents._acall_llm(SHOT, "warm-up")
+        started = time.perf_counter()
+        for index in range(calls):
+            await llm_agents._acall_llm(SHOT, f"sequential {index}")
+        sequential_ms = (time.perf_counter() - started) / calls * 1e3
+        started = time.perf_counter()
+        await asyncio.gather(*(llm_agents._acall_llm(SHOT, f"concurrent {index}") for index in range(calls)))
+        print(
+            f"{label} async _acall_llm: {sequential_ms:.1f} ms/call sequential, "
+            f"{calls} concurrent {time.perf_counter() - started:.2f} s"
+        )
+
+    run_sync("cached")
+    asyncio.run(run_async("cached"))
+    llm_agents._get_client = lambda key=None: OpenAI(api_key=llm_agents._resolve_api_key(key))
+    llm_agents._get_async_client = lambda key=None: AsyncOpenAI(api_key=llm_agents._resolve_api_key(key))
+    run_sync("fresh ")
+    asyncio.run(run_async("fresh "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Time ``/shots/generate`` at several concurrency limits against the local Bria stub.
+
+Start the stub with a fixed render time, then run the benchmark from the repo root::
+
+    python -m backend.fixtures.bria_stub --port 8765 --render-seconds 0.1
+    python -m scripts.bench_shot_generation --shots 60 --concurrency 1 4 8
+
+With 100 ms renders, wall time falls roughly in proportion to the limit: 7.4 s,
+2.0 s and 1.2 s for 60 shots on one CPU. Each render also waits for one status
+poll. Sessions stay in memory, the render cache and image mirror are off, and the
+Bria rate limiter is disabled, so only the concurrency limit is measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+_BENCH_ENV = {
+    "BRIA_API_TOKEN": "bench",
+    "SESSION_STORE": "memory",
+    "RENDER_CACHE_ENABLED": "0",
+    "IMAGE_MIRROR_DIR": "",
+    "BRIA_RATE_PER_SECOND": "0",
+    "BRIA_POLL_INITIAL_DELAY": "0.05",
+    "BRIA_POLL_MAX_INTERVAL": "0.05",
+    "SHOT_GENERATION_MAX_WORKERS": "64",
+}
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bria-url", default="http://127.0.0.1:8765/v2/image/generate")
+    parser.add_argument("--shots", type=int, default=60, help="Shots to render, 10 per scene.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="max_concurrency values.")
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace) -> None:
+    # Imported here: settings are read from the environment at import time.
+    from backend.agent_structured_outputs import Scene, Shot
+    from backend.schemas import ShotGenerationRequest
+    from backend.services.shot_generation import ShotGenerationService
+    from backend.session_store import session_store
+
+    scenes = [
+        Scene(
+            scene_number=scene_number,
+            scene_title=f"Scene {scene_number}",
+            shots=[
+                Shot(
+                    shot_number=shot_number,
+                    shot_description=f"Shot {scene_number}.{shot_number}",
+                    characters_in_shot=[],
+                )
+                for shot_number in range(1, min(10, args.shots - (scene_number - 1) * 10) + 1)
+            ],
+        )
+        for scene_number in range(1, (args.shots + 9) // 10 + 1)
+    ]
+    session = session_store.create_session(script="benchmark", style="realistic", characters=[], scenes=scenes)
+    service = ShotGenerationService()
+    for limit in args.concurrency:
+        started = time.perf_counter()
+        response = await service.generate(
+            ShotGenerationRequest(session_id=session.session_id, max_concurrency=limit, bypass_cache=True)
+        )
+        elapsed = time.perf_counter() - started
+        print(f"max_concurrency={limit:<3} shots={len(response.shots)} wall={elapsed:.2f}s")
+
+
+def main() -> None:
+    args = _parse_args()
+    os.environ.update(_BENCH_ENV)
+    os.environ["BRIA_API_URLS"] = args.bria_url
+    os.environ.setdefault("BRIA_INITIAL_CONCURRENCY_PER_TOKEN", str(max(args.concurrency)))
+    os.environ.setdefault("BRIA_MAX_CONCURRENCY_PER_TOKEN", str(max(args.concurrency)))
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Fire concurrent pipeline requests at a running API and report wall time.
+
+Start both stubs, point the API at them, then run the load test from the repo root::
+
+    python -m backend.fixtures.bria_stub --port 8765 --render-seconds 10 --sync-seconds 10
+    python -m backend.fixtures.openai_stub --port 8766 --delay-seconds 1
+    BRIA_API_URLS=http://127.0.0.1:8765/v2/image/generate BRIA_API_TOKEN=bench \\
+    OPENAI_BASE_URL=http://127.0.0.1:8766/v1 OPENAI_API_KEY=sk-bench \\
+    BRIA_RATE_PER_SECOND=0 BRIA_INITIAL_CONCURRENCY_PER_TOKEN=2000 BRIA_MAX_CONCURRENCY_PER_TOKEN=2000 \\
+    BRIA_POOL_MAXSIZE=2000 RENDER_CACHE_ENABLED=0 IMAGE_MIRROR_DIR= \\
+        uvicorn backend.app:app --port 8000
+    python -m scripts.load_test --requests 200 --route generate_one
+    python -m scripts.load_test --requests 200 --route edit
+
+The session comes from ``/debug/load_fixture``, and every shot is rendered once
+before the timed run so edits have an asset. Each timed request bypasses the
+render cache. With handlers that hold a server thread, wall time grows in steps
+of the thread pool size (40); with the async handlers it stays close to one render
+plus CPU time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=200, help="Requests fired at once.")
+    parser.add_argument("--route", choices=("generate_one", "edit"), default="generate_one")
+    parser.add_argument("--bria-api-token", default="1", help="'1' uses the server's BRIA_API_TOKEN.")
+    parser.add_argument("--openai-api-key", default="1", help="'1' uses the server's OPENAI_API_KEY.")
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=600, limits=limits) as client:
+        response = await client.post("/debug/load_fixture", json={"style": "realistic"})
+        response.raise_for_status()
+        session = response.json()
+        session_id = session["session_id"]
+        tokens = {"session_id": session_id, "bria_api_token": args.bria_api_token}
+        for path in ("/characters/generate", "/shots/generate"):
+            response = await client.post(path, json=tokens)
+            response.raise_for_status()
+        shots = [(scene["scene_number"], shot["shot_number"]) for scene in session["scenes"] for shot in scene["shots"]]
+
+        async def one(index: int) -> httpx.Response:
+            scene_number, shot_number = shots[index % len(shots)]
+            body = {**tokens, "scene_number": scene_number, "shot_number": shot_number, "bypass_cache": True}
+            if args.route == "edit":
+                # Numbered so the local edit planner cannot answer it: every request asks the shot agent.
+                body.update(user_request=f"night {index}", openai_api_key=args.openai_api_key)
+                return await client.post("/shots/edit", json=body)
+            return await client.post("/shots/generate_one", json=body)
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(one(index) for index in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    codes = Counter(response.status_code for response in responses)
+    print(f"{args.route} requests={args.requests} wall={elapsed:.1f}s status={dict(codes)}")
+    for response in [response for response in responses if response.status_code >= 400][:2]:
+        print(f"  {response.status_code}: {response.text[:200]}")
+
+
+def main() -> None:
+    asyncio.run(_run(_parse_args()))
+
+
+if __name__ == "__main__":
+    main()